@@ -0,0 +1,219 @@
+import time
+import argparse as args
+import sys
+import os
+import glob
+import math
+
+# Differential check of the faster build paths against the regular build.
+# Builds every board under /KiCAD with both the regular (legacy) build
+# and the memory-lean build of create.py, and compares geometric fingerprints
+# of the two results: volume, surface area, bounding box, channel count,
+# and the cross-section of every copper layer.
+# The regular build is run as it was before the faster paths were added,
+# without simplify_segments() and stadium traces, and with a joint on every segment end,
+# so that it stays an independent reference for the lean build.
+# Run from a Python interpreter that can import FreeCAD, e.g.
+#   python Python/compare_engines.py --jobs 4
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import create
+
+FreeCAD = create.FreeCAD
+Part = create.Part
+
+BOARD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "KiCAD")
+
+# Largest relative deviation allowed for volumes and areas,
+# and largest absolute deviation allowed for lengths (mm)
+RELATIVE_TOLERANCE = 1e-3
+ABSOLUTE_TOLERANCE = 1e-3
+
+# Area of the cross-section of a shape at height z
+def section_area(shape, z: float):
+  wires = shape.slice(FreeCAD.Vector(0, 0, 1), z)
+  if (len(wires) == 0):
+    return 0.0
+  try:
+    return Part.makeFace(wires, "Part::FaceMakerBullseye").Area
+  except Part.OCCError:
+    return float("nan")
+
+# Points halfway up the trace channel of each segment of the board, keyed by net
+def net_points(segments: list):
+  points = dict()
+  for item in segments:
+    if (item["type"] != "segment"):
+      continue
+    length, orientation = create.measure_trace(item)
+    if (length < create.MINIMUM_TRACE_LENGTH):
+      continue
+    x = (float(item["x0"]) + float(item["x1"])) / 2
+    y = (float(item["y0"]) + float(item["y1"])) / 2
+    z = create.layer_z(item["layer"]) + (create.DEFAULT_TRACE_HEIGHT / 2)
+    points.setdefault(item["net"], list()).append(FreeCAD.Vector(x, y, z))
+  return points
+
+# Counts the channels of a built board as the connected pieces of the volume removed from its body.
+# Each net is looked up in the channels by the points of its segments (see net_points()),
+# counting the nets that ended up in more than one channel (broken traces)
+# and the channels holding more than one net (shorts).
+def count_channels(body, shape, points: dict):
+  channels = body.cut(shape).Solids
+  found = dict()
+  for net, vectors in points.items():
+    found[net] = set()
+    for cnt, solid in enumerate(channels):
+      box = solid.BoundBox
+      if any(box.isInside(vector) and solid.isInside(vector, 1e-6, True) for vector in vectors):
+        found[net].add(cnt)
+  nets = [sum(1 for channel in found.values() if cnt in channel) for cnt in range(len(channels))]
+  return {
+    "channels": len(channels),
+    "broken nets": sum(1 for channel in found.values() if len(channel) > 1),
+    "shared channels": sum(1 for count in nets if count > 1)
+  }
+
+# Geometric fingerprint of a built board, given its body before the boolean operation
+# and the segments of the board (see count_channels()).
+# The volume removed by the channels is compared on its own, as a missing channel 
+# barely changes the volume of the whole board.
+# Cross-sections are taken halfway up the channels of each copper layer.
+def fingerprint(shape, body, segments: list):
+  box = shape.BoundBox
+  prints = {
+    "volume": shape.Volume,
+    "removed": body.Volume - shape.Volume,
+    "area": shape.Area,
+    "box": (box.XMin, box.YMin, box.ZMin, box.XMax, box.YMax, box.ZMax),
+    "solids": len(shape.Solids)
+  }
+  prints.update(count_channels(body, shape, net_points(segments)))
+  for layer in create.COPPER_LAYERS:
+    z = create.layer_z(layer) + (create.DEFAULT_TRACE_HEIGHT / 2)
+    prints["section " + layer] = section_area(shape, z)
+  return prints
+
+# Returns a description of every fingerprint value that differs beyond the tolerances
+def compare(reference: dict, other: dict):
+  deviations = list()
+  for key, value in reference.items():
+    found = other.get(key)
+    if (found is None):
+      deviations.append("%s missing" % key)
+    elif (key == "box"):
+      worst = max(abs(a - b) for a, b in zip(value, found))
+      if (worst > ABSOLUTE_TOLERANCE):
+        deviations.append("box off by %.4f mm" % worst)
+    elif (isinstance(value, int)):
+      if (value != found):
+        deviations.append("%s %d != %d" % (key, value, found))
+    elif (math.isnan(value) or math.isnan(found)):
+      deviations.append("%s could not be measured" % key)
+    elif (abs(value - found) > RELATIVE_TOLERANCE * max(abs(value), 1.0)):
+      deviations.append("%s %.4f != %.4f (%+.3f%%)" % (key, value, found, 100 * (found - value) / max(abs(value), 1e-9)))
+  return deviations
+
+# Builds the board with the unmodified regular build in its own document,
+# returning the result and the time taken
+def run_legacy(file: str, housings: bool):
+  settings = (create.SIMPLIFY_REGULAR_BUILD, create.DEDUP_REGULAR_JOINTS, create.PAD_PATTERN_CACHE, create.STADIUM_TRACES)
+  create.SIMPLIFY_REGULAR_BUILD = False
+  create.DEDUP_REGULAR_JOINTS = False
+  create.PAD_PATTERN_CACHE = False
+  create.STADIUM_TRACES = False
+  doc = create.new_document("Compare_Legacy")
+  try:
+    start = time.perf_counter()
+    result = create.build_legacy(file, housings).copy()
+    return result, time.perf_counter() - start
+  finally:
+    FreeCAD.closeDocument(doc.Name)
+    create.SIMPLIFY_REGULAR_BUILD, create.DEDUP_REGULAR_JOINTS, create.PAD_PATTERN_CACHE, create.STADIUM_TRACES = settings
+
+# Builds the board with the memory-lean build,
+# returning the result and the time taken
+def run_lean(file: str, housings: bool, jobs: int):
+  start = time.perf_counter()
+  board = create.parse_board(file, jobs)
+  if (not housings):
+    board["models"].clear()
+  result = create.build_shapes(board, jobs=jobs)
+  return result, time.perf_counter() - start
+
+# Compares both builds on one board.
+# The board is parsed up front, so that only boards that cannot be parsed are skipped.
+# Returns the fingerprints, times and deviations, or None if the board cannot be parsed.
+# A build that fails is reported as the only deviation.
+def compare_board(file: str, housings: bool, jobs: int):
+  try:
+    board = create.parse_board(file, jobs)
+  except (SystemExit, ValueError):
+    return None
+
+  try:
+    legacy, legacy_time = run_legacy(file, housings)
+    lean, lean_time = run_lean(file, housings, jobs)
+  except SystemExit:
+    return {"board": file, "deviations": ["build exited"]}
+  except Exception as error:
+    return {"board": file, "deviations": ["build failed: " + repr(error)]}
+
+  # Both builds have applied the board's layers by now
+  body = create.make_body_shape(create.sort_outlines(board["outlines"]))
+  reference = fingerprint(legacy, body, board["segments"])
+  other = fingerprint(lean, body, board["segments"])
+  return {
+    "board": file,
+    "legacy": reference,
+    "lean": other,
+    "legacy_time": legacy_time,
+    "lean_time": lean_time,
+    "deviations": compare(reference, other)
+  }
+
+def main(argv: list):
+  global RELATIVE_TOLERANCE, ABSOLUTE_TOLERANCE
+  parser = args.ArgumentParser(description="Compares the memory-lean build against the regular build on every board.")
+  parser.add_argument("boards", nargs="*", help="boards to compare, defaults to every board under /KiCAD")
+  parser.add_argument("--jobs", type=int, default=1, help="number of worker processes for the lean build")
+  parser.add_argument("--tile-size", type=float, metavar="MM", help="also cut the lean build in tiles")
+  parser.add_argument("--stadium-traces", action="store_true", help="build the traces of the lean build as stadium solids")
+  parser.add_argument("--housings", action="store_true", help="also fuse the 3D footprints (needs KICAD_3DMODEL_DIR)")
+  parser.add_argument("--rtol", type=float, default=RELATIVE_TOLERANCE, help="relative tolerance of volumes and areas")
+  parser.add_argument("--atol", type=float, default=ABSOLUTE_TOLERANCE, help="absolute tolerance of lengths in mm")
+  options = parser.parse_args(argv)
+
+  RELATIVE_TOLERANCE = options.rtol
+  ABSOLUTE_TOLERANCE = options.atol
+  create.MOVIE_EFFECT = False
+  create.BOOLEAN_TILE_SIZE = options.tile_size
+  create.STADIUM_TRACES = options.stadium_traces
+
+  boards = options.boards or sorted(glob.glob(os.path.join(BOARD_DIR, "**", "*.kicad_pcb"), recursive=True))
+  failed = 0
+  skipped = 0
+  for file in boards:
+    name = os.path.relpath(file, BOARD_DIR)
+    print("Comparing", name)
+    report = compare_board(file, options.housings, options.jobs)
+    if (report is None):
+      print("   SKIPPED, the board could not be parsed")
+      skipped = skipped + 1
+      continue
+
+    if ("legacy_time" in report):
+      speedup = report["legacy_time"] / max(report["lean_time"], 1e-9)
+      print("   legacy %.1fs, lean %.1fs, %.1fx faster" % (report["legacy_time"], report["lean_time"], speedup))
+    if (len(report["deviations"]) == 0):
+      print("   OK, volume %.3f mm^3, %d channels" % (report["legacy"]["volume"], report["legacy"]["channels"]))
+    else:
+      failed = failed + 1
+      for deviation in report["deviations"]:
+        print("   DEVIATION", deviation)
+
+  print(len(boards) - failed - skipped, "of", len(boards) - skipped, "boards match,", skipped, "skipped")
+  return 1 if (failed > 0) or (skipped == len(boards)) else 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
@@ -1,13 +1,48 @@
+import time
+_IMPORT_START = time.perf_counter()
+
 import argparse as args
 import sys 
+import os
+import gc
+import io
+import re
 import math
-import FreeCAD
-from FreeCAD import Placement, Rotation, Vector
-from freecad import module_io
-import FreeCADGui as Gui
-import PySide2
-import ImportGui
-from pyparsing import nestedExpr
+import importlib
+import threading
+from contextlib import contextmanager, nullcontext
+
+# Time taken to import each heavy module, see LazyModule
+IMPORT_TIMES = dict()
+
+# Stand-in for a heavy module (FreeCAD, its GUI, Qt, ...) that is only
+# imported the first time one of its attributes is used, so that importing 
+# this file stays cheap when only the parser is needed. 
+# Modules that can only be imported once FreeCAD is loaded 
+# (Part, ImportGui, ...) name FreeCAD as their requirement.
+class LazyModule:
+  def __init__(self, name: str, requires = None):
+    self._name = name
+    self._requires = requires
+    self._module = None
+
+  def _load(self):
+    if (self._module is None):
+      if (self._requires is not None):
+        self._requires._load()
+      start = time.perf_counter()
+      self._module = importlib.import_module(self._name)
+      IMPORT_TIMES[self._name] = time.perf_counter() - start
+    return self._module
+
+  def __getattr__(self, attr):
+    return getattr(self._load(), attr)
+
+FreeCAD = LazyModule("FreeCAD")
+Part = LazyModule("Part", FreeCAD)
+FreeCADGui = LazyModule("FreeCADGui", FreeCAD)
+ImportGui = LazyModule("ImportGui", FreeCADGui)
+QtWidgets = LazyModule("PySide2.QtWidgets", FreeCADGui)
 
 #####################################################
 # Global parameters for optimization. 
@@ -24,6 +59,15 @@ KICAD_3DMODEL_DIR = "C:/Program Files/KiCad/8.0/share/kicad/3dmodels/"
 # traces are redacted.
 MINIMUM_TRACE_LENGTH = 0.5
 
+# Merges collinear segments and absorbs short stubs in the regular build too (see simplify_segments()).
+# The memory-lean build always simplifies the segments, while the regular build
+# keeps one channel per segment of the board unless this is set.
+SIMPLIFY_REGULAR_BUILD = False
+
+# Gives segment endpoints shared by several segments a single joint in the regular build (see is_new_joint()).
+# When off, every segment end gets its own joint, as in the original regular build.
+DEDUP_REGULAR_JOINTS = True
+
 # Height and Width of the 3D trace segments
 DEFAULT_TRACE_HEIGHT = 0.75
 DEFAULT_TRACE_WIDTH = 0.75
@@ -38,21 +82,137 @@ DEFAULT_SOCKET_HEIGHT = 0.05 # Socket insertion depth, no need to change unless
 MOVIE_EFFECT = True
 REFRESH_RATE = 2 # higher -> less frequent updates
 
+# Memory-lean build. Tool geometry is built purely in memory instead of as 
+# document objects, and only the final PCB_Base result is kept in the document.
+# Recommended for large boards, where the hidden intermediate objects 
+# of the regular build can take up gigabytes of memory.
+LEAN_BUILD = False
+KEEP_BREP = False # Also writes the final shape as a .brep file next to the board
+BOOLEAN_TILE_SIZE = None # Cuts the body in square tiles of this size, each against only the tools reaching into it
+
+# Builds each trace segment as one solid with rounded ends (see make_stadium()),
+# instead of a box plus a joint cylinder on each end. 
+# Gives the boolean operation a third of the trace tools, without overlapping faces within a segment.
+STADIUM_TRACES = False
+
+# Finds the tools that make the boolean operation fail, e.g. a degenerate trace or pad,
+# by cutting halves of the tools on their own (see isolate_failing_tools()), and reports where they are.
+# "report" only reports them, "exclude" leaves them out of the cut,
+# and "repair" tries to repair them first (see diagnose_cut()). Off when None.
+BOOLEAN_DIAGNOSIS = None
+
+# Reads the 3D models of the memory-lean build in worker processes while the channels 
+# and the body are built, instead of after them, when given more than one job (--jobs).
+# The critical path of the build is reported at the end either way.
+OVERLAP_STAGES = True
+
+# Saves the state after each stage of the memory-lean build (see open_checkpoint()),
+# so that a build that crashed or ran out of memory can be resumed with RESUME (--resume)
+# from the last completed stage, instead of starting over.
+# Saved next to the board (board.kicad_pcb.checkpoint/) unless CHECKPOINT_DIR is set.
+CHECKPOINTS = False
+RESUME = False
+CHECKPOINT_DIR = None
+
+# Saves the parsed board next to the board file (board.kicad_pcb.parsed/)
+# so that later runs on the unchanged board skip parsing entirely
+PARSE_CACHE = False
+
+# Reads the pads of only the first footprint of each kind, and places the pads
+# of the remaining ones from that footprint's pad pattern instead of reading them again.
+# Patterns can also be seeded from a footprint library, e.g. "../library/PVA_board.pretty",
+# in which case footprints from that library are placed without reading the board's pads.
+PAD_PATTERN_CACHE = False
+PAD_PATTERN_LIBRARY = None
+
+# Simplifies the 3D models before they are fused into the body (see simplify_housing()),
+# and saves the simplified models in HOUSING_CACHE_DIR to be read from there on later runs.
+SIMPLIFY_HOUSINGS = False
+HOUSING_DETAIL_DISTANCE = None # Parts of a model further above the board than this are replaced by their bounding box
+HOUSING_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".dissolvpcb", "housings")
+
 #####################################################
 # Do Not Modify
-DEFAULT_FCU_Z = DEFAULT_LAYER_GAP - DEFAULT_TRACE_HEIGHT # -0.5
-DEFAULT_BCU_Z = DEFAULT_TRACE_HEIGHT - DEFAULT_LAYER_GAP # 0.5
-DEFAULT_BODY_FCU_Z = DEFAULT_FCU_Z - DEFAULT_BODY_OFFSET
-DEFAULT_BODY_BCU_Z = DEFAULT_BCU_Z + DEFAULT_TRACE_HEIGHT + DEFAULT_BODY_OFFSET
-DEFAULT_BODY_HEIGHT = abs(DEFAULT_BODY_BCU_Z) + abs(DEFAULT_BODY_FCU_Z)
-DEFAULT_THRUHOLE_HEIGHT = (DEFAULT_TRACE_HEIGHT * 2) + DEFAULT_BODY_OFFSET + DEFAULT_LAYER_GAP
-DEFAULT_PAD_HEIGHT = DEFAULT_BODY_OFFSET * 1.05 # Height of pads on top of terminal ends of traces
+# Copper layers of the board in stack order, from F.Cu to B.Cu.
+# Set from the board's layer table by set_copper_layers().
+COPPER_LAYERS = ["F.Cu", "B.Cu"]
+
+# Recomputes the derived parameters from the global parameters. 
+# Called once when the macro is loaded, and again by set_parameters() 
+# and set_copper_layers() whenever those change afterwards. 
+# F.Cu stays at the bottom of the stack and every further copper layer
+# is stacked one layer pitch above the previous one, 
+# so that B.Cu and the top of the body move up with the layer count.
+def update_derived_parameters():
+  global DEFAULT_FCU_Z, DEFAULT_BCU_Z, DEFAULT_BODY_FCU_Z, DEFAULT_BODY_BCU_Z
+  global DEFAULT_BODY_HEIGHT, DEFAULT_THRUHOLE_HEIGHT, DEFAULT_PAD_HEIGHT, LAYER_Z
+  DEFAULT_FCU_Z = DEFAULT_LAYER_GAP - DEFAULT_TRACE_HEIGHT # -0.5
+  layer_pitch = (DEFAULT_TRACE_HEIGHT - DEFAULT_LAYER_GAP) - DEFAULT_FCU_Z # 1.0
+  extra_layers = len(COPPER_LAYERS) - 2
+
+  # Bottom of the trace channels of each copper layer
+  LAYER_Z = {layer: DEFAULT_FCU_Z + (i * layer_pitch) for i, layer in enumerate(COPPER_LAYERS)}
+
+  DEFAULT_BCU_Z = LAYER_Z[COPPER_LAYERS[-1]] # 0.5
+  DEFAULT_BODY_FCU_Z = DEFAULT_FCU_Z - DEFAULT_BODY_OFFSET
+  DEFAULT_BODY_BCU_Z = DEFAULT_BCU_Z + DEFAULT_TRACE_HEIGHT + DEFAULT_BODY_OFFSET
+  DEFAULT_BODY_HEIGHT = abs(DEFAULT_BODY_BCU_Z) + abs(DEFAULT_BODY_FCU_Z)
+  DEFAULT_THRUHOLE_HEIGHT = (DEFAULT_TRACE_HEIGHT * 2) + DEFAULT_BODY_OFFSET + DEFAULT_LAYER_GAP + (extra_layers * layer_pitch)
+  DEFAULT_PAD_HEIGHT = DEFAULT_BODY_OFFSET * 1.05 # Height of pads on top of terminal ends of traces
+
+update_derived_parameters()
+
+# Global parameters that can be changed by set_parameters()
+# and swept over by run_sweep(), by their short names
+SWEEP_PARAMETERS = {
+  "width": "DEFAULT_TRACE_WIDTH",
+  "height": "DEFAULT_TRACE_HEIGHT",
+  "gap": "DEFAULT_LAYER_GAP",
+  "offset": "DEFAULT_BODY_OFFSET"
+}
+
+# Changes global parameters by their short names (see SWEEP_PARAMETERS),
+# then updates the derived parameters to match.
+def set_parameters(params: dict):
+  for key, value in params.items():
+    if (key not in SWEEP_PARAMETERS):
+      print("Unknown parameter: ", key)
+      sys.exit(1)
+    globals()[SWEEP_PARAMETERS[key]] = float(value)
+  update_derived_parameters()
+
+# Returns the current value of each global parameter by its short name
+def get_parameters():
+  return {key: globals()[name] for key, name in SWEEP_PARAMETERS.items()}
+
+# Changes the copper layers of the stackup (see assign_layers()),
+# then updates the derived parameters to match.
+def set_copper_layers(layers: list):
+  global COPPER_LAYERS
+  if (len(layers) < 2):
+    print("Boards need at least 2 copper layers, found: ", layers)
+    sys.exit(1)
+  COPPER_LAYERS = list(layers)
+  update_derived_parameters()
 #####################################################
 
 # Document Settings
 DOC_NAME = "PCB_Importing_Example"
-DOC = FreeCAD.newDocument(DOC_NAME)
-FreeCAD.setActiveDocument(DOC.Name)
+DOC = None # Document of the current job, see new_document()
+
+# Creates the document a job is built in and makes it the active document.
+# Every job should start with a new document.
+def new_document(name: str = DOC_NAME):
+  global DOC
+  DOC = FreeCAD.newDocument(name)
+  FreeCAD.setActiveDocument(DOC.Name)
+  return DOC
+
+# Prints how long it took to import this file and each heavy module loaded so far
+def report_startup():
+  print("   Startup: module import took %.3fs" % IMPORT_TIME)
+  for name, elapsed in IMPORT_TIMES.items():
+    print("   Startup: loading", name, "took %.3fs" % elapsed)
 
 # Sets view to include all objects on screen
 def set_view():
@@ -71,6 +231,15 @@ def set_view():
   view.viewAxometric()
   view.fitAll()
 
+# Opens the pcb file for the parsing functions below.
+# These also accept an already open file or text stream 
+# (e.g. a single block of the file, see parse_block_range()), 
+# which is left open for the caller.
+def open_pcb(file):
+  if isinstance(file, str):
+    return open(file, 'r')
+  return nullcontext(file)
+
 # Collects footprint data from the pcb file,
 # grabs component name, footprint, layer, position, then
 # returns a list of dictionaries.
@@ -84,9 +253,9 @@ def set_view():
     #   "r": r,
     #   "filepos": file_pos
 def assign_footprints(file: str, ftpt: list):
-  with open(file, 'r') as pcbfile:
-    line = pcbfile.readline()
+  with open_pcb(file) as pcbfile:
     file_pos = pcbfile.tell()
+    line = pcbfile.readline()
     while line:
       if ("(footprint " in line):
         idx = line.find("\"")
@@ -137,6 +306,9 @@ def assign_footprints(file: str, ftpt: list):
       file_pos = pcbfile.tell()
       line = pcbfile.readline()
       
+# Lines opening a top-level block of the pcb file, see BLOCK_START
+TOP_LEVEL_LINE = re.compile(r"^(?:\t|  )\(")
+
 # Collects pad data from the pcb file,
 # grabs things like pad type, shape, location, and size.
 # Pads can be "smd" or "thru_hole",
@@ -155,10 +327,22 @@ def assign_footprints(file: str, ftpt: list):
     # "padx": padx,
     # "pady": pady,
     # "rratio": rratio / "drill": drill
-def assign_pads(file: str, ftpt: list, pads: list):
-  with open(file, 'r') as pcbfile:
+# If a 'patterns' dictionary is given (see pad_patterns()), footprints with a known
+# pad pattern are placed from it without being read, and the pads of every other
+# footprint are added to it as a new pattern.
+# Footprints also end at the next top-level block of a pcb file, unless 'top_level' is off
+# for footprint files (.kicad_mod), where the pads themselves are top-level blocks.
+def assign_pads(file: str, ftpt: list, pads: list, patterns: dict = None, top_level: bool = True):
+  with open_pcb(file) as pcbfile:
     for item in ftpt:
         name = item["name"]
+        key = (item["footprint"], item["layer"])
+        pattern = patterns.get(key) if (patterns is not None) else None
+        if (pattern is not None):
+          pads.extend(place_pad_pattern(pattern, item))
+          continue
+
+        first = len(pads)
         file_pos = item['filepos']
         pcbfile.seek(file_pos)
         line = pcbfile.readline()
@@ -363,16 +547,61 @@ def assign_pads(file: str, ftpt: list, pads: list):
             pads.append(new_pad)
 
           # New footprint definition denotes end of current footprint components, 
-          # thus we move onto the next component on the list of footprints
-          elif ("(footprint " in line):
+          # thus we move onto the next component on the list of footprints.
+          # Any other top-level block (zones, segments, ...) after the last footprint ends it too.
+          elif ("(footprint " in line) or ((top_level) and (TOP_LEVEL_LINE.match(line))):
             break
 
+        if (patterns is not None):
+          patterns[key] = local_pads(pads[first:])
+
+# Pad patterns hold the pads of one kind of footprint relative to the footprint, 
+# keyed by (footprint, layer), e.g. ("PVA_board:R-0805", "F.Cu").
+# Pad rotations are relative to the footprint's rotation.
+def local_pads(pads: list):
+  return [dict(pad, r=(float(pad["r"]) - float(pad["footprint"]["r"])) % 360) for pad in pads]
+
+# Returns the pads of a footprint placed from its pad pattern
+def place_pad_pattern(pattern: list, footprint):
+  return [dict(pad, name=footprint["name"], footprint=footprint, r=(pad["r"] + float(footprint["r"])) % 360) for pad in pattern]
+
+# Reads the pads of every footprint of a KiCad footprint library (.pretty directory) 
+# as pad patterns, keyed by "<library>:<footprint>" as they are named on the board.
+# Library footprints are only used for F.Cu, as B.Cu footprints are stored mirrored on the board.
+# Footprints of the board are placed from these patterns without being read,
+# so the board's footprints must not have been edited after being placed from the library.
+def load_pad_patterns(library: str, patterns: dict):
+  import glob
+  nickname = os.path.splitext(os.path.basename(os.path.normpath(library)))[0]
+  for path in sorted(glob.glob(os.path.join(library, "*.kicad_mod"))):
+    name = nickname + ":" + os.path.splitext(os.path.basename(path))[0]
+    origin = {"name": "REF**", "footprint": name, "layer": "F.Cu", "x": 0.0, "y": 0.0, "r": 0.0, "filepos": 0}
+    pads = list()
+    try:
+      assign_pads(path, [origin], pads, top_level=False)
+    except SystemExit:
+      print("   Skipping pad pattern of", name)
+      continue
+    if (len(pads) == 0):
+      continue
+    patterns[(name, "F.Cu")] = local_pads(pads)
+
+# Returns the pad patterns to pass to assign_pads(), 
+# or None if the pad pattern cache is disabled
+def pad_patterns():
+  if (not PAD_PATTERN_CACHE):
+    return None
+  patterns = dict()
+  if (PAD_PATTERN_LIBRARY is not None):
+    load_pad_patterns(PAD_PATTERN_LIBRARY, patterns)
+  return patterns
+
 # Collects segment data for traces in the pcb file,
 # as well as via data to connect traces, 
 # along with the PCB outline data. 
 # Data for Traces & Vias are returned on the 'segs' list,
 # and data for the board outline is returned on the 'outlines' list.
-# TODO: Note that this only supports 2 layer boards at this time.
+# Copper layers other than F.Cu and B.Cu are placed by the stackup (see assign_layers()).
 # TODO: Currently assumes all trace widths are all the same. 
     # Trace Data
         #   "type": "segment",
@@ -383,15 +612,28 @@ def assign_pads(file: str, ftpt: list, pads: list):
         #   "width": width,
         #   "layer": layer,
         #   "net": net #
+    # Arc Track Data, from the start through the mid point to the end
+        #   "type": "arc",
+        #   "x0": x0,
+        #   "y0": y0,
+        #   "xm": xm,
+        #   "ym": ym,
+        #   "x1": x1,
+        #   "y1": y1, 
+        #   "width": width,
+        #   "layer": layer,
+        #   "net": net
     # Via Data 
         #   "type": "via",
         #   "x": x,
         #   "y": y,
         #   "size": size,
         #   "drill": drill,
+        #   "from_layer": from_layer,
+        #   "to_layer": to_layer,
         #   "net": net
 def assign_segments(file: str, segs: list, outlines: list):
-  with open(file, 'r') as pcbfile:
+  with open_pcb(file) as pcbfile:
     line = pcbfile.readline()
     outline = (0, 0, 0, 0)
     while line:
@@ -440,14 +682,54 @@ def assign_segments(file: str, segs: list, outlines: list):
 
         segs.append(new_seg)
 
+      # Collecting Arc Tracks, given by their start, mid and end points
+      elif (line.strip() == "(arc") and (TOP_LEVEL_LINE.match(line)):
+        points = list()
+        for i in range(3):
+          pointline = ((pcbfile.readline().strip())[1:-1]).split()
+          points.append((pointline[1], pointline[2]))
+        width = (((pcbfile.readline().strip())[1:-1]).split())[1]
+        layer = (((pcbfile.readline().strip())[1:-1]).split())[1][1:-1]
+        net = "net_" + (((pcbfile.readline().strip())[1:-1]).split())[1]
+
+        (x0, y0), (xm, ym), (x1, y1) = points
+        new_arc = {
+          "type": "arc",
+          "x0": x0,
+          "y0": y0,
+          "xm": xm,
+          "ym": ym,
+          "x1": x1,
+          "y1": y1,
+          "width": width,
+          "layer": layer,
+          "net": net
+        }
+
+        # Arcs too flat to tell from their chord are kept as straight segments
+        if (arc_bulge(new_arc) <= JOINT_TOLERANCE):
+          for key in ("xm", "ym"):
+            del new_arc[key]
+          new_arc["type"] = "segment"
+        segs.append(new_arc)
+
       # Collecting Vias
       elif ("(via" in line) and not("(vias" in line):
         locline = (pcbfile.readline().strip())[1:-1]
         sizeline = (pcbfile.readline().strip())[1:-1]
         drillline = (pcbfile.readline().strip())[1:-1]
-        pcbfile.readline()
+        layersline = (pcbfile.readline().strip())[1:-1]
         net = "net_" + (((pcbfile.readline().strip())[1:-1]).split())[1]
 
+        # Layer pair the via connects, through vias if not given
+        layersline = layersline.replace('\"', '').split()
+        if (len(layersline) == 3) and (layersline[0] == "layers"):
+          from_layer = layersline[1]
+          to_layer = layersline[2]
+        else:
+          from_layer = "F.Cu"
+          to_layer = "B.Cu"
+
         locline = locline.split()
         x = locline[1]
         y = locline[2]
@@ -463,13 +745,12 @@ def assign_segments(file: str, segs: list, outlines: list):
           "y": y,
           "size": size,
           "drill": drill,
+          "from_layer": from_layer,
+          "to_layer": to_layer,
           "net": net
         }
 
         segs.append(new_via)
-
-        # TODO: Add code to make it compatible with 2+ layer boards
-        # This assumes only F.Cu and B.Cu layers!
       
       elif ("(gr" in line):
         line = line.strip()
@@ -529,35 +810,633 @@ def assign_segments(file: str, segs: list, outlines: list):
         
       line = pcbfile.readline()
   
+# Top-level zone blocks, e.g. "\t(zone" or "  (zone (net 1) ..."
+ZONE_START = re.compile(r"^(?:\t|  )\(zone[\s)]")
+ZONE_NET = re.compile(r"\(net (\d+)")
+ZONE_LAYER = re.compile(r'\(layer "?([^"\s)]+)')
+ZONE_POINT = re.compile(r"\(xy ([-\d.eE]+) ([-\d.eE]+)\)")
+
+# Collects the filled areas of the copper zones in the pcb file,
+# as filled by KiCad (the 'filled_polygon' blocks of each zone).
+# Zones that have not been filled have no filled areas, and are skipped.
+# Each zone gives one item per copper layer, holding every filled area of the zone on that layer.
+# Data for zones is returned on the 'zones' list.
+    #   "type": "zone",
+    #   "net": net,
+    #   "layer": layer,
+    #   "rings": [[(x, y), ...], ...]; outlines and holes of the filled areas (see unfracture_polygon())
+def assign_zones(file, zones: list):
+  with open_pcb(file) as pcbfile:
+    line = pcbfile.readline()
+    while line:
+      if (ZONE_START.match(line)):
+        # Read the whole zone block, until its parentheses are closed
+        block = [line]
+        depth = line.count("(") - line.count(")")
+        while (depth > 0):
+          line = pcbfile.readline()
+          if (not line):
+            break
+          block.append(line)
+          depth = depth + line.count("(") - line.count(")")
+        block = "".join(block)
+
+        netline = ZONE_NET.search(block)
+        net = "net_" + netline.group(1) if (netline) else "net_0"
+        layers = dict()
+        for area in block.split("(filled_polygon")[1:]:
+          layer = ZONE_LAYER.search(area).group(1)
+          points = [(float(x), float(y)) for x, y in ZONE_POINT.findall(area)]
+          layers.setdefault(layer, list()).extend(unfracture_polygon(points))
+
+        for layer, rings in layers.items():
+          if (len(rings) > 0):
+            zones.append({"type": "zone", "net": net, "layer": layer, "rings": rings})
+
+      line = pcbfile.readline()
+
+# Helper Function to assign_zones(),
+# KiCad stores each filled area and its holes as one 'fractured' outline, where every hole 
+# is joined to the outside by a bridge, walked there and back along the same line.
+# Removes the bridges by dropping every edge that is also walked the opposite way,
+# and returns the remaining closed rings: the outline and each of its holes.
+def unfracture_polygon(points: list):
+  edges = dict()
+  for i, point in enumerate(points):
+    start = point_key(*point)
+    end = point_key(*points[(i + 1) % len(points)])
+    if (start != end):
+      edges[(start, end)] = point
+
+  outgoing = dict()
+  for (start, end), point in edges.items():
+    if ((end, start) not in edges):
+      outgoing.setdefault(start, list()).append((end, point))
+
+  # Walk the remaining edges around each ring, back to where it started
+  rings = list()
+  for start in list(outgoing):
+    while (len(outgoing.get(start, [])) > 0):
+      ring = list()
+      key = start
+      while (len(outgoing.get(key, [])) > 0):
+        key, point = outgoing[key].pop()
+        ring.append(point)
+        if (key == start):
+          break
+      if (len(ring) >= 3):
+        rings.append(ring)
+  return rings
+
+#####################################################
+# Block index
+#####################################################
+
+# Top-level blocks of the pcb file start on a line indented once,
+# with a tab (KiCad 8) or two spaces (older versions)
+BLOCK_START = re.compile(rb"^(?:\t|  )\((\w+)", re.MULTILINE)
+BLOCK_REFERENCE = re.compile(rb'\(property "Reference" "([^"]*)"|\(fp_text reference "?([^"\s)]*)')
+BLOCK_FOOTPRINT = re.compile(rb'\(footprint "?([^"\s]*)')
+
+# Kinds of blocks holding board geometry, which can be parsed on their own
+GEOMETRY_BLOCKS = ("footprint", "segment", "via", "arc", "zone", "gr_rect", "gr_line", "gr_arc")
+
+# Files over this size are parsed block-by-block in parallel 
+# when parse_board() is given more than one job
+PARALLEL_PARSE_MIN_SIZE = 4 * 2**20
+
+# Scans a memory-mapped pcb file once and records the byte range of 
+# every top-level block (footprints, segments, vias, arcs, zones, graphics, ...).
+# Footprints also record their reference designator and library name.
+# Returns a list of dictionaries in file order.
+    # "kind": "footprint", "segment", "via", ...
+    # "start": byte offset of the block,
+    # "end": byte offset after the block,
+    # "ref": reference designator (footprints only),
+    # "name": library name (footprints only)
+def build_block_index(file: str):
+  import mmap
+  blocks = list()
+  with open(file, 'rb') as pcbfile:
+    with mmap.mmap(pcbfile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+      for match in BLOCK_START.finditer(data):
+        if (len(blocks) > 0):
+          blocks[-1]["end"] = match.start()
+        blocks.append({"kind": match.group(1).decode(), "start": match.start()})
+
+      if (len(blocks) > 0):
+        # The last block ends where the board's closing parenthesis starts
+        blocks[-1]["end"] = data.rfind(b"\n)") + 1 or len(data)
+
+      for block in blocks:
+        if (block["kind"] == "footprint"):
+          text = data[block["start"]:block["end"]]
+          name = BLOCK_FOOTPRINT.search(text)
+          ref = BLOCK_REFERENCE.search(text)
+          block["name"] = name.group(1).decode() if name else ""
+          block["ref"] = (ref.group(1) or ref.group(2)).decode() if ref else ""
+  return blocks
+
+# The block index is saved next to the board, e.g. board.kicad_pcb.index.json
+def block_index_path(file: str):
+  return file + ".index.json"
+
+# Returns the block index of the pcb file (see build_block_index()).
+# The index saved next to the board is reused while the board is unchanged,
+# otherwise it is rebuilt and saved again.
+def load_block_index(file: str):
+  import json
+  stat = os.stat(file)
+  path = block_index_path(file)
+  try:
+    with open(path, 'r') as indexfile:
+      index = json.load(indexfile)
+    if (index["size"] == stat.st_size) and (index["mtime"] == stat.st_mtime):
+      return index["blocks"]
+  except (OSError, ValueError, KeyError):
+    pass
+
+  blocks = build_block_index(file)
+  try:
+    with open(path, 'w') as indexfile:
+      json.dump({"size": stat.st_size, "mtime": stat.st_mtime, "blocks": blocks}, indexfile)
+  except OSError:
+    print("   Could not save block index to", path)
+  return blocks
+
+# Returns the text of one indexed block
+def read_block(file: str, block: dict):
+  with open(file, 'rb') as pcbfile:
+    pcbfile.seek(block["start"])
+    return pcbfile.read(block["end"] - block["start"]).decode()
+
+# Parses the blocks found in a byte range of the pcb file. 
+# The range must start and end on block boundaries (see build_block_index()).
+# Returns a board dictionary (see parse_board()), with the 
+# footprint file positions pointing into the whole file.
+def parse_block_range(file: str, start: int, end: int):
+  with open(file, 'rb') as pcbfile:
+    pcbfile.seek(start)
+    data = pcbfile.read(end - start)
+
+  stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+  board = new_board()
+  assign_footprints(stream, board["footprints"])
+  assign_pads(stream, board["footprints"], board["pads"])
+  stream.seek(0)
+  assign_segments(stream, board["segments"], board["outlines"])
+  stream.seek(0)
+  assign_zones(stream, board["zones"])
+  assign_models(stream, board["footprints"], board["models"])
+
+  for item in board["footprints"]:
+    item["filepos"] = item["filepos"] + start
+  return board
+
+# Loads a single footprint by its reference designator (e.g. "U1"),
+# using the block index instead of scanning the whole file. 
+# Returns a board dictionary holding only that footprint, 
+# its pads and its 3D models, or None if there is no such footprint.
+def load_footprint(file: str, ref: str):
+  for block in load_block_index(file):
+    if (block["kind"] == "footprint") and (block.get("ref") == ref):
+      return parse_block_range(file, block["start"], block["end"])
+  return None
+
+# Parses the pcb file block-by-block across a pool of worker processes.
+# The geometry blocks are split into contiguous ranges of similar size,
+# and the results are joined back together in file order.
+def parse_board_parallel(file: str, jobs: int):
+  blocks = [block for block in load_block_index(file) if block["kind"] in GEOMETRY_BLOCKS]
+
+  # Blocks in between geometry blocks (nets, groups, ...) are included in the ranges, 
+  # the parsers skip anything they do not recognize. 
+  ranges = list()
+  if (len(blocks) > 0):
+    total = blocks[-1]["end"] - blocks[0]["start"]
+    target = max(total // (jobs * 4), 1)
+    start = blocks[0]["start"]
+    for block in blocks:
+      if (block["end"] - start >= target):
+        ranges.append((start, block["end"]))
+        start = block["end"]
+    if (start < blocks[-1]["end"]):
+      ranges.append((start, blocks[-1]["end"]))
+
+  board = new_board()
+  assign_layers(file, board["layers"])
+  with process_pool(jobs) as pool:
+    futures = [pool.submit(parse_block_range, file, start, end) for start, end in ranges]
+    for future in futures:
+      part = future.result()
+      for key in board:
+        board[key].extend(part[key])
+  return board
+
+#####################################################
+# Parse cache
+#####################################################
+
+# Returns an empty board dictionary, holding the lists filled 
+# by the parsing functions above (see parse_board())
+def new_board():
+  return {"layers": list(), "footprints": list(), "pads": list(), "segments": list(), "outlines": list(), 
+          "zones": list(), "models": list()}
+
+# Bump whenever the schema below changes, so that old caches are reparsed
+PARSE_CACHE_VERSION = 4
+
+# Columns of the parse cache by table and key of the parsed dictionaries.
+# "U" columns hold strings, "f8"/"i8" hold numbers, "3f8" hold (x, y, z) rows, 
+# and "ref" columns hold the index of the item's footprint.
+# Keys missing from an item are stored as NaN or MISSING_TEXT and left out again when loading.
+PARSE_CACHE_SCHEMA = {
+  "footprints": {"name": "U", "footprint": "U", "layer": "U", "x": "f8", "y": "f8", "r": "f8", "filepos": "i8"},
+  "pads": {"name": "U", "number": "U", "footprint": "ref", "type": "U", "padtype": "U", 
+           "x": "f8", "y": "f8", "r": "f8", "padx": "f8", "pady": "f8", "rratio": "f8", "drill": "f8"},
+  "segments": {"type": "U", "x0": "f8", "y0": "f8", "xm": "f8", "ym": "f8", "x1": "f8", "y1": "f8", "width": "f8", 
+               "x": "f8", "y": "f8", "size": "f8", "drill": "f8", "layer": "U", 
+               "from_layer": "U", "to_layer": "U", "net": "U"},
+  "models": {"name": "U", "footprint": "ref", "path": "U", "offset": "3f8", "rotate": "3f8"},
+  "zones": {"type": "U", "net": "U", "layer": "U"}
+}
+# NumPy drops trailing NUL characters, so the marker must not end with one
+MISSING_TEXT = "\x00missing"
+
+# The parse cache is saved next to the board as a directory 
+# of .npy columns, e.g. board.kicad_pcb.parsed/pads.x.npy
+def parse_cache_path(file: str):
+  return file + ".parsed"
+
+# Returns the SHA-256 hash of the pcb file
+def file_hash(file: str):
+  import hashlib
+  digest = hashlib.sha256()
+  with open(file, 'rb') as pcbfile:
+    for chunk in iter(lambda: pcbfile.read(2**20), b""):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+# Converts a parsed board (see parse_board()) into NumPy columns,
+# keyed by "table.key" (see PARSE_CACHE_SCHEMA). 
+# Board outlines are stored as their kind plus up to 3 points per row,
+# and the copper layers as a single column of names.
+def board_to_columns(board: dict):
+  import numpy
+  nan = float("nan")
+  columns = dict()
+  ftpt_index = {id(item): i for i, item in enumerate(board["footprints"])}
+
+  for table, schema in PARSE_CACHE_SCHEMA.items():
+    items = board[table]
+    for key, kind in schema.items():
+      if (kind == "ref"):
+        column = numpy.array([ftpt_index[id(item[key])] for item in items], dtype="i8")
+      elif (kind == "U"):
+        column = numpy.array([str(item.get(key, MISSING_TEXT)) for item in items], dtype="U")
+      elif (kind == "3f8"):
+        column = numpy.array([item.get(key, (nan, nan, nan)) for item in items], dtype="f8").reshape(-1, 3)
+      else:
+        column = numpy.array([item.get(key, nan) for item in items], dtype="f8").astype(kind)
+      columns[table + "." + key] = column
+
+  columns["layers.name"] = numpy.array(board["layers"], dtype="U")
+  columns["outlines.kind"] = numpy.array([line[0] for line in board["outlines"]], dtype="U")
+  columns["outlines.points"] = numpy.array(
+    [list(map(float, line[1:])) + [nan] * (7 - len(line)) for line in board["outlines"]], dtype="f8").reshape(-1, 6)
+
+  # Zone rings are stored as the number of rings of each zone, the number of points
+  # of each ring, and the points of every ring one after another
+  rings = [ring for item in board["zones"] for ring in item["rings"]]
+  columns["zones.rings"] = numpy.array([len(item["rings"]) for item in board["zones"]], dtype="i8")
+  columns["zones.ring_sizes"] = numpy.array([len(ring) for ring in rings], dtype="i8")
+  columns["zones.points"] = numpy.array([point for ring in rings for point in ring], dtype="f8").reshape(-1, 2)
+  return columns
+
+# Converts NumPy columns (see board_to_columns()) back into a parsed board,
+# with the same dictionaries parse_board() returns. 
+# Numbers are returned as floats, where the parser may return strings.
+def columns_to_board(columns: dict):
+  board = new_board()
+  for table, schema in PARSE_CACHE_SCHEMA.items():
+    count = len(columns[table + "." + next(iter(schema))])
+    items = [dict() for i in range(count)]
+    for key, kind in schema.items():
+      values = columns[table + "." + key].tolist()
+      for item, value in zip(items, values):
+        if (kind == "ref"):
+          item[key] = board["footprints"][value]
+        elif (kind == "U"):
+          if (value != MISSING_TEXT):
+            item[key] = value
+        elif (kind == "3f8"):
+          if (value[0] == value[0]): # NaN marks a missing key
+            item[key] = tuple(value)
+        elif (value == value):
+          item[key] = value
+    board[table] = items
+
+  board["layers"] = columns["layers.name"].tolist()
+  for kind, points in zip(columns["outlines.kind"].tolist(), columns["outlines.points"].tolist()):
+    board["outlines"].append(tuple([kind] + [point for point in points if point == point]))
+
+  points = [tuple(point) for point in columns["zones.points"].tolist()]
+  sizes = iter(columns["zones.ring_sizes"].tolist())
+  start = 0
+  for item, count in zip(board["zones"], columns["zones.rings"].tolist()):
+    item["rings"] = list()
+    for i in range(count):
+      size = next(sizes)
+      item["rings"].append(points[start:start + size])
+      start = start + size
+  return board
+
+# Saves the parsed board as NumPy columns next to the board file, 
+# along with the file's size, modification time and hash.
+def save_parse_cache(file: str, board: dict):
+  import json
+  import numpy
+  path = parse_cache_path(file)
+  stat = os.stat(file)
+  columns = board_to_columns(board)
+  try:
+    os.makedirs(path, exist_ok=True)
+    for name, column in columns.items():
+      numpy.save(os.path.join(path, name + ".npy"), column)
+    meta = {
+      "version": PARSE_CACHE_VERSION,
+      "size": stat.st_size,
+      "mtime": stat.st_mtime,
+      "sha256": file_hash(file),
+      "model_dir": KICAD_3DMODEL_DIR,
+      "columns": list(columns)
+    }
+    # Written last, so that an interrupted save is never mistaken for a valid cache
+    with open(os.path.join(path, "meta.json"), 'w') as metafile:
+      json.dump(meta, metafile)
+  except OSError:
+    print("   Could not save parse cache to", path)
+
+# Loads the parse cache of the board as read-only NumPy columns, 
+# memory-mapped from disk without copying, keyed by "table.key".
+# Returns None if there is no cache, or if the board has changed since.
+# The hash is only checked when the modification time has changed.
+def load_parse_cache(file: str):
+  import json
+  import numpy
+  path = parse_cache_path(file)
+  try:
+    with open(os.path.join(path, "meta.json"), 'r') as metafile:
+      meta = json.load(metafile)
+  except (OSError, ValueError):
+    return None
+
+  stat = os.stat(file)
+  if (meta.get("version") != PARSE_CACHE_VERSION) or (meta.get("model_dir") != KICAD_3DMODEL_DIR):
+    return None
+  if (meta["size"] != stat.st_size):
+    return None
+  if (meta["mtime"] != stat.st_mtime):
+    if (meta["sha256"] != file_hash(file)):
+      return None
+    # Same content, only touched: remember the new time to skip hashing next time
+    meta["mtime"] = stat.st_mtime
+    try:
+      with open(os.path.join(path, "meta.json"), 'w') as metafile:
+        json.dump(meta, metafile)
+    except OSError:
+      pass
+
+  try:
+    return {name: numpy.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in meta["columns"]}
+  except (OSError, ValueError):
+    return None
+
+# Returns the cached parsed board (see parse_board()), 
+# or None if there is no valid cache for the board
+def load_cached_board(file: str):
+  columns = load_parse_cache(file)
+  if (columns is None):
+    return None
+  return columns_to_board(columns)
+
+#####################################################
+# Shape instancing
+#####################################################
+
+# Prototype shapes by kind and dimensions, see instance_shape()
+PROTOTYPES = dict()
+
+# Number of instances placed since the prototypes were last cleared
+INSTANCE_COUNT = 0
+
+# Builds the shape of a prototype at the origin, 
+# "cylinder" dimensions are (radius, height), "box" dimensions are (length, width, height)
+# and "stadium" dimensions are (length, width, height, rounded start, rounded end)
+def make_prototype(kind: str, dims: tuple):
+  match kind:
+    case "cylinder":
+      return Part.makeCylinder(*dims)
+    case "box":
+      return Part.makeBox(*dims)
+    case "stadium":
+      return make_stadium(*dims)
+
+# Returns a shape of the given kind and dimensions at the given placement.
+# Only one prototype is built for each distinct size, and every instance 
+# is a moved copy of it that shares its underlying geometry (TShape), 
+# so that vias, joints and pads of the same size cost one shape between them.
+def instance_shape(kind: str, dims: tuple, placement):
+  global INSTANCE_COUNT
+  key = (kind,) + tuple(round(float(dim), 6) for dim in dims)
+  prototype = PROTOTYPES.get(key)
+  if (prototype is None):
+    prototype = PROTOTYPES[key] = make_prototype(kind, key[1:])
+  INSTANCE_COUNT = INSTANCE_COUNT + 1
+  return prototype.moved(placement)
+
+# Instances of a cylinder standing upright at (x, y, z)
+def instance_cylinder(radius: float, height: float, x, y, z):
+  return instance_shape("cylinder", (radius, height), FreeCAD.Placement(FreeCAD.Vector(float(x), float(y), z), FreeCAD.Rotation()))
+
+# Prints how many instances were placed from how many prototypes, then forgets the prototypes.
+# Shapes already placed keep their geometry.
+# Returns the numbers of instances and prototypes, for callers to report them with 'quiet' set.
+def clear_prototypes(quiet: bool = False):
+  global INSTANCE_COUNT
+  counts = (INSTANCE_COUNT, len(PROTOTYPES))
+  if (INSTANCE_COUNT > 0) and (not quiet):
+    print("   Placed", INSTANCE_COUNT, "instances of", len(PROTOTYPES), "prototype shapes")
+  PROTOTYPES.clear()
+  INSTANCE_COUNT = 0
+  return counts
+
+#####################################################
+# Housing simplification
+#####################################################
+
+# Bump whenever simplify_housing() changes, so that old simplified models are rebuilt
+HOUSING_CACHE_VERSION = 1
+
+# Simplifies a 3D model for the fuse with the body. 
+# Faces split by the model's construction (splitter faces) are merged back together, 
+# and if a detail distance is given, solids further above the board than that 
+# (e.g. the top of a tall connector) are replaced by their bounding box, 
+# as only the part of the model near the board shapes the body around it.
+# Models made of shells only are just refined.
+def simplify_housing(shape, detail_distance: float = None):
+  if (len(shape.Solids) == 0):
+    return shape.removeSplitter()
+
+  solids = list()
+  for solid in shape.Solids:
+    box = solid.BoundBox
+    if (detail_distance is not None) and (box.ZMin > detail_distance):
+      solid = Part.makeBox(box.XLength, box.YLength, box.ZLength, FreeCAD.Vector(box.XMin, box.YMin, box.ZMin))
+    else:
+      solid = solid.removeSplitter()
+    solids.append(solid)
+
+  if (len(solids) == 1):
+    return solids[0]
+  return Part.makeCompound(solids)
+
+# Returns where the simplified version of a 3D model is saved, 
+# named after the model and a hash of its path, size, modification time and the simplification settings.
+# Returns None if the model cannot be found.
+def housing_cache_path(path: str):
+  import hashlib
+  try:
+    stat = os.stat(path)
+  except OSError:
+    return None
+  key = "|".join(map(str, (HOUSING_CACHE_VERSION, os.path.abspath(path), stat.st_size, stat.st_mtime, HOUSING_DETAIL_DISTANCE)))
+  digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+  return os.path.join(HOUSING_CACHE_DIR, os.path.splitext(os.path.basename(path))[0] + "_" + digest + ".brep")
+
+# Reads a 3D model. With SIMPLIFY_HOUSINGS, the simplified model is read instead, 
+# and is simplified and saved as a .brep file first if this has not been done yet.
+# The face counts before and after simplifying are printed.
+def read_housing(path: str):
+  if (not SIMPLIFY_HOUSINGS):
+    return Part.read(path)
+
+  cache = housing_cache_path(path)
+  if (cache is not None) and (os.path.exists(cache)):
+    return Part.read(cache)
+
+  shape = Part.read(path)
+  simplified = simplify_housing(shape, HOUSING_DETAIL_DISTANCE)
+  print("   Simplified", os.path.basename(path) + ":", len(shape.Faces), "->", len(simplified.Faces), "faces")
+  if (cache is not None):
+    try:
+      os.makedirs(HOUSING_CACHE_DIR, exist_ok=True)
+      simplified.exportBrep(cache)
+    except OSError:
+      print("   Could not save simplified model to", cache)
+  return simplified
+
+# Simplifies every 3D model used by the board ahead of time (see read_housing()),
+# so that later builds only read the simplified models.
+def preconvert_housings(file: str):
+  global SIMPLIFY_HOUSINGS
+  ftpt = list()
+  models = list()
+  assign_footprints(file, ftpt)
+  assign_models(file, ftpt, models)
+
+  simplify = SIMPLIFY_HOUSINGS
+  SIMPLIFY_HOUSINGS = True
+  try:
+    for path in sorted(set(item["path"] for item in models)):
+      read_housing(path)
+  finally:
+    SIMPLIFY_HOUSINGS = simplify
+
 # Grabs the PCB File from filesystem. 
 def get_pcb_file():
-    filename, filter = PySide2.QtWidgets.QFileDialog.getOpenFileName(filter="KiCad printed citcuit board files (*kicad_pcb)")
+    filename, filter = QtWidgets.QFileDialog.getOpenFileName(filter="KiCad printed citcuit board files (*kicad_pcb)")
     return filename
 
+# Returns the height of the bottom of the trace channels 
+# on the given copper layer. Unknown layers are treated as back copper.
+def layer_z(layer: str):
+  return LAYER_Z.get(layer, DEFAULT_BCU_Z)
+
+# Segment endpoints on the same layer closer than this are treated 
+# as one connection point, and only get one joint (mm)
+JOINT_TOLERANCE = 0.001
+
+# Helper Function to draw_traces() and make_trace_shapes(),
+# Records a segment endpoint in the 'joints' set, hashed by layer and 
+# position rounded to JOINT_TOLERANCE. Neighbouring cells are checked as well,
+# so that points just either side of a rounding boundary still match.
+# Returns True if no joint has been placed at this point yet.
+def is_new_joint(joints: set, x, y, layer: str):
+  cx = round(float(x) / JOINT_TOLERANCE)
+  cy = round(float(y) / JOINT_TOLERANCE)
+  for dx in (-1, 0, 1):
+    for dy in (-1, 0, 1):
+      if ((layer, cx + dx, cy + dy) in joints):
+        return False
+  joints.add((layer, cx, cy))
+  return True
+
 # Helper Function to draw_traces(),
 # Inserts 'joints' in the form of cylinders between
 # Trace 'blocks' to fill in the gaps so that trace segments 
-# Form one trace line without breaks and gaps
-def create_joint(name, x0, y0, x1, y1, wid, layer):
-  jointA = name + "A"
-  jointB = name + "B"
-  obj_cilA = DOC.addObject("PartDesign::AdditiveCylinder", jointA)
-  obj_cilA.Radius = wid/2
-  obj_cilA.Height = wid
-
-  obj_cilB = DOC.addObject("PartDesign::AdditiveCylinder", jointB)
-  obj_cilB.Radius = wid/2
-  obj_cilB.Height = wid
-
-  if (layer == "F.Cu"):
-    cir_locationA = FreeCAD.Vector(float(x0), float(y0), DEFAULT_FCU_Z)
-    cir_locationB = FreeCAD.Vector(float(x1), float(y1), DEFAULT_FCU_Z)
-  else:
-    cir_locationA = FreeCAD.Vector(float(x0), float(y0), DEFAULT_BCU_Z)
-    cir_locationB = FreeCAD.Vector(float(x1), float(y1), DEFAULT_BCU_Z)
+# Form one trace line without breaks and gaps.
+# Only the given ends ("A" at x0, y0 and "B" at x1, y1) get a joint,
+# and the names of the created joints are returned.
+def create_joint(name, x0, y0, x1, y1, wid, layer, ends=("A", "B")):
+  joint_names = list()
+  for suffix, x, y in (("A", x0, y0), ("B", x1, y1)):
+    if (suffix in ends):
+      obj_cil = DOC.addObject("PartDesign::AdditiveCylinder", name + suffix)
+      obj_cil.Radius = wid/2
+      obj_cil.Height = wid
+      obj_cil.Placement.Base = FreeCAD.Vector(float(x), float(y), layer_z(layer))
+      joint_names.append(name + suffix)
+  return joint_names
+
+# Helper Function to create_trace(),
+# Finds the placement of a trace box from its starting point and orientation.
+# The box is shifted by half of its width so that it is centered on the trace.
+def trace_placement(wid, x0, y0, layer, orientation):
+    z = layer_z(layer)
+    diag = (wid/2) / math.sqrt(2)
+    match orientation:
+      case "N":
+        rot = FreeCAD.Rotation(90, 0, 0)
+        location = FreeCAD.Vector(float(x0) + (wid/2), float(y0), z)
+      case "S":
+        rot = FreeCAD.Rotation(-90, 0, 0)
+        location = FreeCAD.Vector(float(x0) - (wid/2), float(y0), z)
+      case "E":
+        rot = FreeCAD.Rotation(0, 0, 0)
+        location = FreeCAD.Vector(float(x0), float(y0) - (wid/2), z)
+      case "W":
+        rot = FreeCAD.Rotation(180, 0, 0)
+        location = FreeCAD.Vector(float(x0), float(y0) + (wid/2), z)
+      case "NE":
+        rot = FreeCAD.Rotation(45, 0, 0) 
+        location = FreeCAD.Vector(float(x0) + diag, float(y0) - diag, z)
+      case "NW":
+        rot = FreeCAD.Rotation(135, 0, 0)
+        location = FreeCAD.Vector(float(x0) + diag, float(y0) + diag, z)
+      case "SW":
+        rot = FreeCAD.Rotation(225, 0, 0)
+        location = FreeCAD.Vector(float(x0) - diag, float(y0) + diag, z)
+      case "SE":
+        rot = FreeCAD.Rotation(315, 0, 0)
+        location = FreeCAD.Vector(float(x0) - diag, float(y0) - diag, z)
+      case _:
+        # Any other direction, given as an angle in degrees (see measure_trace())
+        angle = math.radians(orientation)
+        rot = FreeCAD.Rotation(orientation, 0, 0)
+        location = FreeCAD.Vector(float(x0) + (wid/2) * math.sin(angle), float(y0) - (wid/2) * math.cos(angle), z)
 
-  obj_cilA.Placement.Base = cir_locationA
-  obj_cilB.Placement.Base = cir_locationB
+    return FreeCAD.Placement(location, rot)
 
 # Helper Function to draw_traces(),
 # Creates Traces in the form of long rectangular boxes. 
@@ -568,78 +1447,361 @@ def create_trace(name, len, wid, hei, x0, y0, layer, orientation):
     obj_box.Height = hei
 
     # Rotate the created trace here...
-    match orientation:
-      case "N":
-        rot = Rotation(90, 0, 0)
-        if (layer == "F.Cu"):
-          location = FreeCAD.Vector(float(x0) + (wid/2), float(y0), DEFAULT_FCU_Z)   
-        else:
-          location = FreeCAD.Vector(float(x0) + (wid/2), float(y0), DEFAULT_BCU_Z)
-      case "S":
-        rot = Rotation(-90, 0, 0)
-        if (layer == "F.Cu"):
-          location = FreeCAD.Vector(float(x0) - (wid/2), float(y0), DEFAULT_FCU_Z)
-        else:
-          location = FreeCAD.Vector(float(x0) - (wid/2), float(y0), DEFAULT_BCU_Z)
-      case "E":
-        rot = Rotation(0, 0, 0)
-        if (layer == "F.Cu"):
-          location = FreeCAD.Vector(float(x0), float(y0) - (wid/2), DEFAULT_FCU_Z)
-        else:
-          location = FreeCAD.Vector(float(x0), float(y0) - (wid/2), DEFAULT_BCU_Z)
-      case "W":
-        rot = Rotation(180, 0, 0)
-        if (layer == "F.Cu"):
-          location = FreeCAD.Vector(float(x0), float(y0) + (wid/2), DEFAULT_FCU_Z)
-        else:
-          location = FreeCAD.Vector(float(x0), float(y0) + (wid/2), DEFAULT_BCU_Z)
-      case "NE":
-        rot = Rotation(45, 0, 0) 
-        if (layer == "F.Cu"):
-          location = FreeCAD.Vector(float(x0) + ((wid/2) / math.sqrt(2)), float(y0) - ((wid/2) / math.sqrt(2)), DEFAULT_FCU_Z)
-        else:
-          location = FreeCAD.Vector(float(x0) + ((wid/2) / math.sqrt(2)), float(y0) - ((wid/2) / math.sqrt(2)), DEFAULT_BCU_Z)
-      case "NW":
-        rot = Rotation(135, 0, 0)
-        if (layer == "F.Cu"):
-          location = FreeCAD.Vector(float(x0) + ((wid/2) / math.sqrt(2)), float(y0) + ((wid/2) / math.sqrt(2)), DEFAULT_FCU_Z)
-        else:
-          location = FreeCAD.Vector(float(x0) + ((wid/2) / math.sqrt(2)), float(y0) + ((wid/2) / math.sqrt(2)), DEFAULT_BCU_Z)
-      case "SW":
-        rot = Rotation(225, 0, 0)
-        if (layer == "F.Cu"):
-          location = FreeCAD.Vector(float(x0) - ((wid/2) / math.sqrt(2)), float(y0) + ((wid/2) / math.sqrt(2)), DEFAULT_FCU_Z)
-        else:
-          location = FreeCAD.Vector(float(x0) - ((wid/2) / math.sqrt(2)), float(y0) + ((wid/2) / math.sqrt(2)), DEFAULT_BCU_Z)
-      case "SE":
-        rot = Rotation(315, 0, 0)
-        if (layer == "F.Cu"):
-          location = FreeCAD.Vector(float(x0) - ((wid/2) / math.sqrt(2)), float(y0) - ((wid/2) / math.sqrt(2)), DEFAULT_FCU_Z)
-        else:
-          location = FreeCAD.Vector(float(x0) - ((wid/2) / math.sqrt(2)), float(y0) - ((wid/2) / math.sqrt(2)), DEFAULT_BCU_Z)
-
-    obj_box.Placement.Base = location
-    obj_box.Placement.Rotation = rot
+    obj_box.Placement = trace_placement(wid, x0, y0, layer, orientation)
 
     return obj_box
 
-# Helper Function to draw_traces()
-# TODO: This only supports double layer boards,
-# where it assumes there is only F and B layers 
-# when connecting the traces with a via
-def create_via(name, x, y, size):
-  obj_via = DOC.addObject("Part::Cylinder", name)
-  obj_via.Radius = float(size)/2
-  obj_via.Height = abs(DEFAULT_FCU_Z) + abs(DEFAULT_BCU_Z) + DEFAULT_TRACE_HEIGHT
+# Direction of each trace orientation in degrees (see measure_trace())
+ORIENTATION_ANGLES = {"E": 0, "NE": 45, "N": 90, "NW": 135, "W": 180, "SW": 225, "S": -90, "SE": 315}
+
+# Helper Function to create_stadium() and make_trace_shapes(),
+# Builds a trace segment of the given length as one solid, extruded from a stadium (slot) 
+# shaped profile running along +x from the origin and centered on its width.
+# The start and end are rounded if 'cap_a' and 'cap_b' are set, and flat otherwise,
+# so that a point shared by several segments is only rounded once (see is_new_joint()).
+# The rounded end of the first segment and its box cover the whole joint,
+# so the flat ends of the other segments meeting there leave no gaps.
+def make_stadium(length, width, height, cap_a=True, cap_b=True):
+  r = width / 2
+  V = FreeCAD.Vector
+  edges = [Part.LineSegment(V(0, -r, 0), V(length, -r, 0)).toShape()]
+  if (cap_b):
+    edges.append(Part.Arc(V(length, -r, 0), V(length + r, 0, 0), V(length, r, 0)).toShape())
+  else:
+    edges.append(Part.LineSegment(V(length, -r, 0), V(length, r, 0)).toShape())
+  edges.append(Part.LineSegment(V(length, r, 0), V(0, r, 0)).toShape())
+  if (cap_a):
+    edges.append(Part.Arc(V(0, r, 0), V(-r, 0, 0), V(0, -r, 0)).toShape())
+  else:
+    edges.append(Part.LineSegment(V(0, r, 0), V(0, -r, 0)).toShape())
+  return Part.Face(Part.Wire(edges)).extrude(V(0, 0, height))
+
+# Returns a trace segment as an instanced stadium shape (see make_stadium()), 
+# starting at (x0, y0) and running in the given orientation.
+# Only the ends listed in 'ends' ("A" at the start, "B" at the end) are rounded.
+def stadium_shape(len, x0, y0, layer, orientation, ends):
+  angle = ORIENTATION_ANGLES.get(orientation, orientation)
+  placement = FreeCAD.Placement(FreeCAD.Vector(float(x0), float(y0), layer_z(layer)), FreeCAD.Rotation(angle, 0, 0))
+  dims = (len, DEFAULT_TRACE_WIDTH, DEFAULT_TRACE_HEIGHT, "A" in ends, "B" in ends)
+  return instance_shape("stadium", dims, placement)
 
-  cir_location = FreeCAD.Vector(float(x), float(y), DEFAULT_FCU_Z)
-  obj_via.Placement.Base = cir_location
+# Helper Function to draw_traces(),
+# Creates a trace segment as one stadium shaped solid, see STADIUM_TRACES
+def create_stadium(name, len, x0, y0, layer, orientation, ends):
+  obj_trace = DOC.addObject("Part::Feature", name)
+  obj_trace.Shape = stadium_shape(len, x0, y0, layer, orientation, ends)
+  return obj_trace
+
+# Helper Function to assign_segments(),
+# Returns how far the mid point of an arc track lies off its chord
+def arc_bulge(item):
+  x0, y0 = float(item["x0"]), float(item["y0"])
+  xm, ym = float(item["xm"]), float(item["ym"])
+  x1, y1 = float(item["x1"]), float(item["y1"])
+  chord = math.hypot(x1 - x0, y1 - y0)
+  if (chord == 0):
+    return math.hypot(xm - x0, ym - y0)
+  return abs(((x1 - x0) * (ym - y0)) - ((y1 - y0) * (xm - x0))) / chord
+
+# Returns the circle an arc track runs along, through its start, mid and end point,
+# as (center x, center y, radius, angle of the start, angle swept), 
+# angles in radians and counterclockwise sweeps positive.
+def arc_geometry(item):
+  x0, y0 = float(item["x0"]), float(item["y0"])
+  xm, ym = float(item["xm"]), float(item["ym"])
+  x1, y1 = float(item["x1"]), float(item["y1"])
+  d = 2 * ((x0 * (ym - y1)) + (xm * (y1 - y0)) + (x1 * (y0 - ym)))
+  s0, sm, s1 = (x0**2 + y0**2), (xm**2 + ym**2), (x1**2 + y1**2)
+  cx = ((s0 * (ym - y1)) + (sm * (y1 - y0)) + (s1 * (y0 - ym))) / d
+  cy = ((s0 * (x1 - xm)) + (sm * (x0 - x1)) + (s1 * (xm - x0))) / d
+  radius = math.hypot(x0 - cx, y0 - cy)
+
+  start = math.atan2(y0 - cy, x0 - cx)
+  to_mid = (math.atan2(ym - cy, xm - cx) - start) % (2 * math.pi)
+  to_end = (math.atan2(y1 - cy, x1 - cx) - start) % (2 * math.pi)
+  # Counterclockwise if the mid point comes first going counterclockwise
+  sweep = to_end if (to_mid <= to_end) else to_end - (2 * math.pi)
+  return cx, cy, radius, start, sweep
+
+# Length of an arc track along its center line
+def arc_length(item):
+  cx, cy, radius, start, sweep = arc_geometry(item)
+  return radius * abs(sweep)
+
+# Builds an arc track as one solid at the bottom of its layer's channels, 
+# swept along its true circular arc: the ring sector between two arcs half 
+# a trace width either side of the center line, extruded to the trace height.
+# The arcs are built from three points each, like the arcs of the board outline (see make_body_shape()).
+# Ends listed in 'ends' ("A" at the start, "B" at the end) are rounded as in make_stadium(), the others are flat.
+# Arcs tighter than the trace width are split into straight segments beforehand (see split_tight_arcs()).
+def make_arc_track(item, ends=()):
+  cx, cy, radius, start, sweep = arc_geometry(item)
+  r = DEFAULT_TRACE_WIDTH / 2
+  direction = math.copysign(1, sweep)
+
+  def point(angle, distance):
+    return FreeCAD.Vector(cx + distance * math.cos(angle), cy + distance * math.sin(angle), 0)
+
+  # Rounded end around the center line point at 'angle', bulging along 'heading' 
+  def cap(angle, heading, first, last):
+    tip = point(angle, radius) + FreeCAD.Vector(-math.sin(angle), math.cos(angle), 0) * (r * heading)
+    return Part.Arc(first, tip, last).toShape()
+
+  angles = (start, start + sweep/2, start + sweep)
+  edges = [Part.Arc(*[point(angle, radius + r) for angle in angles]).toShape()]
+  if ("B" in ends):
+    edges.append(cap(angles[2], direction, point(angles[2], radius + r), point(angles[2], radius - r)))
+  else:
+    edges.append(Part.LineSegment(point(angles[2], radius + r), point(angles[2], radius - r)).toShape())
+  edges.append(Part.Arc(*[point(angle, radius - r) for angle in reversed(angles)]).toShape())
+  if ("A" in ends):
+    edges.append(cap(angles[0], -direction, point(angles[0], radius - r), point(angles[0], radius + r)))
+  else:
+    edges.append(Part.LineSegment(point(angles[0], radius - r), point(angles[0], radius + r)).toShape())
+
+  track = Part.Face(Part.Wire(edges)).extrude(FreeCAD.Vector(0, 0, DEFAULT_TRACE_HEIGHT))
+  track.Placement = FreeCAD.Placement(FreeCAD.Vector(0, 0, layer_z(item["layer"])), FreeCAD.Rotation())
+  return track
+
+# Helper Function to draw_traces() and make_trace_shapes(),
+# Returns which ends of a trace ("A" at x0, y0 and "B" at x1, y1) get a joint,
+# as points shared with an earlier trace already have one (see is_new_joint()),
+# and the number of ends that were shared.
+# With 'dedup' off, every end gets a joint (see DEDUP_REGULAR_JOINTS).
+def joint_ends(joints: set, item, dedup: bool = True):
+  ends = list()
+  shared = 0
+  for suffix, x, y in (("A", item["x0"], item["y0"]), ("B", item["x1"], item["y1"])):
+    if (not dedup) or (is_new_joint(joints, x, y, item["layer"])):
+      ends.append(suffix)
+    else:
+      shared = shared + 1
+  return ends, shared
+
+# Helper Function to draw_traces(),
+# Creates an arc track (see make_arc_track()). Unless STADIUM_TRACES rounds its ends, 
+# joints are created as separate cylinders on the ends given in 'ends'.
+# Returns the names of the created objects.
+def create_arc_track(name, item, ends):
+  obj_arc = DOC.addObject("Part::Feature", name)
+  if (STADIUM_TRACES):
+    obj_arc.Shape = make_arc_track(item, ends)
+    return [name]
+
+  obj_arc.Shape = make_arc_track(item)
+  names = [name]
+  for suffix, x, y in (("A", item["x0"], item["y0"]), ("B", item["x1"], item["y1"])):
+    if (suffix in ends):
+      obj_joint = DOC.addObject("Part::Feature", name + "_joint" + suffix)
+      obj_joint.Shape = instance_cylinder(DEFAULT_TRACE_WIDTH/2, DEFAULT_TRACE_WIDTH, x, y, layer_z(item["layer"]))
+      names.append(name + "_joint" + suffix)
+  return names
+
+# Returns the bottom and the height of a via, spanning from the bottom 
+# of the channels on its lower layer to the top of the channels on its upper layer.
+# Vias without a layer pair go through every layer.
+def via_span(item):
+  z0 = layer_z(item.get("from_layer", "F.Cu"))
+  z1 = layer_z(item.get("to_layer", "B.Cu"))
+  return min(z0, z1), abs(z1 - z0) + DEFAULT_TRACE_HEIGHT
+
+# Helper Function to draw_traces(),
+# Vias of the same size share one instanced cylinder (see instance_shape()).
+def create_via(name, x, y, size, bottom, height):
+  obj_via = DOC.addObject("Part::Feature", name)
+  obj_via.Shape = instance_cylinder(float(size)/2, height, x, y, bottom)
+
+# Helper Function to draw_traces(),
+# Finds the length and orientation of a trace segment
+def measure_trace(item):
+  x0 = float(item["x0"])
+  x1 = float(item["x1"])
+  y0 = float(item["y0"])
+  y1 = float(item["y1"])
+
+  x = (x1 - x0) ** 2
+  y = (y1 - y0) ** 2
+  len = round(math.sqrt(x + y), 4)
+  
+  # Need to figure out orientation of the trace! 
+  # Fortunately, orientation is mostly limited to N,S,E,W, and the 45's.
+  # Traces at any other angle (e.g. after absorb_stubs()) are given by their angle in degrees.
+  if (x0 != x1) and (y0 != y1) and (abs(abs(x1 - x0) - abs(y1 - y0)) > JOINT_TOLERANCE):
+    return len, math.degrees(math.atan2(y1 - y0, x1 - x0))
+
+  if (x0 == x1): # Vertical, N or S
+    if (y0 < y1):
+      orientation = 'N'
+    else:
+      orientation = 'S'
+  elif (y0 == y1): # Horizontal, E or W
+    if (x0 < x1):
+      orientation = 'E'
+    else:
+      orientation = 'W'
+  elif (x0 < x1) and (y0 < y1):
+    orientation = 'NE'
+  elif (x0 < x1) and (y0 > y1):
+    orientation = 'SE'
+  elif (x0 > x1) and (y0 < y1):
+    orientation = 'NW'
+  else:
+    orientation = "SW"
+
+  return len, orientation
+
+# Helper Function to simplify_segments(),
+# Returns the key of a segment endpoint, rounded to JOINT_TOLERANCE
+def point_key(x, y):
+  return (round(float(x) / JOINT_TOLERANCE), round(float(y) / JOINT_TOLERANCE))
+
+# Helper Function to simplify_segments(),
+# Returns the endpoints of a segment as [(x0, y0), (x1, y1)]
+def segment_ends(item):
+  return [(float(item["x0"]), float(item["y0"])), (float(item["x1"]), float(item["y1"]))]
+
+# Helper Function to simplify_segments(),
+# Returns the segments of a group with their new endpoints, 
+# copying only the segments whose endpoints were changed
+def moved_segments(group: list, ends: dict):
+  moved = list()
+  for i, item in enumerate(group):
+    if (i not in ends):
+      continue
+    if (ends[i] == segment_ends(item)):
+      moved.append(item)
+    else:
+      (x0, y0), (x1, y1) = ends[i]
+      moved.append(dict(item, x0=x0, y0=y0, x1=x1, y1=y1))
+  return moved
+
+# Helper Function to simplify_segments(),
+# Merges segments of one net and layer that continue each other in a straight line, 
+# i.e. that meet at a point no other segment of the group reaches and point in opposite directions from it.
+# Returns the merged group and the number of merges.
+def coalesce_segments(group: list):
+  ends = {i: segment_ends(item) for i, item in enumerate(group)}
+  at = dict()
+  for i, (p0, p1) in ends.items():
+    if (point_key(*p0) != point_key(*p1)):
+      at.setdefault(point_key(*p0), set()).add(i)
+      at.setdefault(point_key(*p1), set()).add(i)
+
+  merged = 0
+  for key, ids in at.items():
+    if (len(ids) != 2):
+      continue
+    i, j = ids
+    if (float(group[i]["width"]) != float(group[j]["width"])):
+      continue
+
+    # Shared point, and the far end of each segment from it
+    ei = 1 if (point_key(*ends[i][1]) == key) else 0
+    ej = 1 if (point_key(*ends[j][1]) == key) else 0
+    shared = ends[i][ei]
+    far_i = ends[i][1 - ei]
+    far_j = ends[j][1 - ej]
+
+    ax, ay = far_i[0] - shared[0], far_i[1] - shared[1]
+    bx, by = far_j[0] - shared[0], far_j[1] - shared[1]
+    cross = (ax * by) - (ay * bx)
+    dot = (ax * bx) + (ay * by)
+    if (abs(cross) > 1e-6 * math.hypot(ax, ay) * math.hypot(bx, by)) or (dot >= 0):
+      continue
+
+    # j is merged into i, keeping the direction of i
+    ends[i][ei] = far_j
+    del ends[j]
+    ids.clear()
+    at[point_key(*far_j)].discard(j)
+    at[point_key(*far_j)].add(i)
+    merged = merged + 1
+
+  return moved_segments(group, ends), merged
+
+# Helper Function to simplify_segments(),
+# Absorbs segments shorter than MINIMUM_TRACE_LENGTH into the segments connected to them,
+# instead of leaving a gap in the channel where they are skipped:
+# the segments reaching one end of the stub are extended to its other end, 
+# preferring the end that is not connected to anything else (e.g. the end on a pad).
+# Stubs not connected to any other segment are left for the generator to skip.
+# Returns the remaining group and the number of absorbed stubs.
+def absorb_stubs(group: list):
+  ends = {i: segment_ends(item) for i, item in enumerate(group)}
+  absorbed = 0
+  for i in range(len(group)):
+    (x0, y0), (x1, y1) = ends[i]
+    if (math.hypot(x1 - x0, y1 - y0) >= MINIMUM_TRACE_LENGTH):
+      continue
+
+    start, end = ends[i]
+    at_start = [(j, k) for j in ends if (j != i) for k in (0, 1) if point_key(*ends[j][k]) == point_key(*start)]
+    at_end = [(j, k) for j in ends if (j != i) for k in (0, 1) if point_key(*ends[j][k]) == point_key(*end)]
+    if (len(at_start) == 0) and (len(at_end) == 0):
+      continue
+
+    if (len(at_end) > 0):
+      move, to = at_end, start
+    else:
+      move, to = at_start, end
+    for j, k in move:
+      ends[j][k] = to
+    del ends[i]
+    absorbed = absorbed + 1
+
+  return moved_segments(group, ends), absorbed
+
+# Arc tracks tighter than the trace width cannot be swept (see make_arc_track()), 
+# so they are replaced by the two segments through their mid point.
+# Every other item is kept as it is.
+def split_tight_arcs(segs: list):
+  split = list()
+  for item in segs:
+    if (item["type"] == "arc") and (arc_geometry(item)[2] <= DEFAULT_TRACE_WIDTH / 2):
+      for start, end in (("0", "m"), ("m", "1")):
+        split.append({"type": "segment", "x0": item["x" + start], "y0": item["y" + start], "x1": item["x" + end], "y1": item["y" + end], 
+                      "width": item["width"], "layer": item["layer"], "net": item.get("net")})
+    else:
+      split.append(item)
+  return split
+
+# Simplifies the trace segments before any geometry is generated:
+# straight runs split into several collinear segments are merged into one,
+# and short stubs are absorbed into their neighbours (see absorb_stubs()).
+# Only segments of the same net and layer are combined. 
+# Tight arc tracks are split into segments first (see split_tight_arcs()).
+# Returns the simplified segments, followed by the arc tracks and vias.
+def simplify_segments(segs: list):
+  groups = dict()
+  others = list()
+  for item in split_tight_arcs(segs):
+    if (item["type"] == "segment"):
+      groups.setdefault((item.get("net"), item["layer"]), list()).append(item)
+    else:
+      others.append(item)
+
+  traces = list()
+  merged = 0
+  absorbed = 0
+  for group in groups.values():
+    group, count = coalesce_segments(group)
+    merged = merged + count
+    group, count = absorb_stubs(group)
+    absorbed = absorbed + count
+    traces.extend(group)
+
+  if (merged > 0) or (absorbed > 0):
+    print("   Merged", merged, "collinear segments and absorbed", absorbed, "short stubs,", 
+          len(segs) - len(others), "->", len(traces), "segments")
+  return traces + others
 
 # Function to implement anything trace related
 # Calls functions to draw trace segments, trace joints, and vias
 def draw_traces(segs: list, ftpt: list):
   cnt = 1
   trace_names = list()
+  joints = set()
+  removed = 0
   for item in segs:
     if (item["type"] == "segment"):
       trace_name = "trace_seg" + str(cnt)
@@ -649,31 +1811,7 @@ def draw_traces(segs: list, ftpt: list):
       x1 = float(item["x1"])
       y0 = float(item["y0"])
       y1 = float(item["y1"])
-
-      x = (x1 - x0) ** 2
-      y = (y1 - y0) ** 2
-      len = round(math.sqrt(x + y), 4)
-      
-      # Need to figure out orientation of the trace! 
-      # Fortunately, orientation is limited to N,S,E,W, and the 45's
-      if (x0 == x1): # Vertical, N or S
-        if (y0 < y1):
-          orientation = 'N'
-        else:
-          orientation = 'S'
-      elif (y0 == y1): # Horizontal, E or W
-        if (x0 < x1):
-          orientation = 'E'
-        else:
-          orientation = 'W'
-      elif (x0 < x1) and (y0 < y1):
-        orientation = 'NE'
-      elif (x0 < x1) and (y0 > y1):
-        orientation = 'SE'
-      elif (x0 > x1) and (y0 < y1):
-        orientation = 'NW'
-      else:
-        orientation = "SW"
+      len, orientation = measure_trace(item)
 
       # print("Ort:", orientation)
 
@@ -686,95 +1824,180 @@ def draw_traces(segs: list, ftpt: list):
         # create_trace(trace_name, len, float(item["width"]), float(item["width"]), x0, y0, item["layer"], orientation)
         # create_joint(joint_name, x0, y0, x1, y1, float(item["width"]), item["layer"])
 
-        # Currently using global values as trace width & height
-        create_trace(trace_name, len, DEFAULT_TRACE_WIDTH, DEFAULT_TRACE_HEIGHT, x0, y0, item["layer"], orientation)
-        create_joint(joint_name, x0, y0, x1, y1, DEFAULT_TRACE_WIDTH, item["layer"])
+        # Points shared with an earlier segment already have a joint
+        ends, shared = joint_ends(joints, item, DEDUP_REGULAR_JOINTS)
+        removed = removed + shared
 
-        # Combines each trace segment with their 2 joints on each end into 
-        # one PartDesign body to speed up boolean operation
-        bodyname = trace_name + "_body"
-        DOC.addObject("PartDesign::Body", bodyname)
-        DOC.getObject(bodyname).addObject(DOC.getObject(trace_name))
-        DOC.getObject(bodyname).addObject(DOC.getObject(str(joint_name + "A")))
-        DOC.getObject(bodyname).addObject(DOC.getObject(str(joint_name + "B")))
-        DOC.recompute()
-        trace_names.append(bodyname)
+        if (STADIUM_TRACES):
+          create_stadium(trace_name, len, x0, y0, item["layer"], orientation, ends)
+          trace_names.append(trace_name)
+        else:
+          # Currently using global values as trace width & height
+          create_trace(trace_name, len, DEFAULT_TRACE_WIDTH, DEFAULT_TRACE_HEIGHT, x0, y0, item["layer"], orientation)
+          joint_names = create_joint(joint_name, x0, y0, x1, y1, DEFAULT_TRACE_WIDTH, item["layer"], ends)
+
+          # Combines each trace segment with the joints on its ends into 
+          # one PartDesign body to speed up boolean operation
+          bodyname = trace_name + "_body"
+          DOC.addObject("PartDesign::Body", bodyname)
+          DOC.getObject(bodyname).addObject(DOC.getObject(trace_name))
+          for name in joint_names:
+            DOC.getObject(bodyname).addObject(DOC.getObject(name))
+          DOC.recompute()
+          trace_names.append(bodyname)
+
+    elif (item["type"] == "arc"):
+      if (arc_length(item) < MINIMUM_TRACE_LENGTH):
+        print("   Arc len:", arc_length(item), " is too short, skipping")
+      else:
+        ends, shared = joint_ends(joints, item, DEDUP_REGULAR_JOINTS)
+        removed = removed + shared
+        trace_names.extend(create_arc_track("trace_arc" + str(cnt), item, ends))
 
     elif (item["type"] == "via"): 
       via_name = "via_net_" + str(cnt)
       trace_names.append(via_name)
-      create_via(via_name, item["x"], item["y"], item["size"])
+      bottom, height = via_span(item)
+      create_via(via_name, item["x"], item["y"], item["size"], bottom, height)
 
     cnt = cnt + 1
     if (cnt % REFRESH_RATE == 0) and (MOVIE_EFFECT):
       set_view()
+
+  if (removed > 0):
+    print("   Removed", removed, "duplicate joints at shared segment endpoints")
   return trace_names
 
-# Helper function to draw_pads(), 
-# Draws the pads for SMD components
-def draw_smd_pad(name: str, item, x: float, y: float, r: float, layer: str):
+# Helper function to draw_smd_pad(),
+# Finds the placement of the pad box of an SMD component
+def smd_pad_placement(item, x: float, y: float, layer: str):
   if (layer == "F.Cu"):
     pad_loc = FreeCAD.Vector(x, y, DEFAULT_FCU_Z - DEFAULT_PAD_HEIGHT)
   else: 
     pad_loc = FreeCAD.Vector(x, y, DEFAULT_BCU_Z + DEFAULT_TRACE_HEIGHT)
-  pad_rot = Rotation(int(item["r"]), 0, 0)
+  pad_rot = FreeCAD.Rotation(int(item["r"]), 0, 0)
 
   # TODO: All SMD Pads have been roundrect or rect so far... 
-  if (item["padtype"] == "roundrect") or (item["padtype"] == "rect"):
-    obj_pad = DOC.addObject("Part::Box", name)
-
-    # obj_pad.Length = float(item["padx"])
-    # obj_pad.Width = float(item["pady"])
-    # Using trace width x height, instead of pad dimension data
-    obj_pad.Length = DEFAULT_TRACE_WIDTH * 1.05
-    obj_pad.Width = DEFAULT_TRACE_HEIGHT * 1.05
-    
-    obj_pad.Height = DEFAULT_PAD_HEIGHT
-  else:
+  if (item["padtype"] != "roundrect") and (item["padtype"] != "rect"):
     print("Unsupported SMD Pad Shape: ", item["padtype"])
     sys.exit(1)
 
-  obj_pad.Placement.Base = pad_loc
-  obj_pad.Placement.Rotation = pad_rot
+  return FreeCAD.Placement(pad_loc, pad_rot)
 
 # Helper function to draw_pads(), 
-# Draws the pads for through hole components
-def draw_thru_hole_pad(name: str, item, plx: float, ply: float, r: float, layer: str):
+# Draws the pads for SMD components
+def draw_smd_pad(name: str, item, x: float, y: float, r: float, layer: str):
+  placement = smd_pad_placement(item, x, y, layer)
+  obj_pad = DOC.addObject("Part::Box", name)
+
+  # obj_pad.Length = float(item["padx"])
+  # obj_pad.Width = float(item["pady"])
+  # Using trace width x height, instead of pad dimension data
+  obj_pad.Length = DEFAULT_TRACE_WIDTH * 1.05
+  obj_pad.Width = DEFAULT_TRACE_HEIGHT * 1.05
   
-  pad_rot = Rotation(int(item["r"]), 0, 0)
+  obj_pad.Height = DEFAULT_PAD_HEIGHT
 
-  # Both throughhole types make a circular hole, 
-  # regardless of the Pad shape. 
-  if (item["padtype"] == "oval") or (item["padtype"] == "circle"):
-    obj_pad = DOC.addObject("Part::Cylinder", name)
-    obj_pad.Radius = float(item["drill"])/2 * (1.2) # 20% oversize to account for 3D printing & fitting
+  obj_pad.Placement = placement
 
-    if (layer == "F.Cu"):
-      pad_loc = FreeCAD.Vector(plx, ply, DEFAULT_BCU_Z + DEFAULT_TRACE_HEIGHT)
-      obj_pad.Height = DEFAULT_THRUHOLE_HEIGHT
-      pad_rot = Rotation(0, 0, 180)
-    else:
-      pad_loc = FreeCAD.Vector(plx, ply, DEFAULT_FCU_Z)
-      obj_pad.Height = DEFAULT_THRUHOLE_HEIGHT
-    
-  elif (item["padtype"] == "rect"):
-    obj_pad = DOC.addObject("Part::Cylinder", name)
-    obj_pad.Radius = float(item["drill"])/2 * (1.2) # 20% oversize to account for 3D printing & fitting
+# Helper function to draw_thru_hole_pad(),
+# Finds the placement of the hole of a through hole component
+def thru_hole_pad_placement(item, plx: float, ply: float, layer: str):
+  pad_rot = FreeCAD.Rotation(int(item["r"]), 0, 0)
 
+  # Both throughhole types make a circular hole, 
+  # regardless of the Pad shape. 
+  if (item["padtype"] == "oval") or (item["padtype"] == "circle") or (item["padtype"] == "rect"):
     if (layer == "F.Cu"):
       pad_loc = FreeCAD.Vector(plx, ply, DEFAULT_BCU_Z + DEFAULT_TRACE_HEIGHT)
-      obj_pad.Height = DEFAULT_THRUHOLE_HEIGHT
-      pad_rot = Rotation(0, 0, 180)
+      pad_rot = FreeCAD.Rotation(0, 0, 180)
     else:
       pad_loc = FreeCAD.Vector(plx, ply, DEFAULT_FCU_Z)
-      obj_pad.Height = DEFAULT_THRUHOLE_HEIGHT
 
   else:
     print("Unsupported Thru_Hole Pad Shape: ", item["padtype"])
     sys.exit(1)
 
-  obj_pad.Placement.Base = pad_loc
-  obj_pad.Placement.Rotation = pad_rot
+  return FreeCAD.Placement(pad_loc, pad_rot)
+
+# Helper function to draw_pads(), 
+# Draws the pads for through hole components.
+# Pads of the same drill size share one instanced cylinder (see instance_shape()).
+def draw_thru_hole_pad(name: str, item, plx: float, ply: float, r: float, layer: str):
+  placement = thru_hole_pad_placement(item, plx, ply, layer)
+
+  obj_pad = DOC.addObject("Part::Feature", name)
+  radius = float(item["drill"])/2 * (1.2) # 20% oversize to account for 3D printing & fitting
+  obj_pad.Shape = instance_shape("cylinder", (radius, DEFAULT_THRUHOLE_HEIGHT), placement)
+
+# Helper function to draw_pads(),
+# Finds the absolute location of a pad from its footprint's
+# location and rotation.
+def pad_location(item):
+  footpt = item["footprint"]
+  # xdim = float(item["padx"])
+  # ydim = float(item["pady"])
+  xdim = DEFAULT_TRACE_WIDTH
+  ydim = DEFAULT_TRACE_HEIGHT
+  
+  ##################################################    
+  # Pad orientation adjustments for top side pads
+  ##################################################    
+  if (footpt["layer"] == "F.Cu"): 
+    if (int(item["r"]) == 90):
+      plx = float(footpt["x"]) + float(item["y"])
+      ply = float(footpt["y"]) - float(item["x"])
+      if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
+        plx = plx + ydim/2
+        ply = ply - xdim/2
+    elif (int(item["r"]) == 270) or (int(item["r"]) == -90):
+      plx = float(footpt["x"]) - float(item["y"])
+      ply = float(footpt["y"]) + float(item["x"])
+      if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
+        plx = plx - ydim/2
+        ply = ply + xdim/2
+    elif (int(item["r"]) == 0):
+      plx = float(footpt["x"]) + float(item["x"])
+      ply = float(footpt["y"]) + float(item["y"])
+      if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
+        plx = plx - xdim/2
+        ply = ply - ydim/2
+    elif (int(item["r"]) == 180):
+      plx = float(footpt["x"]) - float(item["x"])
+      ply = float(footpt["y"]) - float(item["y"])
+      if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
+        plx = plx + xdim/2
+        ply = ply + ydim/2
+  ##################################################     
+  # Pad orientation adjustments for bottom side pads
+  ##################################################    
+  elif (footpt["layer"] == "B.Cu"):
+    if (int(item["r"]) == 90):
+      plx = float(footpt["x"]) + float(item["y"])
+      ply = float(footpt["y"]) - float(item["x"])
+      if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
+        plx = plx + ydim/2
+        ply = ply - xdim/2
+    elif (int(item["r"]) == 270) or (int(item["r"]) == -90):
+      plx = float(footpt["x"]) - float(item["y"])
+      ply = float(footpt["y"]) + float(item["x"])
+      if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
+        plx = plx - ydim/2
+        ply = ply + xdim/2
+    elif (int(item["r"]) == 0):
+      plx = float(footpt["x"]) + float(item["x"])
+      ply = float(footpt["y"]) + float(item["y"])
+      if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
+        plx = plx - xdim/2
+        ply = ply - ydim/2
+    elif (int(item["r"]) == 180):
+      plx = float(footpt["x"]) - float(item["x"])
+      ply = float(footpt["y"]) - float(item["y"])
+      if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
+        plx = plx + xdim/2
+        ply = ply + ydim/2
+
+  return plx, ply
 
 # Draws the pads of each component
 # Currently Pad dimensions are set to the global trace height x width
@@ -783,67 +2006,7 @@ def draw_pads(pads: list):
   pad_names = list()
   for item in pads:
     footpt = item["footprint"]
-    # xdim = float(item["padx"])
-    # ydim = float(item["pady"])
-    xdim = DEFAULT_TRACE_WIDTH
-    ydim = DEFAULT_TRACE_HEIGHT
-    
-    ##################################################    
-    # Pad orientation adjustments for top side pads
-    ##################################################    
-    if (footpt["layer"] == "F.Cu"): 
-      if (int(item["r"]) == 90):
-        plx = float(footpt["x"]) + float(item["y"])
-        ply = float(footpt["y"]) - float(item["x"])
-        if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
-          plx = plx + ydim/2
-          ply = ply - xdim/2
-      elif (int(item["r"]) == 270) or (int(item["r"]) == -90):
-        plx = float(footpt["x"]) - float(item["y"])
-        ply = float(footpt["y"]) + float(item["x"])
-        if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
-          plx = plx - ydim/2
-          ply = ply + xdim/2
-      elif (int(item["r"]) == 0):
-        plx = float(footpt["x"]) + float(item["x"])
-        ply = float(footpt["y"]) + float(item["y"])
-        if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
-          plx = plx - xdim/2
-          ply = ply - ydim/2
-      elif (int(item["r"]) == 180):
-        plx = float(footpt["x"]) - float(item["x"])
-        ply = float(footpt["y"]) - float(item["y"])
-        if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
-          plx = plx + xdim/2
-          ply = ply + ydim/2
-    ##################################################     
-    # Pad orientation adjustments for bottom side pads
-    ##################################################    
-    elif (footpt["layer"] == "B.Cu"):
-      if (int(item["r"]) == 90):
-        plx = float(footpt["x"]) + float(item["y"])
-        ply = float(footpt["y"]) - float(item["x"])
-        if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
-          plx = plx + ydim/2
-          ply = ply - xdim/2
-      elif (int(item["r"]) == 270) or (int(item["r"]) == -90):
-        plx = float(footpt["x"]) - float(item["y"])
-        ply = float(footpt["y"]) + float(item["x"])
-        if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
-          plx = plx - ydim/2
-          ply = ply + xdim/2
-      elif (int(item["r"]) == 0):
-        plx = float(footpt["x"]) + float(item["x"])
-        ply = float(footpt["y"]) + float(item["y"])
-        if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
-          plx = plx - xdim/2
-          ply = ply - ydim/2
-      elif (int(item["r"]) == 180):
-        plx = float(footpt["x"]) - float(item["x"])
-        ply = float(footpt["y"]) - float(item["y"])
-        if (item["type"] == "smd") and (item["padtype"] != "circle") and (item["padtype"] != "oval"):
-          plx = plx + xdim/2
-          ply = ply + ydim/2
+    plx, ply = pad_location(item)
 
     if (item["type"] == "smd"):
       pad_names.append(item["name"] + "_smdpad_" + str(cnt))
@@ -857,8 +2020,30 @@ def draw_pads(pads: list):
     #   set_view()
   return pad_names  
 
-# Will create the overall body to enclose the traces and pads created
-def create_body(outlines: list): 
+# Helper function to draw_zones() and make_zone_shapes(),
+# Builds the channel of a filled zone as one solid, extruded to the trace height 
+# from a single face holding every filled area of the zone on its layer, with their holes.
+def make_zone_shape(item):
+  z = layer_z(item["layer"])
+  wires = list()
+  for ring in item["rings"]:
+    points = [FreeCAD.Vector(float(x), float(y), z) for x, y in ring]
+    wires.append(Part.makePolygon(points + [points[0]]))
+  face = Part.makeFace(wires, "Part::FaceMakerBullseye")
+  return face.extrude(FreeCAD.Vector(0, 0, DEFAULT_TRACE_HEIGHT))
+
+# Draws the filled copper zones, one object per zone and layer (see assign_zones())
+def draw_zones(zones: list):
+  zone_names = list()
+  for cnt, item in enumerate(zones, 1):
+    name = "zone_" + item["net"] + "_" + str(cnt)
+    obj_zone = DOC.addObject("Part::Feature", name)
+    obj_zone.Shape = make_zone_shape(item)
+    zone_names.append(obj_zone.Name)
+  return zone_names
+
+# Builds the solid of the overall body from the board outline
+def make_body_shape(outlines: list):
   outline_segs = list()
   for line in outlines:
     # This assumes that if you have a 'rect' shape in your board outline, 
@@ -870,30 +2055,18 @@ def create_body(outlines: list):
       x1 = float(line[3])
       y1 = float(line[4])
 
-      V1 = App.Vector(x0, y0, DEFAULT_BODY_FCU_Z)
-      V2 = App.Vector(x0, y1, DEFAULT_BODY_FCU_Z)
-      V3 = App.Vector(x1, y0, DEFAULT_BODY_FCU_Z)
-      V4 = App.Vector(x1, y1, DEFAULT_BODY_FCU_Z)
+      V1 = FreeCAD.Vector(x0, y0, DEFAULT_BODY_FCU_Z)
+      V2 = FreeCAD.Vector(x0, y1, DEFAULT_BODY_FCU_Z)
+      V3 = FreeCAD.Vector(x1, y0, DEFAULT_BODY_FCU_Z)
+      V4 = FreeCAD.Vector(x1, y1, DEFAULT_BODY_FCU_Z)
 
       L1 = Part.LineSegment(V1, V2)
       L2 = Part.LineSegment(V1, V3)
       L3 = Part.LineSegment(V2, V4)
       L4 = Part.LineSegment(V3, V4)
 
-      S1 = Part.Shape([L1, L2, L3, L4])
-      W = Part.Wire(S1.Edges)
-      face = Part.Face(W)
-      board_shape = face.extrude(App.Vector(0, 0, DEFAULT_BODY_HEIGHT))
-      Part.show(board_shape)
-      DOC.addObject("PartDesign::Body", "PCB_Base")
-      DOC.getObject('PCB_Base').Label = 'PCB_Base'
-      DOC.PCB_Base.BaseFeature = DOC.Shape
-
-      DOC.getObject("PCB_Base").Visibility = False
-      DOC.getObject("Shape").Visibility = False
-      if (MOVIE_EFFECT):
-        set_view()
-      return board_shape
+      outline_segs = [L1, L2, L3, L4]
+      break
     # If the board is non-retangular, it must go through this 
     # seemingly convoluted process in order to create a viable solid.
     # Thus, the sorting of line segments is needed as seen in 
@@ -904,8 +2077,8 @@ def create_body(outlines: list):
       x1 = float(line[3])
       y1 = float(line[4])
 
-      V1 = App.Vector(x0, y0, DEFAULT_BODY_FCU_Z)
-      V2 = App.Vector(x1, y1, DEFAULT_BODY_FCU_Z)
+      V1 = FreeCAD.Vector(x0, y0, DEFAULT_BODY_FCU_Z)
+      V2 = FreeCAD.Vector(x1, y1, DEFAULT_BODY_FCU_Z)
 
       L1 = Part.LineSegment(V1, V2)
       outline_segs.append(L1)
@@ -918,9 +2091,9 @@ def create_body(outlines: list):
       x2 = float(line[5])
       y2 = float(line[6])
 
-      V1 = App.Vector(x0, y0, DEFAULT_BODY_FCU_Z)
-      V2 = App.Vector(x1, y1, DEFAULT_BODY_FCU_Z)
-      V3 = App.Vector(x2, y2, DEFAULT_BODY_FCU_Z)
+      V1 = FreeCAD.Vector(x0, y0, DEFAULT_BODY_FCU_Z)
+      V2 = FreeCAD.Vector(x1, y1, DEFAULT_BODY_FCU_Z)
+      V3 = FreeCAD.Vector(x2, y2, DEFAULT_BODY_FCU_Z)
 
       A1 = Part.Arc(V1, V2, V3)
       outline_segs.append(A1)
@@ -932,35 +2105,44 @@ def create_body(outlines: list):
   S1 = Part.Shape(outline_segs)
   W = Part.Wire(S1.Edges)
   face = Part.Face(W)
-  board_shape = face.extrude(App.Vector(0, 0, DEFAULT_BODY_HEIGHT))
+  return face.extrude(FreeCAD.Vector(0, 0, DEFAULT_BODY_HEIGHT))
+
+# Will create the overall body to enclose the traces and pads created
+def create_body(outlines: list): 
+  board_shape = make_body_shape(outlines)
   Part.show(board_shape)
 
   DOC.addObject("PartDesign::Body", "PCB_Base")
   DOC.getObject('PCB_Base').Label = 'PCB_Base'
   DOC.PCB_Base.BaseFeature = DOC.Shape
 
-  # DOC.getObject("PCB_Base").Visibility = False
+  # Rectangular boards keep the body hidden until the boolean operation
+  if any(line[0] == "rect" for line in outlines):
+    DOC.getObject("PCB_Base").Visibility = False
   DOC.getObject("Shape").Visibility = False
 
   if (MOVIE_EFFECT):
         set_view()
   return board_shape   
 
-# This function pulls 3d .step file names from the PCB file. 
-# Then, it goes to the user-determined KiCAD 3dmodels directory 
+# Collects the 3D model ('socket') references of each footprint 
+# from the PCB file, along with the model offset and rotation.
+# The file path is resolved against the user-determined KiCAD 3dmodels directory
 # (See Global Variable "KICAD_3DMODEL_DIR", see README for further details)
-# to grab and insert the actual model for each component. 
-# These models are the 'socket' designs used in the DissolvPCB process. 
-# The imported .step files are rotated and placed accordingly.
-def insert_package_models(file: str, ftpt: list, step_files: list):
-  with open(file, 'r') as pcbfile:
+    # "name": "housing_" + reference + "_" + count,
+    # "footprint": footprint,
+    # "path": step_file_dir,
+    # "offset": (x, y, z),
+    # "rotate": (x, y, z)
+def assign_models(file: str, ftpt: list, models: list):
+  with open_pcb(file) as pcbfile:
    
     for footprint in ftpt:
       pcbfile.seek(footprint["filepos"])
       line = pcbfile.readline()
       line = pcbfile.readline()
       cnt = 1
-      while not (("(footprint" in line) or ("(gr_rect" in line) or ("(gr_line" in line) or ("(segment" in line)):
+      while line and not (("(footprint" in line) or ("(gr_rect" in line) or ("(gr_line" in line) or ("(segment" in line)):
         line = pcbfile.readline()
         
         if ("(model" in line):
@@ -972,10 +2154,6 @@ def insert_package_models(file: str, ftpt: list, step_files: list):
           step_file_dir = KICAD_3DMODEL_DIR + str(step_file_line[k + 13:])
           # print("Step File Dir: ", step_file_dir)
 
-          i = step_file_line.rfind("/")
-          step_file_name = step_file_line[i+1:-5]
-          # print("Stepfile Name: ", step_file_name)
-
           pcbfile.readline()
           offset_line = pcbfile.readline()
           pcbfile.readline()
@@ -989,57 +2167,120 @@ def insert_package_models(file: str, ftpt: list, step_files: list):
           scale_line = ((scale_line.strip())[4:-1]).split()
           rot_line = ((rot_line.strip())[4:-1]).split()
 
-          model = ImportGui.insert(step_file_dir, DOC_NAME, useLinkGroup = True)
-          new_name = "housing_" + footprint["name"] + "_" + str(cnt)
-          model.Label = new_name
-
-          x = footprint["x"] + float(offset_line[0])
-          y = footprint["y"] + float(offset_line[1])
-
-          # F.Cu Layer Components
-          if (footprint["layer"] == "F.Cu"):
-            if (footprint ["r"] == 90): 
-              x = footprint["x"] + float(offset_line[1])
-              y = footprint["y"] - float(offset_line[0])
-            elif (footprint ["r"] == 270) or (footprint ["r"] == -90): 
-              x = footprint["x"] - float(offset_line[1])
-              y = footprint["y"] + float(offset_line[0])
-            elif (footprint ["r"] == 0): 
-              x = footprint["x"] + float(offset_line[0])
-              y = footprint["y"] + float(offset_line[1])
-            elif (footprint ["r"] == 0): 
-              x = footprint["x"] - float(offset_line[0])
-              y = footprint["y"] - float(offset_line[1])
-
-            z = DEFAULT_BODY_FCU_Z + DEFAULT_SOCKET_HEIGHT - float(offset_line[2])
-
-            rot_x = (-1 * int(footprint["r"])) + int(rot_line[2])
-            rot_y = 0 
-            rot_z = 180 
-
-          # B.Cu Layer Components
-          else:
-            z = DEFAULT_BODY_BCU_Z - DEFAULT_SOCKET_HEIGHT + float(offset_line[2]) 
-            rot_x = int(rot_line[2]) + int(footprint["r"])
-            rot_y = 0
-            rot_z = 0
-
-            if (rot_x == 90):
-              rot_x = -90
-            elif (rot_x == 270) or (rot_x == -90):
-              rot_x = 90
-
-          footprint_loc = FreeCAD.Vector(x, y, z)
-          footprint_rot = Rotation(rot_x, rot_y, rot_z)
-          # print("Placement", x, ", ", y, ", ", z)
-          # print("Rotation", rot_x, ", ", rot_y, ", ", rot_z, "\n\n")
-
-          model.Placement.Base = footprint_loc
-          model.Placement.Rotation = footprint_rot
-          
-          step_files.append(new_name)
+          new_model = {
+            "name": "housing_" + footprint["name"] + "_" + str(cnt),
+            "footprint": footprint,
+            "path": step_file_dir,
+            "offset": tuple(map(float, offset_line)),
+            "rotate": tuple(map(float, rot_line))
+          }
+
+          models.append(new_model)
           cnt = cnt + 1
 
+# Collects the copper layers from the layer table at the top of the pcb file,
+# in stack order from F.Cu through the inner layers to B.Cu,
+# e.g. ["F.Cu", "In1.Cu", "In2.Cu", "B.Cu"] for a 4 layer board.
+# The copper layers are returned on the 'layers' list.
+def assign_layers(file, layers: list):
+  found = list()
+  with open_pcb(file) as pcbfile:
+    line = pcbfile.readline()
+    while line and (line.strip() != "(layers"):
+      line = pcbfile.readline()
+
+    # Each layer is given as (ordinal "name" type ...) until the table is closed
+    line = pcbfile.readline()
+    while line and (line.strip() != ")"):
+      layerline = ((line.strip())[1:-1]).split()
+      if (len(layerline) > 1):
+        name = layerline[1].replace('"', '')
+        if (name.endswith(".Cu")):
+          found.append(name)
+      line = pcbfile.readline()
+
+  def stack_order(name):
+    if (name == "F.Cu"):
+      return 0
+    elif (name == "B.Cu"):
+      return math.inf
+    return int(name[2:-3])
+
+  layers.extend(sorted(found, key=stack_order))
+
+# Finds the placement of a 3D model from its footprint
+# location, rotation and model offset. 
+def model_placement(model):
+  footprint = model["footprint"]
+  offset = model["offset"]
+  rotate = model["rotate"]
+
+  x = footprint["x"] + offset[0]
+  y = footprint["y"] + offset[1]
+
+  # F.Cu Layer Components
+  if (footprint["layer"] == "F.Cu"):
+    if (footprint ["r"] == 90): 
+      x = footprint["x"] + offset[1]
+      y = footprint["y"] - offset[0]
+    elif (footprint ["r"] == 270) or (footprint ["r"] == -90): 
+      x = footprint["x"] - offset[1]
+      y = footprint["y"] + offset[0]
+    elif (footprint ["r"] == 0): 
+      x = footprint["x"] + offset[0]
+      y = footprint["y"] + offset[1]
+    elif (footprint ["r"] == 0): 
+      x = footprint["x"] - offset[0]
+      y = footprint["y"] - offset[1]
+
+    z = DEFAULT_BODY_FCU_Z + DEFAULT_SOCKET_HEIGHT - offset[2]
+
+    rot_x = (-1 * int(footprint["r"])) + int(rotate[2])
+    rot_y = 0 
+    rot_z = 180 
+
+  # B.Cu Layer Components
+  else:
+    z = DEFAULT_BODY_BCU_Z - DEFAULT_SOCKET_HEIGHT + offset[2] 
+    rot_x = int(rotate[2]) + int(footprint["r"])
+    rot_y = 0
+    rot_z = 0
+
+    if (rot_x == 90):
+      rot_x = -90
+    elif (rot_x == 270) or (rot_x == -90):
+      rot_x = 90
+
+  footprint_loc = FreeCAD.Vector(x, y, z)
+  footprint_rot = FreeCAD.Rotation(rot_x, rot_y, rot_z)
+  # print("Placement", x, ", ", y, ", ", z)
+  # print("Rotation", rot_x, ", ", rot_y, ", ", rot_z, "\n\n")
+  return FreeCAD.Placement(footprint_loc, footprint_rot)
+
+# This function pulls 3d .step file names from the PCB file. 
+# Then, it goes to the user-determined KiCAD 3dmodels directory 
+# (See Global Variable "KICAD_3DMODEL_DIR", see README for further details)
+# to grab and insert the actual model for each component. 
+# These models are the 'socket' designs used in the DissolvPCB process. 
+# The imported .step files are rotated and placed accordingly.
+def insert_package_models(file: str, ftpt: list, step_files: list):
+  models = list()
+  assign_models(file, ftpt, models)
+
+  for item in models:
+    # Without the GUI, models are read as plain shapes instead
+    if (SIMPLIFY_HOUSINGS) or (not FreeCAD.GuiUp):
+      shape = read_housing(item["path"])
+      model = DOC.addObject("Part::Feature", item["name"])
+      model.Shape = shape
+      model.Label = item["name"]
+      model.Placement = model_placement(item).multiply(shape.Placement)
+    else:
+      model = ImportGui.insert(item["path"], DOC.Name, useLinkGroup = True)
+      model.Label = item["name"]
+      model.Placement = model_placement(item)
+    step_files.append(item["name"])
+
 # Creating body when the list of segments do not have any matching 
 # Coordinates fails to connect the segment to the rest of the edges, 
 # resulting in a incomplete shape.
@@ -1098,6 +2339,13 @@ def sort_outlines(outlines: list):
   # called for each component instead of calling it once at the end...
 # TODO: Explore optimization of the boolean step
 def do_boolean_op(objects: list, step_files: list):
+  # Objects outside of the body cannot cut anything
+  body_box = DOC.getObject("PCB_Base").Shape.BoundBox
+  kept = [obj for obj in objects if DOC.getObject(str(obj)).Shape.BoundBox.intersect(body_box)]
+  if (len(kept) < len(objects)):
+    print("   Culled", len(objects) - len(kept), "objects outside of the body")
+  objects = kept
+
   # Cut Objects & Loop
   DOC.getObject("PCB_Base").newObject("PartDesign::Boolean", "Cut_Bool")
   DOC.getObject('Cut_Bool').Type = 1
@@ -1108,6 +2356,8 @@ def do_boolean_op(objects: list, step_files: list):
     # print("Obj:", obj)
     DOC.getObject('Cut_Bool').addObjects([DOC.getObject(str(obj))])
   DOC.recompute()
+  if (BOOLEAN_DIAGNOSIS):
+    diagnose_cut_feature(objects)
 
   # Fuse Objects & Loop
   DOC.getObject("PCB_Base").newObject("PartDesign::Boolean", "Fuse_Bool")
@@ -1120,14 +2370,1359 @@ def do_boolean_op(objects: list, step_files: list):
     DOC.getObject('Fuse_Bool').addObjects([DOC.getObjectsByLabel(name)[0]])
   DOC.recompute() 
    
+#####################################################
+# Memory-lean build
+#####################################################
+
+# Returns the current resident memory of this process in MB,
+# or None if it cannot be measured on this platform
+def memory_usage():
+  try:
+    import psutil
+    return psutil.Process().memory_info().rss / 2**20
+  except ImportError:
+    pass
+  try:
+    with open("/proc/self/statm", 'r') as statm:
+      return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+  except (OSError, ValueError, AttributeError):
+    return None
+
+# Returns the peak resident memory of this process so far in MB,
+# or None if it cannot be measured on this platform
+def peak_memory_usage():
+  try:
+    import resource
+  except ImportError:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if (sys.platform == "darwin"):
+    return peak / 2**20 # Reported in bytes on macOS, kilobytes elsewhere
+  return peak / 2**10
+
+# Timing and memory of each finished stage, in order 
+    # "stage": name,
+    # "time": seconds,
+    # "peak": peak memory in MB during the stage (None if unavailable),
+    # "end": memory in MB after the stage (None if unavailable),
+    # "start", "finish": time.perf_counter() at the start and end of the stage,
+    # "after": names of the stages it waited for,
+    # "background": True for stages run alongside the others (see start_housing_loading())
+STAGE_LOG = list()
+
+# Runs one step of the build, sampling the resident memory in the background.
+# Reports the time taken and the peak memory seen during the step, 
+# then frees whatever the step left behind.
+# Long OCC operations may hold the interpreter lock and starve the sampler, 
+# so the process peak is also checked before and after the step.
+# Each step follows the step before it, and 'waits_for' names background 
+# stages it also waits for (see critical_path()).
+@contextmanager
+def stage(name: str, waits_for: list = ()):
+  after = [entry["stage"] for entry in STAGE_LOG if not entry.get("background")][-1:] + list(waits_for)
+  samples = [memory_usage()]
+  peak_before = peak_memory_usage()
+  done = threading.Event()
+
+  def sample():
+    while not done.wait(0.05):
+      samples.append(memory_usage())
+
+  sampler = threading.Thread(target=sample, daemon=True)
+  start = time.perf_counter()
+  sampler.start()
+  try:
+    yield
+  finally:
+    done.set()
+    sampler.join()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    end = memory_usage()
+
+    peaks = [mem for mem in samples if mem is not None]
+    peak_after = peak_memory_usage()
+    if (peak_after is not None) and (peak_before is not None) and (peak_after > peak_before):
+      peaks.append(peak_after)
+    peak = max(peaks) if peaks else None
+
+    STAGE_LOG.append({"stage": name, "time": elapsed, "peak": peak, "end": end,
+                      "start": start, "finish": start + elapsed, "after": after})
+    if (peak is None):
+      print("  ", name, "took %.2fs" % elapsed)
+    else:
+      print("  ", name, "took %.2fs, peak memory %.0f MB" % (elapsed, peak))
+
+# Longest chain of waiting stages in STAGE_LOG, i.e. the stages that set the total build time.
+# Walks back from the last stage to finish, each time to whichever stage it waited for finished last.
+# Returns a list of (name, seconds), where the seconds only count the time after that last stage finished.
+def critical_path(log: list):
+  entries = {entry["stage"]: entry for entry in log if ("start" in entry)}
+  if (len(entries) == 0):
+    return list()
+  current = max(entries.values(), key=lambda entry: entry["finish"])
+  path = list()
+  while (current is not None):
+    waited = [entries[name] for name in current["after"] if (name in entries)]
+    previous = max(waited, key=lambda entry: entry["finish"]) if waited else None
+    ready = max(current["start"], previous["finish"]) if previous else current["start"]
+    path.insert(0, (current["stage"], current["finish"] - ready))
+    current = previous
+  return path
+
+# Prints the critical path of the last build (see critical_path()),
+# and how much of the stage time was saved by running stages alongside each other
+def report_critical_path():
+  path = critical_path(STAGE_LOG)
+  if (len(path) == 0):
+    return
+  timed = [entry for entry in STAGE_LOG if ("start" in entry)]
+  wall = max(entry["finish"] for entry in timed) - min(entry["start"] for entry in timed)
+  print("   Critical path %.2fs:" % sum(seconds for name, seconds in path), 
+        " > ".join("%s %.2fs" % (name, seconds) for name, seconds in path))
+  overlap = sum(entry["time"] for entry in timed) - wall
+  if (overlap > 0.005):
+    print("   Stages overlapped by %.2fs, %.2fs of stages in %.2fs" % (overlap, wall + overlap, wall))
+
+# Collects all data needed to build the board from the PCB file.
+# Large files are parsed in parallel when given more than one job,
+# and the parse cache is used when enabled (see PARSE_CACHE).
+# Returns a dictionary of the parsed lists.
+def parse_board(file: str, jobs: int = 1, use_cache: bool = None):
+  if (use_cache is None):
+    use_cache = PARSE_CACHE
+  if (use_cache):
+    board = load_cached_board(file)
+    if (board is not None):
+      print("   Using parse cache", parse_cache_path(file))
+      return board
+
+  if (jobs > 1) and (os.path.getsize(file) >= PARALLEL_PARSE_MIN_SIZE):
+    board = parse_board_parallel(file, jobs)
+  else:
+    board = new_board()
+    assign_layers(file, board["layers"])
+    assign_footprints(file, board["footprints"])
+    assign_pads(file, board["footprints"], board["pads"], pad_patterns())
+    assign_segments(file, board["segments"], board["outlines"])
+    assign_zones(file, board["zones"])
+    assign_models(file, board["footprints"], board["models"])
+
+  if (use_cache):
+    save_parse_cache(file, board)
+  return board
+
+# Memory-lean counterpart of draw_traces(),
+# builds the trace segments, their joints and the vias as 
+# in-memory shapes instead of document objects. 
+# Returns a list of (name, shape, source item) tools.
+# With STADIUM_TRACES, each segment is one tool with its joints built in.
+# Tools are numbered by their position in 'segs', 
+# unless their numbers are given (see tool_groups()).
+def make_trace_shapes(segs: list, numbers: list = None):
+  tools = list()
+  joints = set()
+  removed = 0
+  for cnt, item in zip(numbers or range(1, len(segs) + 1), segs):
+    if (item["type"] == "segment"):
+      trace_name = "trace_seg" + str(cnt)
+      joint_name = "joint_seg" + str(cnt)
+      length, orientation = measure_trace(item)
+
+      if (length < MINIMUM_TRACE_LENGTH):
+        print("   Trace len:", length, " is too short, skipping")
+      elif (STADIUM_TRACES):
+        ends, shared = joint_ends(joints, item)
+        removed = removed + shared
+        tools.append((trace_name, stadium_shape(length, item["x0"], item["y0"], item["layer"], orientation, ends), item))
+
+      else:
+        box = Part.makeBox(length, DEFAULT_TRACE_WIDTH, DEFAULT_TRACE_HEIGHT)
+        box.Placement = trace_placement(DEFAULT_TRACE_WIDTH, item["x0"], item["y0"], item["layer"], orientation)
+        tools.append((trace_name, box, item))
+
+        # Joints are kept as separate tools, as overlapping solids 
+        # within a single boolean argument are not allowed.
+        # Points shared with an earlier segment already have a joint.
+        ends, shared = joint_ends(joints, item)
+        removed = removed + shared
+        z = layer_z(item["layer"])
+        for suffix, x, y in (("A", item["x0"], item["y0"]), ("B", item["x1"], item["y1"])):
+          if (suffix in ends):
+            joint = instance_cylinder(DEFAULT_TRACE_WIDTH/2, DEFAULT_TRACE_WIDTH, x, y, z)
+            tools.append((joint_name + suffix, joint, item))
+
+    elif (item["type"] == "arc"):
+      arc_name = "trace_arc" + str(cnt)
+      if (arc_length(item) < MINIMUM_TRACE_LENGTH):
+        print("   Arc len:", arc_length(item), " is too short, skipping")
+      else:
+        ends, shared = joint_ends(joints, item)
+        removed = removed + shared
+        if (STADIUM_TRACES):
+          tools.append((arc_name, make_arc_track(item, ends), item))
+        else:
+          tools.append((arc_name, make_arc_track(item), item))
+          z = layer_z(item["layer"])
+          for suffix, x, y in (("A", item["x0"], item["y0"]), ("B", item["x1"], item["y1"])):
+            if (suffix in ends):
+              tools.append((arc_name + "_joint" + suffix, instance_cylinder(DEFAULT_TRACE_WIDTH/2, DEFAULT_TRACE_WIDTH, x, y, z), item))
+
+    elif (item["type"] == "via"): 
+      bottom, height = via_span(item)
+      via = instance_cylinder(float(item["size"])/2, height, item["x"], item["y"], bottom)
+      tools.append(("via_net_" + str(cnt), via, item))
+
+  if (removed > 0):
+    print("   Removed", removed, "duplicate joints at shared segment endpoints")
+  return tools
+
+# Returns a hashable summary of the pads of a pad pattern (see local_pads()),
+# so that footprints with the same pads share their pattern shapes.
+def pad_signature(pattern: list):
+  signature = list()
+  for pad in pattern:
+    values = list()
+    for key, value in sorted(pad.items()):
+      if (key in ("name", "footprint")):
+        continue
+      try:
+        value = round(float(value), 6)
+      except ValueError:
+        pass
+      values.append((key, value))
+    signature.append(tuple(values))
+  return tuple(signature)
+
+# Helper Function to make_pad_shapes(),
+# Builds the pad shapes of one footprint as if it were at the origin, keeping its rotation,
+# so that moving them by the footprint's position places them exactly as draw_pads() does.
+# Returns a list of (name suffix, shape), or (None, None) for pads without a shape.
+def make_pattern_shapes(pads: list, layer: str, r):
+  origin = {"x": 0.0, "y": 0.0, "r": r, "layer": layer}
+  shapes = list()
+  for pad in pads:
+    pad = dict(pad, footprint=origin)
+    plx, ply = pad_location(pad)
+
+    if (pad["type"] == "smd"):
+      dims = (DEFAULT_TRACE_WIDTH * 1.05, DEFAULT_TRACE_HEIGHT * 1.05, DEFAULT_PAD_HEIGHT)
+      shapes.append(("_smdpad_", instance_shape("box", dims, smd_pad_placement(pad, plx, ply, layer))))
+    elif (pad["type"] == "thru_hole"):
+      dims = (float(pad["drill"])/2 * (1.2), DEFAULT_THRUHOLE_HEIGHT)
+      shapes.append(("_thrupad_", instance_shape("cylinder", dims, thru_hole_pad_placement(pad, plx, ply, layer))))
+    else:
+      shapes.append((None, None))
+  return shapes
+
+# Placement moving shapes built by make_pattern_shapes() onto the footprint.
+# The shapes already carry the footprint's rotation, so this only moves them.
+def footprint_placement(footprint):
+  return FreeCAD.Placement(FreeCAD.Vector(float(footprint["x"]), float(footprint["y"]), 0), FreeCAD.Rotation())
+
+# Memory-lean counterpart of draw_pads(), 
+# builds the pads of each component as in-memory shapes.
+# The pad shapes of each kind of footprint are only built once per footprint rotation,
+# and the pads of every footprint of that kind and rotation are moved into place from them.
+# Returns a list of (name, shape, source item) tools.
+# Tools are numbered by their position in 'pads', unless their numbers are given (see tool_groups()).
+def make_pad_shapes(pads: list, numbers: list = None):
+  numbers = {id(item): cnt for cnt, item in zip(numbers or range(1, len(pads) + 1), pads)}
+  footprints = dict()
+  for item in pads:
+    footprints.setdefault(id(item["footprint"]), list()).append(item)
+
+  patterns = dict()
+  tools = list()
+  for group in footprints.values():
+    footpt = group[0]["footprint"]
+    r = round(float(footpt["r"]) % 360, 6)
+    key = (footpt.get("footprint"), footpt["layer"], r, pad_signature(local_pads(group)))
+    if (key not in patterns):
+      patterns[key] = make_pattern_shapes(group, footpt["layer"], r)
+
+    placement = footprint_placement(footpt)
+    for item, (suffix, shape) in zip(group, patterns[key]):
+      if (shape is not None):
+        tools.append((item["name"] + suffix + str(numbers[id(item)]), shape.moved(placement), item))
+
+  if (len(footprints) > len(patterns)):
+    print("   Built pads of", len(footprints), "footprints from", len(patterns), "pad patterns")
+  return tools
+
+# Memory-lean counterpart of draw_zones(),
+# builds each filled zone as one in-memory shape.
+# Returns a list of (name, shape, source item) tools.
+def make_zone_shapes(zones: list, numbers: list = None):
+  tools = list()
+  for cnt, item in zip(numbers or range(1, len(zones) + 1), zones):
+    tools.append(("zone_" + item["net"] + "_" + str(cnt), make_zone_shape(item), item))
+  return tools
+
+# Settings a worker process needs to build the same shapes as this process,
+# as workers are started with the default global values (see process_pool()).
+def worker_settings():
+  return {"params": get_parameters(), "layers": list(COPPER_LAYERS), "min_trace_length": MINIMUM_TRACE_LENGTH,
+          "tile_size": BOOLEAN_TILE_SIZE, "stadium_traces": STADIUM_TRACES,
+          "housings": [SIMPLIFY_HOUSINGS, HOUSING_DETAIL_DISTANCE, HOUSING_CACHE_DIR]}
+
+def apply_worker_settings(settings: dict):
+  global MINIMUM_TRACE_LENGTH, BOOLEAN_TILE_SIZE, STADIUM_TRACES
+  global SIMPLIFY_HOUSINGS, HOUSING_DETAIL_DISTANCE, HOUSING_CACHE_DIR
+  MINIMUM_TRACE_LENGTH = settings["min_trace_length"]
+  BOOLEAN_TILE_SIZE = settings["tile_size"]
+  STADIUM_TRACES = settings["stadium_traces"]
+  SIMPLIFY_HOUSINGS, HOUSING_DETAIL_DISTANCE, HOUSING_CACHE_DIR = settings["housings"]
+  set_parameters(settings["params"])
+  set_copper_layers(settings["layers"])
+
+# Groups of tools handed to each worker process, per job (see make_tools())
+TOOL_BATCHES_PER_JOB = 4
+
+# Splits the tools of a parsed board into groups that can be built independently.
+# Different nets never share a joint, so the trace segments and vias of each net are kept 
+# together, and the pads of each kind of footprint are kept together to share their pad patterns.
+# Each filled zone can go to any group.
+# The nets and kinds of footprint are dealt out over up to 'batches' groups of each kind, 
+# largest first, so that the groups are of similar size.
+# Each group is given as (kind, items, numbers), where the numbers keep the names the tools 
+# would get from make_trace_shapes(), make_pad_shapes() and make_zone_shapes() on the whole board.
+def tool_groups(board: dict, batches: int):
+  nets = dict()
+  for cnt, item in enumerate(board["segments"], 1):
+    nets.setdefault(item.get("net"), list()).append((cnt, item))
+  footprints = dict()
+  for cnt, item in enumerate(board["pads"], 1):
+    footpt = item["footprint"]
+    footprints.setdefault((footpt.get("footprint"), footpt["layer"]), list()).append((cnt, item))
+
+  zones = {cnt: [(cnt, item)] for cnt, item in enumerate(board["zones"], 1)}
+
+  groups = list()
+  for kind, parts in (("segments", nets), ("pads", footprints), ("zones", zones)):
+    bins = [list() for i in range(min(batches, len(parts)))]
+    for part in sorted(parts.values(), key=len, reverse=True):
+      min(bins, key=len).extend(part)
+    for entries in bins:
+      entries.sort(key=lambda entry: entry[0]) # Back in file order
+      groups.append((kind, [entry[1] for entry in entries], [entry[0] for entry in entries]))
+  return groups
+
+# Builds the tools of one group (see tool_groups()) in a worker process.
+# Returns the tool names, the tool shapes as one compound in BREP text,
+# the index of each tool's source item within the group,
+# and the numbers of instances and prototypes placed (see clear_prototypes()).
+def build_tool_group(kind: str, items: list, numbers: list, settings: dict):
+  apply_worker_settings(settings)
+  if (kind == "pads"):
+    tools = make_pad_shapes(items, numbers)
+  elif (kind == "zones"):
+    tools = make_zone_shapes(items, numbers)
+  else:
+    tools = make_trace_shapes(items, numbers)
+
+  index = {id(item): i for i, item in enumerate(items)}
+  names = [tool[0] for tool in tools]
+  # Instances still share their prototypes within the BREP text
+  brep = shape_to_brep(Part.makeCompound([tool[1] for tool in tools])) if tools else None
+  counts = clear_prototypes(quiet=True)
+  return names, brep, [index[id(tool[2])] for tool in tools], counts
+
+# Builds the trace, via, pad and zone tools of a parsed board.
+# With more than one job, the nets and footprints are built in groups across 
+# a pool of worker processes (see tool_groups()), which send back their tools as BREP, 
+# so that boards with hundreds of nets are generated on every core.
+# Returns a list of (name, shape, source item) tools.
+def make_tools(board: dict, jobs: int = 1):
+  if (jobs <= 1):
+    return make_trace_shapes(board["segments"]) + make_pad_shapes(board["pads"]) + make_zone_shapes(board["zones"])
+  groups = tool_groups(board, jobs * TOOL_BATCHES_PER_JOB)
+  if (len(groups) <= 1):
+    return make_trace_shapes(board["segments"]) + make_pad_shapes(board["pads"]) + make_zone_shapes(board["zones"])
+
+  tools = list()
+  instances = 0
+  prototypes = 0
+  settings = worker_settings()
+  with process_pool(min(jobs, len(groups))) as pool:
+    futures = [pool.submit(build_tool_group, kind, items, numbers, settings) for kind, items, numbers in groups]
+    for (kind, items, numbers), future in zip(groups, futures):
+      names, brep, indices, counts = future.result()
+      instances = instances + counts[0]
+      prototypes = prototypes + counts[1]
+      if (brep is not None):
+        shapes = brep_to_shape(brep).childShapes()
+        tools.extend(zip(names, shapes, [items[i] for i in indices]))
+  print("   Built", len(tools), "tools in", len(groups), "groups of nets, footprints and zones")
+  if (instances > 0):
+    print("   Placed", instances, "instances of", prototypes, "prototype shapes")
+  return tools
+
+# Memory-lean counterpart of insert_package_models(),
+# reads each 3D model without adding it to a document. 
+# Models shared by several footprints are only read once and placed as instances,
+# and models already read can be passed in as a {path: shape} dictionary.
+# Returns a list of (name, shape, source item) tools.
+def make_housing_shapes(models: list, sources: dict = None):
+  loaded = dict(sources) if sources else dict()
+  tools = list()
+  for item in models:
+    if (item["path"] not in loaded):
+      loaded[item["path"]] = read_housing(item["path"])
+    housing = loaded[item["path"]].moved(model_placement(item))
+    tools.append((item["name"], housing, item))
+  loaded.clear()
+  return tools
+
+# Share of the jobs reading the 3D models while the tools are built on the rest (see build_shapes()),
+# so that both pools together never start more processes than there are jobs
+HOUSING_JOB_SHARE = 0.25
+
+# Reads one 3D model in a worker process, see start_housing_loading()
+def read_housing_brep(path: str, settings: dict):
+  apply_worker_settings(settings)
+  return shape_to_brep(read_housing(path))
+
+# Starts reading every 3D model used by the board in a pool of up to 'jobs' worker processes,
+# so that the STEP files are read while the channels and the body are built (see build_shapes()).
+# The models are picked up with finish_housing_loading().
+# Returns the pending models, holding the number of processes started as "jobs", or None if the board has none.
+def start_housing_loading(models: list, jobs: int):
+  paths = list(dict.fromkeys(item["path"] for item in models))
+  if (len(paths) == 0):
+    return None
+  after = [entry["stage"] for entry in STAGE_LOG if not entry.get("background")][-1:]
+  loading = {"start": time.perf_counter(), "finish": None, "after": after, "jobs": min(jobs, len(paths))}
+  loading["pool"] = process_pool(loading["jobs"])
+
+  def done(future):
+    loading["finish"] = time.perf_counter()
+
+  settings = worker_settings()
+  loading["futures"] = {path: loading["pool"].submit(read_housing_brep, path, settings) for path in paths}
+  for future in loading["futures"].values():
+    future.add_done_callback(done)
+  return loading
+
+# Waits for the models started by start_housing_loading(),
+# logs their loading as a background stage and returns them as {path: shape}
+def finish_housing_loading(loading: dict):
+  try:
+    sources = {path: brep_to_shape(future.result()) for path, future in loading["futures"].items()}
+  finally:
+    loading["pool"].shutdown() # Also waits for the last finish time to be recorded
+  elapsed = loading["finish"] - loading["start"]
+  STAGE_LOG.append({"stage": "3D Model Loading", "time": elapsed, "peak": None, "end": None, "background": True,
+                    "start": loading["start"], "finish": loading["finish"], "after": loading["after"]})
+  print("  ", "3D Model Loading took %.2fs for" % elapsed, len(sources), "models alongside the other stages")
+  return sources
+
+# Pre-boolean stage of the memory-lean build, 
+# splits tools by whether their bounding box reaches into the body's. 
+# Returns the tools that do and the tools that do not.
+def cull_tools(body, tools: list):
+  box = body.BoundBox
+  inside = list()
+  outside = list()
+  for tool in tools:
+    if (tool[1].BoundBox.intersect(box)):
+      inside.append(tool)
+    else:
+      outside.append(tool)
+  return inside, outside
+
+# Splits a bounding box into square tiles of the given size in x and y,
+# returning the bounding box of each tile
+def tile_boxes(box, size: float):
+  tiles = list()
+  nx = max(1, math.ceil(box.XLength / size))
+  ny = max(1, math.ceil(box.YLength / size))
+  for i in range(nx):
+    for j in range(ny):
+      x0 = box.XMin + (i * size)
+      y0 = box.YMin + (j * size)
+      tiles.append(FreeCAD.BoundBox(x0, y0, box.ZMin, min(x0 + size, box.XMax), min(y0 + size, box.YMax), box.ZMax))
+  return tiles
+
+# Cuts the tools out of the body one tile at a time (see tile_boxes()), 
+# each tile only against the tools that reach into it, 
+# then fuses the tiles back together and merges the faces split at the tile borders.
+def tiled_cut(body, tools: list, size: float):
+  pieces = list()
+  for tile in tile_boxes(body.BoundBox, size):
+    region = Part.makeBox(tile.XLength, tile.YLength, tile.ZLength, FreeCAD.Vector(tile.XMin, tile.YMin, tile.ZMin))
+    piece = body.common(region)
+    if (len(piece.Solids) == 0):
+      continue
+    local = [tool[1] for tool in tools if tool[1].BoundBox.intersect(tile)]
+    if (len(local) > 0):
+      piece = piece.cut(local)
+    pieces.append(piece)
+
+  print("   Cut", len(pieces), "tiles of", size, "mm")
+  if (len(pieces) == 1):
+    return pieces[0]
+  return pieces[0].fuse(pieces[1:]).removeSplitter()
+
+# Cuts the tools out of the body, in tiles with BOOLEAN_TILE_SIZE (see tiled_cut()).
+# With BOOLEAN_DIAGNOSIS, the result is also checked (see shape_failure()).
+# Returns the result and why it failed, where the result is None if the cut raised an error.
+def checked_cut(body, tools: list):
+  if (len(tools) == 0):
+    return body, None
+  try:
+    if (BOOLEAN_TILE_SIZE):
+      result = tiled_cut(body, tools, BOOLEAN_TILE_SIZE)
+    else:
+      result = body.cut([tool[1] for tool in tools])
+  except Part.OCCError as error:
+    if (not BOOLEAN_DIAGNOSIS):
+      raise
+    return None, "boolean error: " + str(error)
+  return result, shape_failure(body, result) if (BOOLEAN_DIAGNOSIS) else None
+
+# Builds the final DissolvPCB shape of a parsed board (see parse_board())
+# entirely in memory, with the current global parameters and the board's stackup.
+# Each stage only keeps the shapes needed by the next one.
+# Given a checkpoint (see open_checkpoint()), the result of each stage is saved,
+# and stages completed by the build being resumed are loaded instead of being built again.
+# With OVERLAP_STAGES and more than one job, the 3D models are read in worker processes 
+# while the tools and the body are built, and are waited for by the 3D footprint insertion.
+# The jobs are then split between the two (see HOUSING_JOB_SHARE).
+def build_shapes(board: dict, sources: dict = None, jobs: int = 1, checkpoint: dict = None):
+  if (len(board["layers"]) > 0):
+    set_copper_layers(board["layers"])
+  if (resumed(checkpoint, "boolean")):
+    return load_checkpoint_shape(checkpoint, "boolean")
+
+  loading = None
+  tool_jobs = jobs
+  if (OVERLAP_STAGES) and (jobs > 1) and (sources is None) and (not resumed(checkpoint, "housings")):
+    loading = start_housing_loading(board["models"], max(1, int(jobs * HOUSING_JOB_SHARE)))
+    if (loading is not None):
+      tool_jobs = jobs - loading["jobs"]
+
+  # The pool reading the models is shut down even if a stage fails before the models are picked up
+  try:
+    with stage("Trace & Pad Generation"):
+      if (resumed(checkpoint, "tools")):
+        tools = load_checkpoint_tools(checkpoint, "tools")
+      else:
+        board = dict(board, segments=simplify_segments(board["segments"]))
+        tools = make_tools(board, tool_jobs)
+        clear_prototypes()
+        save_checkpoint_tools(checkpoint, "tools", tools)
+
+    with stage("DissolvPCB Body Generation"):
+      if (resumed(checkpoint, "body")):
+        body = load_checkpoint_shape(checkpoint, "body")
+      else:
+        body = make_body_shape(sort_outlines(board["outlines"]))
+        save_checkpoint_shape(checkpoint, "body", body)
+
+    with stage("3D Footprint Insertion", ["3D Model Loading"] if loading else []):
+      if (resumed(checkpoint, "housings")):
+        housings = load_checkpoint_tools(checkpoint, "housings")
+      else:
+        if (loading is not None):
+          sources = finish_housing_loading(loading)
+        housings = make_housing_shapes(board["models"], sources)
+        save_checkpoint_tools(checkpoint, "housings", housings)
+  finally:
+    if (loading is not None):
+      loading["pool"].shutdown(cancel_futures=True)
+
+  with stage("Boolean Operation"):
+    # Tools outside of the body cannot cut anything, and housings apart 
+    # from the body are added to the result without fusing them
+    tools, culled = cull_tools(body, tools)
+    housings, apart = cull_tools(body, housings)
+    if (len(culled) > 0) or (len(apart) > 0):
+      print("   Culled", len(culled), "tools and", len(apart), "housings outside of the body")
+
+    result, failure = checked_cut(body, tools)
+    if (failure is not None):
+      print("   Boolean operation failed,", failure + ", diagnosing", len(tools), "tools")
+      fixed = diagnose_cut(body, tools, jobs)
+      if (fixed is not None):
+        tools = fixed
+        result, failure = checked_cut(body, tools)
+        if (failure is not None):
+          print("   Boolean operation still failed,", failure)
+    if (result is None):
+      print("   Boolean operation failed:", failure)
+      sys.exit(1)
+    tools.clear()
+    culled.clear()
+    if (len(housings) > 0):
+      result = result.fuse([housing[1] for housing in housings])
+    if (len(apart) > 0):
+      result = Part.makeCompound([result] + [housing[1] for housing in apart])
+    housings.clear()
+    apart.clear()
+    del body
+    save_checkpoint_shape(checkpoint, "boolean", result)
+
+  return result
+
+# Memory-lean counterpart of the regular build in main().
+# No intermediate objects are added to the document, 
+# and only the final result is added to the document as 'PCB_Base'. 
+# The peak memory of each stage is reported.
+# With CHECKPOINTS or RESUME, each stage is saved and can be resumed (see open_checkpoint()).
+def build_lean(file: str, keep_brep: bool = KEEP_BREP, jobs: int = 1):
+  STAGE_LOG.clear()
+  checkpoint = open_checkpoint(file, RESUME) if (CHECKPOINTS or RESUME) else None
+
+  with stage("PCB File Parsing"):
+    if (resumed(checkpoint, "parse")):
+      board = load_checkpoint_board(checkpoint)
+    else:
+      board = parse_board(file, jobs)
+      save_checkpoint_board(checkpoint, board)
+
+  result = build_shapes(board, jobs=jobs, checkpoint=checkpoint)
+  board.clear()
+  report_critical_path()
+
+  pcb_base = DOC.addObject("Part::Feature", "PCB_Base")
+  pcb_base.Shape = result
+  if (keep_brep):
+    result.exportBrep(os.path.splitext(file)[0] + ".brep")
+
+  return result
+
+#####################################################
+# Checkpoints
+#####################################################
+
+# Bump whenever the saved stages change, so that old checkpoints are not resumed
+CHECKPOINT_VERSION = 3
+
+# Working directory holding the checkpoints of a board, 
+# CHECKPOINT_DIR if set, otherwise next to the board (board.kicad_pcb.checkpoint/)
+def checkpoint_path(file: str):
+  return CHECKPOINT_DIR or (file + ".checkpoint")
+
+# Everything the saved stages depend on, the content of the board and the build settings.
+# The copper layers are left out, as they come from the board's own layer table (covered by its hash),
+# while COPPER_LAYERS still holds the layers of the last board built by this process.
+# Checkpoints saved with a different key are not resumed.
+def checkpoint_key(file: str):
+  import json
+  settings = dict(worker_settings())
+  del settings["layers"]
+  key = {"version": CHECKPOINT_VERSION, "sha256": file_hash(file), "settings": settings, 
+         "model_dir": KICAD_3DMODEL_DIR, "simplify_housings": SIMPLIFY_HOUSINGS}
+  return json.loads(json.dumps(key)) # As read back from the manifest
+
+# Opens the checkpoints of a board for a memory-lean build (see build_lean()).
+# With 'resume', the stages completed by an earlier build with the same key are kept,
+# otherwise the earlier checkpoints are forgotten and overwritten stage by stage.
+# Returns a checkpoint dictionary holding its directory, key and completed stages.
+def open_checkpoint(file: str, resume: bool):
+  import json
+  path = checkpoint_path(file)
+  key = checkpoint_key(file)
+  stages = list()
+  if (resume):
+    try:
+      with open(os.path.join(path, "manifest.json"), 'r') as manifestfile:
+        manifest = json.load(manifestfile)
+      if (manifest.get("key") == key):
+        stages = manifest["stages"]
+      else:
+        print("   Board or settings changed since the checkpoints were saved, starting over")
+    except (OSError, ValueError):
+      print("   No checkpoints to resume from in", path)
+
+  os.makedirs(path, exist_ok=True)
+  checkpoint = {"path": path, "key": key, "stages": list(stages)}
+  write_manifest(checkpoint)
+  if (len(stages) > 0):
+    print("   Resuming after stage:", ", ".join(stages))
+  return checkpoint
+
+# The manifest is replaced in one step, and only after the files of a stage are saved,
+# so that a crash while saving never leaves a half-saved stage marked as completed
+def write_manifest(checkpoint: dict):
+  import json
+  manifest = os.path.join(checkpoint["path"], "manifest.json")
+  with open(manifest + ".tmp", 'w') as manifestfile:
+    json.dump({"key": checkpoint["key"], "stages": checkpoint["stages"]}, manifestfile)
+  os.replace(manifest + ".tmp", manifest)
+
+# Returns True if the stage was completed by the build being resumed
+def resumed(checkpoint: dict, name: str):
+  return (checkpoint is not None) and (name in checkpoint["stages"])
+
+def complete_stage(checkpoint: dict, name: str):
+  checkpoint["stages"].append(name)
+  write_manifest(checkpoint)
+
+# Saves the parsed board (see parse_board()) as NumPy columns (see board_to_columns())
+def save_checkpoint_board(checkpoint: dict, board: dict):
+  if (checkpoint is None):
+    return
+  import numpy
+  with open(os.path.join(checkpoint["path"], "parse.npz"), 'wb') as boardfile:
+    numpy.savez(boardfile, **board_to_columns(board))
+  complete_stage(checkpoint, "parse")
+
+def load_checkpoint_board(checkpoint: dict):
+  import numpy
+  with numpy.load(os.path.join(checkpoint["path"], "parse.npz")) as columns:
+    return columns_to_board(dict(columns))
+
+# Saves (name, shape, source item) tools as one compound in BREP, 
+# with their names and source items next to it.
+# Footprints of the source items are saved by name.
+def save_checkpoint_tools(checkpoint: dict, name: str, tools: list):
+  if (checkpoint is None):
+    return
+  import json
+  base = os.path.join(checkpoint["path"], name)
+  Part.makeCompound([tool[1] for tool in tools]).exportBrep(base + ".brep")
+  items = [{key: (value["name"] if isinstance(value, dict) else value) for key, value in tool[2].items()} for tool in tools]
+  with open(base + ".json", 'w') as toolfile:
+    json.dump({"names": [tool[0] for tool in tools], "items": items}, toolfile)
+  complete_stage(checkpoint, name)
+
+def load_checkpoint_tools(checkpoint: dict, name: str):
+  import json
+  base = os.path.join(checkpoint["path"], name)
+  with open(base + ".json", 'r') as toolfile:
+    saved = json.load(toolfile)
+  shapes = Part.read(base + ".brep").childShapes() if (len(saved["names"]) > 0) else list()
+  return list(zip(saved["names"], shapes, saved["items"]))
+
+# Saves a single shape in BREP
+def save_checkpoint_shape(checkpoint: dict, name: str, shape):
+  if (checkpoint is None):
+    return
+  shape.exportBrep(os.path.join(checkpoint["path"], name + ".brep"))
+  complete_stage(checkpoint, name)
+
+def load_checkpoint_shape(checkpoint: dict, name: str):
+  return Part.read(os.path.join(checkpoint["path"], name + ".brep"))
+
+#####################################################
+# Channel report
+#####################################################
+
+# Grid step (mm) of the rasters measuring where channel tools overlap (see channel_report())
+REPORT_GRID = 0.05
+
+# Columns of the channel report, lengths in mm and volumes in mm^3
+REPORT_COLUMNS = ["net", "layer", "segments", "length", "joints", "zones", "channel_volume", 
+                  "vias", "via_volume", "pads", "pad_volume", "volume"]
+
+# Helper Function to raster_rect() and raster_disk(),
+# Returns the report raster cells whose centers lie in the given bounding box,
+# as integer indices and center coordinates
+def raster_window(xmin, ymin, xmax, ymax):
+  import numpy
+  ix = numpy.arange(math.floor(xmin / REPORT_GRID), math.floor(xmax / REPORT_GRID) + 1)
+  iy = numpy.arange(math.floor(ymin / REPORT_GRID), math.floor(ymax / REPORT_GRID) + 1)
+  ix, iy = numpy.meshgrid(ix, iy, indexing="ij")
+  ix = ix.ravel()
+  iy = iy.ravel()
+  return ix, iy, (ix + 0.5) * REPORT_GRID, (iy + 0.5) * REPORT_GRID
+
+# Helper Function to channel_report(),
+# Returns the keys of the cells covered by a box of length 'lx' and width 'ly' 
+# with its corner at (x, y), rotated by 'angle' degrees about the corner
+# (the same way trace boxes and SMD pads are placed)
+def raster_rect(x, y, angle, lx, ly):
+  ux = math.cos(math.radians(angle))
+  uy = math.sin(math.radians(angle))
+  xs = (x, x + lx*ux, x - ly*uy, x + lx*ux - ly*uy)
+  ys = (y, y + lx*uy, y + ly*ux, y + lx*uy + ly*ux)
+  ix, iy, cx, cy = raster_window(min(xs), min(ys), max(xs), max(ys))
+  u = (cx - x)*ux + (cy - y)*uy
+  v = (cy - y)*ux - (cx - x)*uy
+  inside = (u >= 0) & (u <= lx) & (v >= 0) & (v <= ly)
+  return cell_keys(ix[inside], iy[inside])
+
+# Helper Function to channel_report(),
+# Returns the keys of the cells covered by an arc track (see make_arc_track()), without its ends
+def raster_arc(item):
+  import numpy
+  cx, cy, radius, start, sweep = arc_geometry(item)
+  r = DEFAULT_TRACE_WIDTH / 2
+  ix, iy, px, py = raster_window(cx - radius - r, cy - radius - r, cx + radius + r, cy + radius + r)
+  distance = numpy.hypot(px - cx, py - cy)
+  angle = numpy.mod((numpy.arctan2(py - cy, px - cx) - start) * math.copysign(1, sweep), 2 * math.pi)
+  inside = (distance >= radius - r) & (distance <= radius + r) & (angle <= abs(sweep))
+  return cell_keys(ix[inside], iy[inside])
+
+# Helper Function to channel_report(),
+# Returns the keys of the cells covered by a circle
+def raster_disk(x, y, radius):
+  ix, iy, cx, cy = raster_window(x - radius, y - radius, x + radius, y + radius)
+  inside = ((cx - x)**2 + (cy - y)**2) <= radius**2
+  return cell_keys(ix[inside], iy[inside])
+
+# Helper Function to channel_report(),
+# Returns the keys of the cells inside a filled zone (see assign_zones()) by the even-odd rule,
+# so that cells inside its holes are left out. 
+# Each edge only toggles the cells left of it on the rows it crosses.
+def raster_polygon(rings: list):
+  import numpy
+  xs = [x for ring in rings for x, y in ring]
+  ys = [y for ring in rings for x, y in ring]
+  ix0, iy0 = math.floor(min(xs) / REPORT_GRID), math.floor(min(ys) / REPORT_GRID)
+  cx = (numpy.arange(ix0, math.floor(max(xs) / REPORT_GRID) + 1) + 0.5) * REPORT_GRID
+  cy = (numpy.arange(iy0, math.floor(max(ys) / REPORT_GRID) + 1) + 0.5) * REPORT_GRID
+  inside = numpy.zeros((len(cx), len(cy)), dtype=bool)
+  for ring in rings:
+    for (xa, ya), (xb, yb) in zip(ring, ring[1:] + ring[:1]):
+      if (ya == yb):
+        continue
+      rows = numpy.nonzero((cy >= min(ya, yb)) & (cy < max(ya, yb)))[0]
+      crossing = xa + (cy[rows] - ya) * (xb - xa) / (yb - ya)
+      inside[:, rows] ^= cx[:, None] < crossing[None, :]
+  ix, iy = numpy.nonzero(inside)
+  return cell_keys(ix + ix0, iy + iy0)
+
+# Helper Function to channel_report(),
+# Returns the area of a filled zone, where rings inside an odd number of other rings are holes
+def polygon_area(rings: list):
+  def signed_area(ring):
+    return sum((x0 * y1) - (x1 * y0) for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1])) / 2
+
+  def contains(ring, x, y):
+    inside = False
+    for (xa, ya), (xb, yb) in zip(ring, ring[1:] + ring[:1]):
+      if ((ya > y) != (yb > y)) and (x < xa + (y - ya) * (xb - xa) / (yb - ya)):
+        inside = not inside
+    return inside
+
+  area = 0.0
+  for ring in rings:
+    depth = sum(1 for other in rings if (other is not ring) and contains(other, *ring[0]))
+    area = area + abs(signed_area(ring)) * (-1 if (depth % 2) else 1)
+  return area
+
+# Packs cell indices into one integer key per cell
+def cell_keys(ix, iy):
+  return (ix * 2**32) + (iy + 2**31)
+
+# Helper Function to channel_report(),
+# Returns the indices of the given cells within the sorted cells of a layer's channels
+def covered_cells(keys, cells):
+  import numpy
+  if (len(cells) == 0):
+    return numpy.zeros(0, dtype=int)
+  idx = numpy.minimum(numpy.searchsorted(cells, keys), len(cells) - 1)
+  return idx[cells[idx] == keys]
+
+# Helper Function to channel_report(),
+# Returns the volume of a via or thru-hole pad that is already inside the channels of 
+# the layers it passes through, and the number of covered cells of each net.
+# 'channels' holds the sorted cell keys, channel heights and net of each cell by layer.
+def vertical_overlap(keys, bottom: float, top: float, channels: dict):
+  import numpy
+  volume = 0.0
+  nets = dict()
+  for layer, (cells, heights, owners) in channels.items():
+    z = layer_z(layer)
+    if (z < bottom - JOINT_TOLERANCE) or (z >= top - JOINT_TOLERANCE):
+      continue
+    found = covered_cells(keys, cells)
+    volume = volume + numpy.minimum(heights[found], top - z).sum() * REPORT_GRID**2
+    for net, count in zip(*numpy.unique(owners[found], return_counts=True)):
+      nets[net] = nets.get(net, 0) + count
+  return volume, nets
+
+# Estimates the liquid metal needed by each net from the parsed board (see parse_board()),
+# without building any geometry, so that it runs without FreeCAD.
+# The channels are measured the way the generator builds them (see make_trace_shapes()):
+# every trace box, arc track, joint, filled zone, via and pad is an exact prism, and the volume where they overlap
+# is measured on a raster with a step of REPORT_GRID and subtracted.
+# Pads have no net in the parser, and are given the net of the channels they touch.
+# Returns one row per net and layer (see REPORT_COLUMNS), where vias and thru-hole pads 
+# are reported on the layers they span (e.g. "F.Cu-B.Cu"), followed by a "total" row per net.
+def channel_report(board: dict):
+  import numpy
+  if (len(board["layers"]) > 0):
+    set_copper_layers(board["layers"])
+
+  rows = dict()
+  def row(net, layer):
+    if ((net, layer) not in rows):
+      rows[(net, layer)] = dict.fromkeys(REPORT_COLUMNS, 0)
+      rows[(net, layer)].update(net=net, layer=layer)
+    return rows[(net, layer)]
+
+  # Trace boxes and joints, rastered by net and layer
+  radius = DEFAULT_TRACE_WIDTH / 2
+  joints = set()
+  rasters = dict()
+  vias = list()
+  for item in simplify_segments(board["segments"]):
+    if (item["type"] == "via"):
+      bottom, height = via_span(item)
+      span = item.get("from_layer", "F.Cu") + "-" + item.get("to_layer", "B.Cu")
+      vias.append((item.get("net"), span, float(item["x"]), float(item["y"]), float(item["size"])/2, bottom, height))
+      continue
+
+    x0, y0 = float(item["x0"]), float(item["y0"])
+    x1, y1 = float(item["x1"]), float(item["y1"])
+    length = arc_length(item) if (item["type"] == "arc") else math.hypot(x1 - x0, y1 - y0)
+    if (length < MINIMUM_TRACE_LENGTH):
+      continue
+    cells = rasters.setdefault((item.get("net"), item["layer"]), (list(), list()))
+    entry = row(item.get("net"), item["layer"])
+    entry["segments"] = entry["segments"] + 1
+    entry["length"] = entry["length"] + length
+    # Arc tracks sweep the same area per length as straight segments
+    entry["channel_volume"] = entry["channel_volume"] + (length * DEFAULT_TRACE_WIDTH * DEFAULT_TRACE_HEIGHT)
+
+    if (item["type"] == "arc"):
+      keys = raster_arc(item)
+    else:
+      angle = math.degrees(math.atan2(y1 - y0, x1 - x0))
+      ux, uy = (x1 - x0) / length, (y1 - y0) / length
+      keys = raster_rect(x0 + radius*uy, y0 - radius*ux, angle, length, DEFAULT_TRACE_WIDTH)
+    cells[0].append(keys)
+    cells[1].append(numpy.full(len(keys), DEFAULT_TRACE_HEIGHT))
+
+    for x, y in ((x0, y0), (x1, y1)):
+      if (is_new_joint(joints, x, y, item["layer"])):
+        entry["joints"] = entry["joints"] + 1
+        entry["channel_volume"] = entry["channel_volume"] + (math.pi * radius**2 * DEFAULT_TRACE_WIDTH)
+        keys = raster_disk(x, y, radius)
+        cells[0].append(keys)
+        cells[1].append(numpy.full(len(keys), DEFAULT_TRACE_WIDTH))
+
+  # Filled zones, with the traces running through them
+  for item in board["zones"]:
+    entry = row(item["net"], item["layer"])
+    entry["zones"] = entry["zones"] + 1
+    entry["channel_volume"] = entry["channel_volume"] + (polygon_area(item["rings"]) * DEFAULT_TRACE_HEIGHT)
+    cells = rasters.setdefault((item["net"], item["layer"]), (list(), list()))
+    keys = raster_polygon(item["rings"])
+    cells[0].append(keys)
+    cells[1].append(numpy.full(len(keys), DEFAULT_TRACE_HEIGHT))
+
+  # Overlaps within each net and layer, counted once in the union of its cells
+  net_ids = list()
+  channels = dict()
+  for (net, layer), (keys, heights) in rasters.items():
+    keys = numpy.concatenate(keys)
+    heights = numpy.concatenate(heights)
+    cells, inverse = numpy.unique(keys, return_inverse=True)
+    top = numpy.zeros(len(cells))
+    numpy.maximum.at(top, inverse, heights)
+    entry = row(net, layer)
+    entry["channel_volume"] = entry["channel_volume"] - (heights.sum() - top.sum()) * REPORT_GRID**2
+
+    if (net not in net_ids):
+      net_ids.append(net)
+    merged = channels.setdefault(layer, (list(), list(), list()))
+    merged[0].append(cells)
+    merged[1].append(top)
+    merged[2].append(numpy.full(len(cells), net_ids.index(net)))
+
+  for layer, (keys, heights, owners) in channels.items():
+    keys = numpy.concatenate(keys)
+    order = numpy.argsort(keys)
+    channels[layer] = (keys[order], numpy.concatenate(heights)[order], numpy.concatenate(owners)[order])
+
+  # Pads, placed as in make_pattern_shapes(), and given the net they touch the most
+  for item in board["pads"]:
+    footpt = item["footprint"]
+    plx, ply = pad_location(item)
+    if (item["type"] == "smd"):
+      keys = raster_rect(plx, ply, int(item["r"]), DEFAULT_TRACE_WIDTH * 1.05, DEFAULT_TRACE_HEIGHT * 1.05)
+      volume = (DEFAULT_TRACE_WIDTH * 1.05) * (DEFAULT_TRACE_HEIGHT * 1.05) * DEFAULT_PAD_HEIGHT
+      # SMD pads sit on the channel ends without reaching into them
+      layer = footpt["layer"]
+      nets = dict()
+      if (layer in channels):
+        owners = channels[layer][2][covered_cells(keys, channels[layer][0])]
+        nets = dict(zip(*numpy.unique(owners, return_counts=True)))
+    elif (item["type"] == "thru_hole"):
+      hole = float(item["drill"])/2 * (1.2)
+      # Same span as thru_hole_pad_placement()
+      if (footpt["layer"] == "F.Cu"):
+        bottom = DEFAULT_BCU_Z + DEFAULT_TRACE_HEIGHT - DEFAULT_THRUHOLE_HEIGHT
+      else:
+        bottom = DEFAULT_FCU_Z
+      keys = raster_disk(plx, ply, hole)
+      overlap, nets = vertical_overlap(keys, bottom, bottom + DEFAULT_THRUHOLE_HEIGHT, channels)
+      volume = (math.pi * hole**2 * DEFAULT_THRUHOLE_HEIGHT) - overlap
+      layer = COPPER_LAYERS[0] + "-" + COPPER_LAYERS[-1]
+    else:
+      continue
+
+    net = net_ids[max(nets, key=nets.get)] if (len(nets) > 0) else "unconnected"
+    entry = row(net, layer)
+    entry["pads"] = entry["pads"] + 1
+    entry["pad_volume"] = entry["pad_volume"] + volume
+
+  for net, span, x, y, size, bottom, height in vias:
+    overlap, nets = vertical_overlap(raster_disk(x, y, size), bottom, bottom + height, channels)
+    entry = row(net, span)
+    entry["vias"] = entry["vias"] + 1
+    entry["via_volume"] = entry["via_volume"] + (math.pi * size**2 * height) - overlap
+
+  # One row per net and layer, followed by the total of the net
+  report = list()
+  for net in dict.fromkeys(net for net, layer in rows):
+    total = dict.fromkeys(REPORT_COLUMNS, 0)
+    total.update(net=net, layer="total")
+    for (name, layer), entry in rows.items():
+      if (name != net):
+        continue
+      entry["volume"] = entry["channel_volume"] + entry["via_volume"] + entry["pad_volume"]
+      report.append(entry)
+      for key in REPORT_COLUMNS[2:]:
+        total[key] = total[key] + entry[key]
+    report.append(total)
+
+  for entry in report:
+    for key in REPORT_COLUMNS[2:]:
+      entry[key] = round(float(entry[key]), 4) if isinstance(entry[key], float) else int(entry[key])
+  return report
+
+# Writes the channel report (see channel_report()) as a CSV file, 
+# or as a JSON list of rows if the file name ends in .json
+def save_channel_report(report: list, file: str):
+  if (file.endswith(".json")):
+    import json
+    with open(file, 'w') as reportfile:
+      json.dump(report, reportfile, indent=2)
+  else:
+    import csv
+    with open(file, 'w', newline='') as reportfile:
+      writer = csv.DictWriter(reportfile, fieldnames=REPORT_COLUMNS)
+      writer.writeheader()
+      writer.writerows(report)
+
+#####################################################
+# Boolean diagnosis
+#####################################################
+
+# Returns why the result of cutting tools out of the body failed, or None if it looks sound.
+# A cut can only remove material, so a result larger than the body has gone wrong as well.
+def shape_failure(body, result):
+  if (result.isNull()):
+    return "null shape"
+  if (len(result.Solids) == 0):
+    return "empty shape"
+  if (not result.isValid()):
+    return "invalid shape"
+  if (result.Volume > body.Volume * (1 + 1e-6)):
+    return "volume grew from %.3f to %.3f mm^3" % (body.Volume, result.Volume)
+  return None
+
+# Cuts the tool shapes out of the body, returning why it failed or None if it worked
+def cut_failure(body, shapes: list):
+  if (len(shapes) == 0):
+    return None
+  try:
+    return shape_failure(body, body.cut(shapes))
+  except Part.OCCError as error:
+    return "boolean error: " + str(error)
+
+# Body and tools of the cut being diagnosed in each worker process, by file (see test_cut())
+DIAGNOSIS_SHAPES = dict()
+
+# Cuts the tools at the given indices out of the body in a worker process.
+# The body and the tools are read once per process from the compound saved by diagnose_cut().
+def test_cut(file: str, indices: list):
+  if (file not in DIAGNOSIS_SHAPES):
+    DIAGNOSIS_SHAPES.clear()
+    DIAGNOSIS_SHAPES[file] = Part.read(file).childShapes()
+  shapes = DIAGNOSIS_SHAPES[file]
+  return cut_failure(shapes[0], [shapes[i + 1] for i in indices])
+
+# Splits a list of tool indices into up to 'parts' runs of similar length
+def split_tools(indices: list, parts: int):
+  parts = min(parts, len(indices))
+  size = len(indices) / parts
+  return [indices[round(i * size):round((i + 1) * size)] for i in range(parts)]
+
+# Finds the smallest sets of tools that make cutting them out of the body fail.
+# Each round splits every failing set into parts (at least one per job), and cuts each part 
+# out of the body on its own in a pool of worker processes, keeping the parts that still fail.
+# Failures that need tools from several parts are narrowed down to the parts that cannot be left out.
+# A single bad tool among n is found in about log(n) / log(jobs) rounds.
+# Returns a list of failing sets, each as a list of indices into 'tools'.
+def isolate_failing_tools(body, tools: list, jobs: int = 1):
+  import tempfile
+  import shutil
+  folder = tempfile.mkdtemp(prefix="dissolvpcb_")
+  file = os.path.join(folder, "cut.brep")
+  Part.makeCompound([body] + [tool[1] for tool in tools]).exportBrep(file)
+  pool = process_pool(jobs) if (jobs > 1) else None
+
+  def run(tests: list):
+    if (pool is None):
+      return [cut_failure(body, [tools[i][1] for i in test]) for test in tests]
+    futures = [pool.submit(test_cut, file, test) for test in tests]
+    return [future.result() for future in futures]
+
+  found = list()
+  suspects = [(list(range(len(tools))), max(2, jobs))]
+  rounds = 0
+  try:
+    while (len(suspects) > 0):
+      rounds = rounds + 1
+      tests = list()
+      for group, ways in suspects:
+        parts = split_tools(group, ways)
+        complements = list()
+        if (len(parts) > 2):
+          complements = [[i for i in group if (i < part[0]) or (i > part[-1])] for part in parts]
+        tests.append((group, parts, complements))
+      failures = iter(run([test for group, parts, complements in tests for test in parts + complements]))
+
+      suspects = list()
+      for group, parts, complements in tests:
+        failed = [part for part in parts if (next(failures) is not None)]
+        # Parts whose leaving out makes the cut work again are needed for the failure
+        needed = [part for part in parts if (next(failures) is None)] if complements else parts
+        if (len(failed) > 0):
+          for part in failed:
+            if (len(part) == 1):
+              found.append(part)
+            else:
+              suspects.append((part, max(2, jobs)))
+        elif (len(needed) == 0):
+          suspects.append((complements[0], max(2, len(parts) - 1)))
+        elif (len(needed) < len(parts)):
+          suspects.append(([i for part in needed for i in part], max(2, jobs, len(needed))))
+        elif (len(parts) < len(group)):
+          suspects.append((group, min(len(group), 2 * len(parts))))
+        elif (len(group) < len(tools)):
+          found.append(group) # Fails only with all of these tools together
+        else:
+          print("   The tools only fail when cut all together, e.g. in tiles or as a document feature")
+  finally:
+    if (pool is not None):
+      pool.shutdown()
+    shutil.rmtree(folder, ignore_errors=True)
+
+  print("   Isolated", len(found), "failing sets of tools in", rounds, "rounds")
+  return found
+
+# Describes a tool by its source trace, via, pad or zone (see make_tools()),
+# or by where it is when its source is unknown
+def describe_tool(tool):
+  name, shape, item = tool
+  center = shape.BoundBox.Center
+  where = "at (%.3f, %.3f)" % (center.x, center.y)
+  if (item is None):
+    return name + " " + where
+  if (item.get("type") == "segment"):
+    return "%s: segment (%s, %s) -> (%s, %s) on %s, %s" % (name, item["x0"], item["y0"], item["x1"], item["y1"], item["layer"], item["net"])
+  if (item.get("type") == "arc"):
+    return "%s: arc (%s, %s) through (%s, %s) to (%s, %s) on %s, %s" % (name, item["x0"], item["y0"], 
+            item["xm"], item["ym"], item["x1"], item["y1"], item["layer"], item["net"])
+  if (item.get("type") == "via"):
+    return "%s: via at (%s, %s) from %s to %s, %s" % (name, item["x"], item["y"], item["from_layer"], item["to_layer"], item["net"])
+  if (item.get("type") == "zone"):
+    return "%s: zone on %s, %s, %s" % (name, item["layer"], item["net"], where)
+  if ("footprint" in item):
+    return "%s: %s pad %s of %s %s" % (name, item["type"], item["number"], item["name"], where)
+  return name + " " + where
+
+# Tries to repair a tool shape that makes the cut fail, 
+# returning the repaired shape or None if it cannot be repaired
+def repair_tool(shape):
+  repaired = shape.copy()
+  try:
+    repaired.fix(1e-7, 1e-7, 1e-4)
+    repaired = repaired.removeSplitter()
+  except Part.OCCError:
+    return None
+  if (repaired.isNull()) or (not repaired.isValid()) or (len(repaired.Solids) == 0):
+    return None
+  return repaired
+
+# Diagnoses a cut of the tools out of the body that failed (see shape_failure()).
+# Finds and reports the failing tools (see isolate_failing_tools()), then with BOOLEAN_DIAGNOSIS
+# "exclude" leaves them out, or with "repair" repairs them (see repair_tool()) and leaves out
+# those that still fail.
+# Returns the tools to cut instead, or None with "report".
+def diagnose_cut(body, tools: list, jobs: int = 1):
+  found = isolate_failing_tools(body, tools, jobs)
+  for indices in found:
+    print("   Failing tools:" if (len(indices) > 1) else "   Failing tool:")
+    for i in indices:
+      print("     ", describe_tool(tools[i]))
+  if (BOOLEAN_DIAGNOSIS == "report") or (len(found) == 0):
+    return None
+
+  replaced = dict()
+  for indices in found:
+    if (BOOLEAN_DIAGNOSIS == "repair"):
+      repaired = [repair_tool(tools[i][1]) for i in indices]
+      if (None not in repaired) and (cut_failure(body, repaired) is None):
+        for i, shape in zip(indices, repaired):
+          replaced[i] = (tools[i][0], shape, tools[i][2])
+        print("   Repaired", ", ".join(tools[i][0] for i in indices))
+        continue
+    for i in indices:
+      replaced[i] = None
+    print("   Left out", ", ".join(tools[i][0] for i in indices))
+  return [replaced.get(i, tool) for i, tool in enumerate(tools) if (replaced.get(i, tool) is not None)]
+
+# Diagnoses the cut of the regular build (see do_boolean_op()) if it failed,
+# and leaves out or replaces the failing tools of the 'Cut_Bool' feature (see diagnose_cut())
+def diagnose_cut_feature(objects: list):
+  body = DOC.getObject("Shape").Shape
+  cut = DOC.getObject("Cut_Bool")
+  failure = shape_failure(body, cut.Shape)
+  if (failure is None):
+    return
+  print("   Boolean operation failed,", failure + ", diagnosing", len(objects), "tools")
+  tools = [(str(obj), DOC.getObject(str(obj)).Shape, None) for obj in objects]
+  fixed = diagnose_cut(body, tools)
+  if (fixed is None):
+    return
+
+  shapes = {name: shape for name, shape, item in tools}
+  kept = list()
+  for name, shape, item in fixed:
+    if (shape is shapes[name]):
+      kept.append(DOC.getObject(name))
+    else:
+      obj = DOC.addObject("Part::Feature", name + "_repaired")
+      obj.Shape = shape
+      obj.Visibility = False
+      kept.append(obj)
+  cut.setObjects(kept)
+  DOC.recompute()
+
+#####################################################
+# Parameter sweep
+#####################################################
+
+# Converts shapes to and from BREP text, so that they 
+# can be passed between processes or saved to disk
+def shape_to_brep(shape):
+  return shape.exportBrepToString()
+
+def brep_to_shape(brep: str):
+  shape = Part.Shape()
+  shape.importBrepFromString(brep)
+  return shape
+
+# Creates a pool of worker processes. 
+# Workers are started fresh instead of forked, 
+# as FreeCAD does not survive being forked once initialized.
+def process_pool(jobs: int):
+  import multiprocessing
+  from concurrent.futures import ProcessPoolExecutor
+  return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"))
+
+# Expands a grid of parameter values, given as a dictionary of lists 
+# by short parameter name, into a list of every combination.
+# Parameters missing from the grid keep their current values.
+def expand_grid(grid: dict):
+  import itertools
+  for key in grid:
+    if (key not in SWEEP_PARAMETERS):
+      print("Unknown parameter: ", key)
+      sys.exit(1)
+  params = get_parameters()
+  values = [grid.get(key, [params[key]]) for key in SWEEP_PARAMETERS]
+  return [dict(zip(SWEEP_PARAMETERS, combo)) for combo in itertools.product(*values)]
+
+# Does all of the work that does not depend on the global parameters once, 
+# so that it can be shared between the variants of a sweep:
+# parses the board, sorts its outline, and reads every 3D model.
+# Returns the parsed board and the 3D models as {path: BREP text}.
+def prepare_board(file: str, jobs: int = 1):
+  board = parse_board(file, jobs)
+  board["outlines"] = sort_outlines(board["outlines"])
+
+  sources = dict()
+  for item in board["models"]:
+    if (item["path"] not in sources):
+      sources[item["path"]] = shape_to_brep(read_housing(item["path"]))
+  return board, sources
+
+# Builds one variant of a sweep in its own document 
+# and writes the result as a STEP file.
+# Runs in a worker process, see run_sweep().
+def build_variant(board: dict, sources: dict, params: dict, output: str, settings: dict = None):
+  start = time.perf_counter()
+  if (settings is not None):
+    apply_worker_settings(settings)
+  set_parameters(params)
+  doc = new_document("PCB_Sweep")
+  try:
+    shapes = {path: brep_to_shape(brep) for path, brep in sources.items()}
+    result = build_shapes(board, shapes)
+    doc.addObject("Part::Feature", "PCB_Base").Shape = result
+    result.exportStep(output)
+  finally:
+    FreeCAD.closeDocument(doc.Name)
+  return {"params": params, "output": output, "time": time.perf_counter() - start}
+
+# Converts the same board with every combination of parameters in the grid,
+# given as a dictionary of lists by short parameter name (see SWEEP_PARAMETERS), 
+#   e.g. {"width": [0.75, 0.85], "offset": [0.3, 0.4]}
+# The board is only parsed once and the variants are built in parallel.
+# Writes one STEP file per combination to the output directory 
+# and returns the list of written files.
+def run_sweep(file: str, grid: dict, out_dir: str = None, jobs: int = None):
+  combos = expand_grid(grid)
+  board, sources = prepare_board(file, jobs or os.cpu_count())
+
+  if (out_dir is None):
+    out_dir = os.path.dirname(os.path.abspath(file))
+  os.makedirs(out_dir, exist_ok=True)
+  base = os.path.splitext(os.path.basename(file))[0]
+
+  outputs = list()
+  with process_pool(jobs or os.cpu_count()) as pool:
+    futures = list()
+    for params in combos:
+      suffix = "_".join(key + ("%g" % value) for key, value in params.items())
+      output = os.path.join(out_dir, base + "_" + suffix + ".step")
+      futures.append(pool.submit(build_variant, board, sources, params, output, worker_settings()))
+
+    for future in futures:
+      done = future.result()
+      print("   Built", done["output"], "in %.1fs" % done["time"])
+      outputs.append(done["output"])
+
+  return outputs
+
 def main():
   print('Welcome to PVA-LM PCB Project!')
+  new_document()
+  report_startup()
 
   filename = get_pcb_file()
 
+  if (LEAN_BUILD):
+    build_lean(filename)
+    DOC.recompute()
+    set_view()
+    print("PCB Generation Complete!")
+    return
+
+  build_legacy(filename)
+  set_view()
+
+  print("PCB Generation Complete!")
+
+# Regular build, with every step of the board added to the document as its own object. 
+# 3D footprints can be left out with 'housings' (e.g. when comparing against other builds).
+# Returns the shape of the final 'PCB_Base' body. 
+def build_legacy(filename: str, housings: bool = True):
+  layers = list()
   ftpt = list()
   pads = list()
   segs = list()
+  zones = list()
   outlines = list() 
   objects = list()
   step_files = list()
@@ -1136,15 +3731,23 @@ def main():
 #////////////PCB File Parsing Steps//////////////////#
 #####################################################
   # 
+  # Collect the copper layers of the stackup
+  assign_layers(filename, layers)
+  if (len(layers) > 0):
+    set_copper_layers(layers)
+
   # Collect All footprint-related data from PCB File
   assign_footprints(filename, ftpt)
 
   # Collect All pads by each component
-  assign_pads(filename, ftpt, pads)
+  assign_pads(filename, ftpt, pads, pad_patterns())
 
   # Collect All Segments (and Vias) + board outline data
   assign_segments(filename, segs, outlines)
 
+  # Collect the filled copper zones
+  assign_zones(filename, zones)
+
   print("PCB File Parsing Successful!")
 
 #####################################################
@@ -1154,9 +3757,15 @@ def main():
   #####################################################
   # Trace and Pad Generation
   #####################################################
+  if (SIMPLIFY_REGULAR_BUILD):
+    segs = simplify_segments(segs)
+  else:
+    segs = split_tight_arcs(segs)
   trace_objs = draw_traces(segs, ftpt)
   pad_objs = draw_pads(pads)
-  objects = trace_objs + pad_objs
+  zone_objs = draw_zones(zones)
+  clear_prototypes()
+  objects = trace_objs + pad_objs + zone_objs
   DOC.recompute()
   
   #####################################################
@@ -1169,7 +3778,8 @@ def main():
   #####################################################
   # 3D Footprint Insertion
   #####################################################
-  insert_package_models(filename, ftpt, step_files)
+  if (housings):
+    insert_package_models(filename, ftpt, step_files)
   DOC.recompute()
 
   #####################################################
@@ -1179,17 +3789,114 @@ def main():
   DOC.recompute()
   DOC.getObject("PCB_Base").Visibility = True
   DOC.getObject("Cut_Bool").Visibility = True
+  result = DOC.getObject("PCB_Base").Shape
 
-  set_view()
-
-  print("PCB Generation Complete!")
-
+  layers.clear()
   ftpt.clear()
   pads.clear()
   segs.clear()
+  zones.clear()
   outlines.clear()
   objects.clear()
   step_files.clear()
+  return result
+
+# Command line entry, for running without the FreeCAD GUI
+# using a Python interpreter that can import FreeCAD.
+# Builds the board with the memory-lean build and saves it as a FreeCAD document,
+# or converts it once per parameter combination with --sweep.
+def cli(argv: list):
+  parser = args.ArgumentParser(description="Converts a KiCad PCB into a printable DissolvPCB model.")
+  parser.add_argument("board", help="KiCad .kicad_pcb file")
+  parser.add_argument("--out", help="output directory, defaults to the board's directory")
+  parser.add_argument("--keep-brep", action="store_true", help="also write the result as a .brep file")
+  parser.add_argument("--sweep", metavar="GRID", 
+                      help="JSON file of parameter values to sweep over, e.g. {\"width\": [0.75, 0.85]}")
+  parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+  parser.add_argument("--index", action="store_true", help="only build the block index saved next to the board")
+  parser.add_argument("--cache", action="store_true", help="reuse or save the parsed board next to the board")
+  parser.add_argument("--simplify-housings", action="store_true", help="fuse simplified 3D models into the body")
+  parser.add_argument("--preconvert", action="store_true", help="only simplify and save the board's 3D models")
+  parser.add_argument("--tile-size", type=float, metavar="MM", help="cut the body in square tiles of this size")
+  parser.add_argument("--stadium-traces", action="store_true", help="build each trace segment as one solid with rounded ends")
+  parser.add_argument("--sequential", action="store_true", help="read the 3D models after the channels instead of alongside them")
+  parser.add_argument("--diagnose", choices=["report", "exclude", "repair"], 
+                      help="find the tools that make the boolean operation fail, and report, leave out or repair them")
+  parser.add_argument("--checkpoint", action="store_true", help="save the state after each stage of the build")
+  parser.add_argument("--resume", action="store_true", help="resume from the last saved stage of an earlier build")
+  parser.add_argument("--checkpoint-dir", metavar="DIR", help="directory of the checkpoints, defaults to next to the board")
+  parser.add_argument("--report", metavar="FILE", help="only write the channel length and volume of each net (.csv or .json)")
+  options = parser.parse_args(argv)
+
+  if (options.cache):
+    global PARSE_CACHE
+    PARSE_CACHE = True
+
+  if (options.simplify_housings):
+    global SIMPLIFY_HOUSINGS
+    SIMPLIFY_HOUSINGS = True
+
+  if (options.stadium_traces):
+    global STADIUM_TRACES
+    STADIUM_TRACES = True
+
+  if (options.sequential):
+    global OVERLAP_STAGES
+    OVERLAP_STAGES = False
+
+  if (options.diagnose):
+    global BOOLEAN_DIAGNOSIS
+    BOOLEAN_DIAGNOSIS = options.diagnose
+
+  if (options.checkpoint) or (options.resume):
+    global CHECKPOINTS, RESUME, CHECKPOINT_DIR
+    CHECKPOINTS = True
+    RESUME = options.resume
+    CHECKPOINT_DIR = options.checkpoint_dir
+
+  if (options.preconvert):
+    preconvert_housings(options.board)
+    return
+
+  if (options.tile_size):
+    global BOOLEAN_TILE_SIZE
+    BOOLEAN_TILE_SIZE = options.tile_size
+
+  if (options.index):
+    blocks = load_block_index(options.board)
+    print("Indexed", len(blocks), "blocks to", block_index_path(options.board))
+    return
+
+  if (options.report):
+    start = time.perf_counter()
+    report = channel_report(parse_board(options.board, options.jobs))
+    save_channel_report(report, options.report)
+    totals = [entry for entry in report if (entry["layer"] == "total")]
+    print("Reported", len(totals), "nets to", options.report, "in %.0f ms," % ((time.perf_counter() - start) * 1000),
+          "%.1f mm^3 of liquid metal in total" % sum(entry["volume"] for entry in totals))
+    return
+
+  if (options.sweep):
+    import json
+    with open(options.sweep, 'r') as gridfile:
+      grid = json.load(gridfile)
+    run_sweep(options.board, grid, options.out, options.jobs)
+    return
+
+  out_dir = options.out or os.path.dirname(os.path.abspath(options.board))
+  os.makedirs(out_dir, exist_ok=True)
+  new_document()
+  report_startup()
+  build_lean(options.board, options.keep_brep, options.jobs)
+  DOC.saveAs(os.path.join(out_dir, os.path.splitext(os.path.basename(options.board))[0] + ".FCStd"))
+  print("PCB Generation Complete!")
+
+IMPORT_TIME = time.perf_counter() - _IMPORT_START
 
 if __name__ == "__main__":
-  main()
+  # FreeCAD is already loaded when run as a macro, 
+  # and is only loaded by the command line when it is needed
+  if ("FreeCAD" in sys.modules) and (FreeCAD.GuiUp):
+    main()
+  else:
+    cli(sys.argv[1:])
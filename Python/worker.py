@@ -0,0 +1,362 @@
+import time
+import argparse as args
+import sys
+import os
+import gc
+import json
+
+# Long-running conversion worker, keeping FreeCAD loaded between jobs
+# so that each conversion only pays for the build itself.
+# Jobs are taken from a spool directory and/or a Unix socket, each job is built
+# with the memory-lean build of create.py in a fresh document, and the written
+# files are returned along with the time taken by each step.
+# The worker process is replaced after --max-jobs jobs to limit memory growth.
+#
+#   python Python/worker.py serve --spool /tmp/dissolvpcb --max-jobs 20
+#   python Python/worker.py submit board.kicad_pcb --spool /tmp/dissolvpcb --step
+#
+# A job is a JSON object (see run_job()):
+#   {"id": "...", "board": "board.kicad_pcb", "out": "output/", "formats": ["FCStd", "step"],
+#    "params": {"width": 0.85}, "options": {"cache": true}}
+# Spool directories hold incoming/, running/ and done/ subdirectories,
+# where claimed jobs are moved to running/<id>.<pid>.json and results are written as done/<id>.json.
+# Socket clients send one job per connection as a line of JSON, and get the result back the same way.
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import create
+
+POLL_INTERVAL = 0.2 # seconds between checks for new jobs
+REQUEST_TIMEOUT = 10 # seconds a socket client has to send its job
+DEFAULT_MAX_JOBS = 20
+
+# Job options, by the name of the create.py global they set
+JOB_OPTIONS = {
+  "cache": "PARSE_CACHE",
+  "simplify_housings": "SIMPLIFY_HOUSINGS",
+  "tile_size": "BOOLEAN_TILE_SIZE",
+  "pad_patterns": "PAD_PATTERN_CACHE",
+  "stadium_traces": "STADIUM_TRACES",
+  "model_dir": "KICAD_3DMODEL_DIR"
+}
+
+#####################################################
+# Spool directory
+#####################################################
+
+def spool_dir(spool: str, state: str):
+  path = os.path.join(spool, state)
+  os.makedirs(path, exist_ok=True)
+  return path
+
+# Writes a JSON file so that readers never see it half written
+def write_json(path: str, data: dict):
+  with open(path + ".tmp", 'w') as jsonfile:
+    json.dump(data, jsonfile)
+  os.replace(path + ".tmp", path)
+
+# Path of a job in running/, named after the process that claimed it
+def running_path(spool: str, job_id: str, pid: int):
+  return os.path.join(spool_dir(spool, "running"), job_id + "." + str(pid) + ".json")
+
+# Moves the oldest incoming job to running/ and returns it, or None if there are none.
+# Moving the file claims the job, so several workers can share one spool directory.
+def claim_job(spool: str):
+  incoming = spool_dir(spool, "incoming")
+  names = [name for name in os.listdir(incoming) if name.endswith(".json")]
+  names.sort(key=lambda name: os.path.getmtime(os.path.join(incoming, name)))
+  for name in names:
+    running = running_path(spool, os.path.splitext(name)[0], os.getpid())
+    try:
+      os.rename(os.path.join(incoming, name), running)
+    except OSError:
+      continue # Claimed by another worker
+    job_id = os.path.splitext(name)[0]
+    try:
+      with open(running, 'r') as jobfile:
+        job = json.load(jobfile)
+      job.setdefault("id", job_id)
+    except (ValueError, AttributeError) as error:
+      finish_job(spool, {"id": job_id, "outputs": [], "error": "bad job: " + str(error)}, running)
+      continue
+    job["running"] = running
+    return job
+  return None
+
+# Writes the result of a job to done/ and removes it from running/
+def finish_job(spool: str, result: dict, running: str):
+  write_json(os.path.join(spool_dir(spool, "done"), result["id"] + ".json"), result)
+  try:
+    os.remove(running)
+  except OSError:
+    pass
+
+# Returns whether a process is still running
+def is_alive(pid: int):
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except PermissionError:
+    pass # Running as another user
+  return True
+
+# Jobs left in running/ by a worker process that exited were interrupted before they finished,
+# e.g. because the build crashed. They are failed instead of being run again.
+# Jobs claimed by worker processes that are still running, such as the workers of other
+# serve() processes sharing the spool directory, are left to them.
+def fail_interrupted_jobs(spool: str):
+  running = spool_dir(spool, "running")
+  for name in os.listdir(running):
+    parts = name.split(".")
+    if (len(parts) < 3) or (parts[-1] != "json") or (not parts[-2].isdigit()):
+      continue
+    if (is_alive(int(parts[-2]))):
+      continue
+    job_id = ".".join(parts[:-2])
+    finish_job(spool, {"id": job_id, "outputs": [], "error": "worker exited while running the job"}, os.path.join(running, name))
+
+#####################################################
+# Unix socket
+#####################################################
+
+# Opens the socket once in serve(), so that clients connecting while a worker
+# process is being replaced wait in its backlog instead of being refused
+def open_socket(path: str):
+  import socket
+  if os.path.exists(path):
+    os.remove(path)
+  server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  server.bind(path)
+  server.listen()
+  return server
+
+# Reads one job from a connection, returning the job and a function sending its result back.
+# Requests that are not a JSON object are answered with an error right away, returning (None, None).
+# Clients that hang up before their result is sent only cost their own job.
+def receive_job(server):
+  connection, address = server.accept()
+  connection.settimeout(REQUEST_TIMEOUT)
+  stream = connection.makefile('rw')
+
+  def reply(result: dict):
+    try:
+      stream.write(json.dumps(result) + "\n")
+      stream.flush()
+    except OSError:
+      print("   Client of job", result.get("id"), "hung up before its result was sent")
+    finally:
+      try:
+        stream.close()
+      except OSError:
+        pass
+      connection.close()
+
+  try:
+    job = json.loads(stream.readline())
+    if (not isinstance(job, dict)):
+      raise ValueError("a job must be a JSON object")
+  except (OSError, ValueError) as error:
+    reply({"id": None, "outputs": [], "error": "bad request: " + str(error)})
+    return None, None
+  return job, reply
+
+#####################################################
+# Worker
+#####################################################
+
+# Waits for the next job from the socket or the spool directory.
+# Returns the job and a function reporting its result, or (None, None) if there is none yet.
+def next_job(spool: str, server):
+  if (server is not None):
+    import select
+    ready, unused, unused = select.select([server], [], [], POLL_INTERVAL)
+    if (ready):
+      return receive_job(server)
+
+  if (spool is not None):
+    job = claim_job(spool)
+    if (job is not None):
+      return job, lambda result: finish_job(spool, result, job["running"])
+    if (server is None):
+      time.sleep(POLL_INTERVAL)
+
+  return None, None
+
+# Runs one conversion job in a fresh document.
+# Every job starts from the worker's default settings (see create.worker_settings()),
+# with the job's parameters and options applied on top.
+# Returns the written files, the time taken overall and by each step, and the error if the job failed.
+def run_job(job: dict, defaults: dict):
+  start = time.perf_counter()
+  result = {"id": job.get("id"), "board": job.get("board"), "outputs": list(), "error": None}
+
+  create.apply_worker_settings(defaults["settings"])
+  for name, value in defaults["options"].items():
+    setattr(create, name, value)
+  for key, value in job.get("options", dict()).items():
+    if (key not in JOB_OPTIONS):
+      result["error"] = "unknown option: " + key
+      result["time"] = time.perf_counter() - start
+      return result
+    setattr(create, JOB_OPTIONS[key], value)
+
+  doc = create.new_document("PCB_Job")
+  try:
+    if (len(job.get("params", dict())) > 0):
+      create.set_parameters(job["params"])
+    board = job["board"]
+    create.build_lean(board, jobs=job.get("jobs", 1))
+
+    out_dir = job.get("out") or os.path.dirname(os.path.abspath(board))
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, os.path.splitext(os.path.basename(board))[0])
+    for kind in job.get("formats", ["FCStd"]):
+      if (kind == "FCStd"):
+        doc.saveAs(base + ".FCStd")
+        result["outputs"].append(base + ".FCStd")
+      elif (kind == "step"):
+        doc.getObject("PCB_Base").Shape.exportStep(base + ".step")
+        result["outputs"].append(base + ".step")
+      else:
+        raise ValueError("unknown format: " + kind)
+
+  except SystemExit:
+    result["error"] = "the build exited, see the worker output"
+  except Exception as error:
+    result["error"] = repr(error)
+  finally:
+    create.FreeCAD.closeDocument(doc.Name)
+    gc.collect()
+
+  result["stages"] = list(create.STAGE_LOG)
+  result["time"] = time.perf_counter() - start
+  return result
+
+# Worker process, runs up to 'max_jobs' jobs and then exits to be replaced (see serve()).
+# 'server' is the listening socket opened by serve(), or None.
+def work(spool: str, server, max_jobs: int):
+  create.FreeCAD.Version() # Loads FreeCAD before the first job arrives
+  create.report_startup()
+  defaults = {
+    "settings": create.worker_settings(),
+    "options": {name: getattr(create, name) for name in JOB_OPTIONS.values()}
+  }
+
+  done = 0
+  while (done < max_jobs):
+    job, reply = next_job(spool, server)
+    if (job is None):
+      continue
+    print("Running job", job.get("id"), "on", job.get("board"))
+    result = run_job(job, defaults)
+    reply(result)
+    print("   Finished in %.1fs" % result["time"], "with error: " + result["error"] if result["error"] else "")
+    done = done + 1
+
+# Keeps a worker process running, replacing it after every 'max_jobs' jobs.
+# Workers are started fresh, as FreeCAD does not survive being forked (see create.process_pool()),
+# and each one is handed the same listening socket.
+def serve(spool: str, socket_path: str, max_jobs: int):
+  import multiprocessing
+  context = multiprocessing.get_context("spawn")
+  if (spool is not None):
+    fail_interrupted_jobs(spool)
+  server = open_socket(socket_path) if (socket_path) else None
+
+  try:
+    while True:
+      worker = context.Process(target=work, args=(spool, server, max_jobs))
+      worker.start()
+      try:
+        worker.join()
+      except KeyboardInterrupt:
+        worker.terminate()
+        worker.join()
+        return
+
+      if (worker.exitcode != 0):
+        print("Worker exited with code", worker.exitcode, "restarting")
+        if (spool is not None):
+          fail_interrupted_jobs(spool)
+        time.sleep(1)
+  finally:
+    if (server is not None):
+      server.close()
+
+#####################################################
+# Client
+#####################################################
+
+# Submits a job and waits for its result, or returns None straight away if 'wait' is False
+def submit(job: dict, spool: str = None, socket_path: str = None, wait: bool = True, timeout: float = None):
+  import uuid
+  job.setdefault("id", uuid.uuid4().hex)
+
+  if (socket_path is not None):
+    import socket
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    client.connect(socket_path)
+    stream = client.makefile('rw')
+    stream.write(json.dumps(job) + "\n")
+    stream.flush()
+    result = json.loads(stream.readline())
+    stream.close()
+    client.close()
+    return result
+
+  write_json(os.path.join(spool_dir(spool, "incoming"), job["id"] + ".json"), job)
+  if (not wait):
+    return None
+
+  done = os.path.join(spool_dir(spool, "done"), job["id"] + ".json")
+  start = time.perf_counter()
+  while (not os.path.exists(done)):
+    if (timeout is not None) and (time.perf_counter() - start > timeout):
+      return None
+    time.sleep(POLL_INTERVAL)
+  with open(done, 'r') as resultfile:
+    return json.load(resultfile)
+
+def main(argv: list):
+  parser = args.ArgumentParser(description="Warm DissolvPCB conversion worker.")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  serve_parser = commands.add_parser("serve", help="run the worker")
+  serve_parser.add_argument("--spool", help="spool directory to take jobs from")
+  serve_parser.add_argument("--socket", help="Unix socket to take jobs from")
+  serve_parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS, help="jobs per worker process before it is replaced")
+
+  submit_parser = commands.add_parser("submit", help="submit a board to a running worker")
+  submit_parser.add_argument("board", help="KiCad .kicad_pcb file")
+  submit_parser.add_argument("--spool", help="spool directory of the worker")
+  submit_parser.add_argument("--socket", help="Unix socket of the worker")
+  submit_parser.add_argument("--out", help="output directory, defaults to the board's directory")
+  submit_parser.add_argument("--step", action="store_true", help="also write a STEP file")
+  submit_parser.add_argument("--params", help="JSON object of parameters, e.g. {\"width\": 0.85}")
+  submit_parser.add_argument("--no-wait", action="store_true", help="do not wait for the result")
+  submit_parser.add_argument("--timeout", type=float, help="seconds to wait for the result")
+  options = parser.parse_args(argv)
+
+  if (options.spool is None) and (options.socket is None):
+    parser.error("either --spool or --socket is required")
+
+  if (options.command == "serve"):
+    serve(options.spool, options.socket, options.max_jobs)
+    return 0
+
+  job = {
+    "board": os.path.abspath(options.board),
+    "out": os.path.abspath(options.out) if options.out else None,
+    "formats": ["FCStd", "step"] if options.step else ["FCStd"],
+    "params": json.loads(options.params) if options.params else dict()
+  }
+  result = submit(job, options.spool, options.socket, not options.no_wait, options.timeout)
+  if (result is None):
+    print("Submitted job", job["id"])
+    return 0
+  print(json.dumps(result, indent=2))
+  return 1 if result["error"] else 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The scripts under /Python are not a package, so they are imported from their folder
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Python"))
+
+BOARD_DIR = os.path.join(ROOT, "KiCAD")
@@ -0,0 +1,52 @@
+import math
+import pytest
+import create
+
+def arc(x0, y0, xm, ym, x1, y1, net="net_1"):
+  return {"type": "arc", "x0": str(x0), "y0": str(y0), "xm": str(xm), "ym": str(ym), "x1": str(x1), "y1": str(y1), 
+          "width": "0.25", "layer": "F.Cu", "net": net}
+
+QUARTER = arc(1, 0, math.sqrt(0.5), math.sqrt(0.5), 0, 1)
+
+def test_arc_through_three_points():
+  cx, cy, radius, start, sweep = create.arc_geometry(QUARTER)
+  assert (cx, cy, radius, start) == pytest.approx((0, 0, 1, 0), abs=1e-9)
+  assert sweep == pytest.approx(math.pi / 2)
+  assert create.arc_length(QUARTER) == pytest.approx(math.pi / 2)
+
+def test_clockwise_arc_sweeps_negative():
+  cx, cy, radius, start, sweep = create.arc_geometry(arc(0, 1, math.sqrt(0.5), math.sqrt(0.5), 1, 0))
+  assert sweep == pytest.approx(-math.pi / 2)
+
+def test_long_way_round():
+  # From (1, 0) over (-1, 0) to (0, -1), three quarters of the circle
+  assert create.arc_length(arc(1, 0, -1, 0, 0, -1)) == pytest.approx(3 * math.pi / 2)
+
+def test_bulge():
+  assert create.arc_bulge(QUARTER) == pytest.approx(1 - math.sqrt(0.5), abs=1e-9)
+  assert create.arc_bulge(arc(0, 0, 1, 0.0001, 2, 0)) < create.JOINT_TOLERANCE
+
+def test_arcs_are_parsed(tmp_path):
+  path = tmp_path / "arcs.kicad_pcb"
+  path.write_text('(kicad_pcb\n'
+                  '  (arc\n    (start 1 0)\n    (mid 0.7071068 0.7071068)\n    (end 0 1)\n    (width 0.25)\n    (layer "F.Cu")\n    (net 3)\n  )\n'
+                  '  (arc\n    (start 0 0)\n    (mid 1 0.0001)\n    (end 2 0)\n    (width 0.25)\n    (layer "B.Cu")\n    (net 4)\n  )\n'
+                  ')\n')
+  segs = list()
+  create.assign_segments(str(path), segs, list())
+  assert [(item["type"], item["layer"], item["net"]) for item in segs] == [("arc", "F.Cu", "net_3"), ("segment", "B.Cu", "net_4")]
+  assert (segs[0]["xm"], segs[0]["ym"]) == ("0.7071068", "0.7071068")
+  assert "xm" not in segs[1]
+
+def test_tight_arcs_are_split_into_segments():
+  tight = arc(0.1, 0, 0, 0.1, -0.1, 0)
+  split = create.split_tight_arcs([QUARTER, tight])
+  assert [item["type"] for item in split] == ["arc", "segment", "segment"]
+  assert (split[1]["x1"], split[1]["y1"]) == (split[2]["x0"], split[2]["y0"]) == ("0", "0.1")
+
+def test_joint_ends_of_shared_points():
+  joints = set()
+  assert create.joint_ends(joints, QUARTER) == (["A", "B"], 0)
+  following = arc(0, 1, -math.sqrt(0.5), math.sqrt(0.5), -1, 0)
+  assert create.joint_ends(joints, following) == (["B"], 1)
+  assert create.joint_ends(joints, following, dedup=False) == (["A", "B"], 0)
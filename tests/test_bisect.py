@@ -0,0 +1,87 @@
+import types
+from concurrent.futures import Future
+import pytest
+import create
+
+class Shape:
+  def __init__(self, name, x=0.0, y=0.0):
+    self.name = name
+    self.BoundBox = types.SimpleNamespace(Center=types.SimpleNamespace(x=x, y=y))
+
+  def exportBrep(self, file):
+    open(file, "w").close()
+
+class SyncPool:
+  def __init__(self, jobs):
+    self.jobs = jobs
+    self.closed = False
+
+  def submit(self, function, *args):
+    future = Future()
+    future.set_result(function(*args))
+    return future
+
+  def shutdown(self):
+    self.closed = True
+
+@pytest.fixture
+def cuts(monkeypatch):
+  # Cuts fail when all the tools of any bad set are among them
+  bad = list()
+  calls = list()
+  def cut_failure(body, shapes):
+    calls.append(len(shapes))
+    names = set(shape.name for shape in shapes)
+    return "bad" if any(set(group) <= names for group in bad) else None
+  monkeypatch.setattr(create, "Part", types.SimpleNamespace(makeCompound=lambda shapes: Shape("compound")))
+  monkeypatch.setattr(create, "cut_failure", cut_failure)
+  return bad, calls
+
+def make_tools(count):
+  return [("Tool_%d" % i, Shape("Tool_%d" % i), None) for i in range(count)]
+
+def test_split_tools_covers_every_index_once():
+  indices = list(range(10))
+  parts = create.split_tools(indices, 3)
+  assert len(parts) == 3
+  assert [i for part in parts for i in part] == indices
+  assert create.split_tools([4, 5], 8) == [[4], [5]]
+
+def test_isolates_single_bad_tool(cuts):
+  bad, calls = cuts
+  bad.append(["Tool_37"])
+  assert create.isolate_failing_tools(Shape("body"), make_tools(64)) == [[37]]
+  assert max(calls) < 64
+
+def test_isolates_separate_bad_tools(cuts):
+  bad, calls = cuts
+  bad.extend([["Tool_3"], ["Tool_50"]])
+  assert sorted(create.isolate_failing_tools(Shape("body"), make_tools(64))) == [[3], [50]]
+
+def test_narrows_failure_that_needs_several_tools(cuts, monkeypatch):
+  bad, calls = cuts
+  bad.append(["Tool_5", "Tool_40"])
+  monkeypatch.setattr(create, "process_pool", SyncPool)
+  monkeypatch.setattr(create, "test_cut", lambda file, indices: create.cut_failure(None, [Shape("Tool_%d" % i) for i in indices]))
+  assert create.isolate_failing_tools(Shape("body"), make_tools(48), 4) == [[5, 40]]
+
+def test_failure_of_all_tools_together_is_not_reported_as_a_set(cuts):
+  bad, calls = cuts
+  bad.append(["Tool_0", "Tool_1", "Tool_2", "Tool_3"])
+  assert create.isolate_failing_tools(Shape("body"), make_tools(4)) == []
+
+def test_describe_tool_reports_source_coordinates():
+  segment = {"type": "segment", "x0": 1, "y0": 2, "x1": 3, "y1": 4, "layer": "F.Cu", "net": "GND"}
+  via = {"type": "via", "x": 5, "y": 6, "from_layer": "F.Cu", "to_layer": "B.Cu", "net": "VCC"}
+  assert create.describe_tool(("Trace_1", Shape("t"), segment)) == "Trace_1: segment (1, 2) -> (3, 4) on F.Cu, GND"
+  assert create.describe_tool(("Via_1", Shape("v"), via)) == "Via_1: via at (5, 6) from F.Cu to B.Cu, VCC"
+  assert create.describe_tool(("Tool", Shape("s", 1.5, 2.25), None)) == "Tool at (1.500, 2.250)"
+
+def test_diagnose_cut_leaves_out_failing_tools(cuts, monkeypatch):
+  bad, calls = cuts
+  bad.append(["Tool_2"])
+  tools = make_tools(6)
+  monkeypatch.setattr(create, "BOOLEAN_DIAGNOSIS", "exclude")
+  assert [tool[0] for tool in create.diagnose_cut(Shape("body"), tools)] == ["Tool_0", "Tool_1", "Tool_3", "Tool_4", "Tool_5"]
+  monkeypatch.setattr(create, "BOOLEAN_DIAGNOSIS", "report")
+  assert create.diagnose_cut(Shape("body"), tools) is None
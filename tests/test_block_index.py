@@ -0,0 +1,71 @@
+import os
+import json
+import shutil
+import pytest
+import create
+from conftest import BOARD_DIR
+
+BOARD = os.path.join(BOARD_DIR, "ESP_Speaker", "ESP_Speaker", "rev_3_ESP_Speaker_2row_esp.kicad_pcb")
+
+# Copy of the sample board, so that the index is saved next to the copy
+@pytest.fixture
+def board(tmp_path):
+  path = str(tmp_path / "board.kicad_pcb")
+  shutil.copy(BOARD, path)
+  return path
+
+def test_blocks_cover_top_level_blocks(board):
+  blocks = create.build_block_index(board)
+  with open(board, 'rb') as pcbfile:
+    data = pcbfile.read()
+  assert len(blocks) > 0
+  for block in blocks:
+    text = data[block["start"]:block["end"]].decode()
+    assert text.lstrip().startswith("(" + block["kind"])
+  # Blocks follow each other without gaps
+  for previous, block in zip(blocks, blocks[1:]):
+    assert previous["end"] == block["start"]
+
+def test_footprints_record_reference_and_name(board):
+  footprints = [block for block in create.build_block_index(board) if block["kind"] == "footprint"]
+  parsed = list()
+  create.assign_footprints(board, parsed)
+  assert len(footprints) == len(parsed)
+  assert all(block["ref"] and block["name"] for block in footprints)
+
+def test_index_is_saved_and_reused(board):
+  blocks = create.load_block_index(board)
+  assert os.path.exists(create.block_index_path(board))
+  # A saved index is trusted while the board is unchanged
+  with open(create.block_index_path(board), 'r') as indexfile:
+    saved = indexfile.read()
+  assert create.load_block_index(board) == blocks
+  with open(create.block_index_path(board), 'r') as indexfile:
+    assert indexfile.read() == saved
+
+def test_index_is_rebuilt_when_board_changes(board):
+  blocks = create.load_block_index(board)
+  with open(board, 'a') as pcbfile:
+    pcbfile.write("\n")
+  assert create.load_block_index(board) == blocks
+  with open(create.block_index_path(board), 'r') as indexfile:
+    assert json.load(indexfile)["size"] == os.path.getsize(board)
+
+def test_load_footprint_reads_one_footprint(board):
+  ref = next(block["ref"] for block in create.build_block_index(board) if block["kind"] == "footprint")
+  part = create.load_footprint(board, ref)
+  assert len(part["footprints"]) == 1
+  assert len(part["pads"]) > 0
+  assert all(pad["footprint"] is part["footprints"][0] for pad in part["pads"])
+  assert create.load_footprint(board, "NO_SUCH_REF") is None
+
+def test_parallel_parse_matches_serial_parse(board):
+  serial = create.parse_board(board)
+  parallel = create.parse_board_parallel(board, 2)
+  for key in serial:
+    assert len(parallel[key]) == len(serial[key]), key
+  assert parallel["segments"] == serial["segments"]
+  assert parallel["outlines"] == serial["outlines"]
+  assert [item["filepos"] for item in parallel["footprints"]] == [item["filepos"] for item in serial["footprints"]]
+  strip = lambda pads: [dict(pad, footprint=pad["footprint"]["name"]) for pad in pads]
+  assert strip(parallel["pads"]) == strip(serial["pads"])
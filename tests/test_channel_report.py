@@ -0,0 +1,62 @@
+import csv
+import json
+import math
+import os
+import pytest
+import create
+from conftest import BOARD_DIR
+
+BOARD = os.path.join(BOARD_DIR, "ESP_Speaker", "ESP_Speaker", "rev_3_ESP_Speaker_2row_esp.kicad_pcb")
+
+def seg(x0, y0, x1, y1, net="1", layer="F.Cu"):
+  return {"type": "segment", "x0": str(x0), "y0": str(y0), "x1": str(x1), "y1": str(y1), 
+          "width": "0.25", "layer": layer, "net": net}
+
+def via(x, y, net="1"):
+  return {"type": "via", "x": str(x), "y": str(y), "size": "0.8", "drill": "0.4", "net": net, 
+          "from_layer": "F.Cu", "to_layer": "B.Cu"}
+
+def report(segments, pads=()):
+  rows = create.channel_report({"layers": [], "segments": list(segments), "pads": list(pads), "zones": []})
+  return {(entry["net"], entry["layer"]): entry for entry in rows}
+
+def test_single_trace_volume():
+  entry = report([seg(0, 0, 10, 0)])[("1", "F.Cu")]
+  width = create.DEFAULT_TRACE_WIDTH
+  height = create.DEFAULT_TRACE_HEIGHT
+  joint = math.pi * (width / 2)**2
+  # The box, plus two joints, less the half of each joint inside the box
+  expected = (10 * width * height) + (2 * joint * width) - (joint * min(width, height))
+  assert (entry["segments"], entry["joints"], entry["length"]) == (1, 2, 10)
+  assert entry["channel_volume"] == pytest.approx(expected, rel=0.02)
+
+def test_collinear_segments_make_one_channel():
+  entry = report([seg(0, 0, 5, 0), seg(5, 0, 10, 0)])[("1", "F.Cu")]
+  assert (entry["segments"], entry["joints"], entry["length"]) == (1, 2, 10)
+
+def test_nets_and_layers_get_their_own_rows():
+  rows = report([seg(0, 0, 5, 0), seg(0, 0, 0, 5, layer="B.Cu"), seg(10, 10, 15, 10, net="2")])
+  assert set(rows) == {("1", "F.Cu"), ("1", "B.Cu"), ("1", "total"), ("2", "F.Cu"), ("2", "total")}
+  assert rows[("1", "total")]["length"] == 10
+  assert rows[("1", "total")]["volume"] == pytest.approx(rows[("1", "F.Cu")]["volume"] + rows[("1", "B.Cu")]["volume"], abs=1e-3)
+
+def test_vias_are_reported_on_their_span():
+  rows = report([seg(0, 0, 5, 0), via(5, 0)])
+  entry = rows[("1", "F.Cu-B.Cu")]
+  bottom, height = create.via_span(via(5, 0))
+  assert entry["vias"] == 1
+  assert 0 < entry["via_volume"] < math.pi * 0.4**2 * height
+
+def test_board_report_is_saved(tmp_path):
+  rows = create.channel_report(create.parse_board(BOARD))
+  assert len(rows) > 0
+  assert all(entry["volume"] >= 0 for entry in rows)
+
+  create.save_channel_report(rows, str(tmp_path / "report.json"))
+  with open(tmp_path / "report.json", 'r') as reportfile:
+    assert json.load(reportfile) == rows
+
+  create.save_channel_report(rows, str(tmp_path / "report.csv"))
+  with open(tmp_path / "report.csv", 'r', newline='') as reportfile:
+    saved = list(csv.DictReader(reportfile))
+  assert [entry["net"] for entry in saved] == [str(entry["net"]) for entry in rows]
@@ -0,0 +1,49 @@
+import os
+import shutil
+import pytest
+import create
+from conftest import BOARD_DIR
+
+BOARD = os.path.join(BOARD_DIR, "ESP_Speaker", "ESP_Speaker", "rev_3_ESP_Speaker_2row_esp.kicad_pcb")
+
+@pytest.fixture
+def board(tmp_path):
+  path = str(tmp_path / "board.kicad_pcb")
+  shutil.copy(BOARD, path)
+  yield path
+  create.set_copper_layers(["F.Cu", "B.Cu"])
+
+def test_checkpoints_are_saved_next_to_the_board(board, monkeypatch):
+  assert create.checkpoint_path(board) == board + ".checkpoint"
+  monkeypatch.setattr(create, "CHECKPOINT_DIR", "/tmp/elsewhere")
+  assert create.checkpoint_path(board) == "/tmp/elsewhere"
+
+def test_key_does_not_depend_on_the_last_board_built(board):
+  key = create.checkpoint_key(board)
+  create.set_copper_layers(["F.Cu", "In1.Cu", "In2.Cu", "B.Cu"])
+  assert create.checkpoint_key(board) == key
+
+def test_key_follows_the_settings(board, monkeypatch):
+  key = create.checkpoint_key(board)
+  monkeypatch.setattr(create, "MINIMUM_TRACE_LENGTH", 1.0)
+  assert create.checkpoint_key(board) != key
+
+def test_completed_stages_are_resumed(board):
+  checkpoint = create.open_checkpoint(board, False)
+  create.save_checkpoint_board(checkpoint, create.parse_board(board))
+  create.complete_stage(checkpoint, "body")
+
+  resumed = create.open_checkpoint(board, True)
+  assert resumed["stages"] == ["parse", "body"]
+  assert create.resumed(resumed, "parse") and (not create.resumed(resumed, "tools"))
+  assert len(create.load_checkpoint_board(resumed)["segments"]) == len(create.parse_board(board)["segments"])
+
+  # Without resuming, earlier checkpoints are forgotten
+  assert create.open_checkpoint(board, False)["stages"] == []
+
+def test_changed_board_starts_over(board):
+  checkpoint = create.open_checkpoint(board, False)
+  create.complete_stage(checkpoint, "body")
+  with open(board, 'a') as pcbfile:
+    pcbfile.write("\n")
+  assert create.open_checkpoint(board, True)["stages"] == []
@@ -0,0 +1,28 @@
+import types
+import compare_engines
+
+def prints(**changes):
+  values = {"volume": 100.0, "box": (0.0, 0.0, 0.0, 10.0, 10.0, 2.0), "channels": 4, "section F.Cu": 12.5}
+  values.update(changes)
+  return values
+
+def test_equal_fingerprints_match():
+  assert compare_engines.compare(prints(), prints(volume=100.05)) == []
+
+def test_deviations_are_reported():
+  deviations = compare_engines.compare(prints(), prints(volume=101.0, channels=3, box=(0.0, 0.0, 0.0, 10.1, 10.0, 2.0)))
+  assert len(deviations) == 3
+  assert "channels 4 != 3" in deviations
+
+def test_missing_and_unmeasured_values_are_reported():
+  other = prints(**{"section F.Cu": float("nan")})
+  del other["channels"]
+  assert compare_engines.compare(prints(), other) == ["channels missing", "section F.Cu could not be measured"]
+
+def test_net_points_are_halfway_up_each_channel(monkeypatch):
+  monkeypatch.setattr(compare_engines, "FreeCAD", types.SimpleNamespace(Vector=lambda x, y, z: (x, y, z)))
+  segs = [{"type": "segment", "x0": "0", "y0": "0", "x1": "4", "y1": "0", "layer": "F.Cu", "net": "1", "width": "0.25"},
+          {"type": "segment", "x0": "0", "y0": "0", "x1": "0.1", "y1": "0", "layer": "F.Cu", "net": "1", "width": "0.25"},
+          {"type": "via", "x": "4", "y": "0", "net": "1"}]
+  z = compare_engines.create.layer_z("F.Cu") + (compare_engines.create.DEFAULT_TRACE_HEIGHT / 2)
+  assert compare_engines.net_points(segs) == {"1": [(2.0, 0.0, z)]}
@@ -0,0 +1,34 @@
+import types
+import create
+
+class Box:
+  def __init__(self, xmin, ymin, zmin, xmax, ymax, zmax):
+    self.XMin, self.YMin, self.ZMin = xmin, ymin, zmin
+    self.XMax, self.YMax, self.ZMax = xmax, ymax, zmax
+    self.XLength, self.YLength, self.ZLength = xmax - xmin, ymax - ymin, zmax - zmin
+
+  def intersect(self, other):
+    return ((self.XMin <= other.XMax) and (other.XMin <= self.XMax) and (self.YMin <= other.YMax) 
+            and (other.YMin <= self.YMax) and (self.ZMin <= other.ZMax) and (other.ZMin <= self.ZMax))
+
+def shape(*bounds):
+  return types.SimpleNamespace(BoundBox=Box(*bounds))
+
+def test_tools_outside_of_the_body_are_culled():
+  body = shape(0, 0, 0, 10, 10, 2)
+  tools = [("inside", shape(1, 1, 0, 2, 2, 1), None), ("outside", shape(20, 20, 0, 21, 21, 1), None), 
+           ("above", shape(1, 1, 5, 2, 2, 6), None), ("edge", shape(9, 9, 1, 12, 12, 3), None)]
+  inside, outside = create.cull_tools(body, tools)
+  assert [tool[0] for tool in inside] == ["inside", "edge"]
+  assert [tool[0] for tool in outside] == ["outside", "above"]
+
+def test_tiles_cover_the_box(monkeypatch):
+  monkeypatch.setattr(create, "FreeCAD", types.SimpleNamespace(BoundBox=Box))
+  tiles = create.tile_boxes(Box(0, 0, -1, 25, 10, 2), 10)
+  assert len(tiles) == 3
+  assert [(tile.XMin, tile.XMax) for tile in tiles] == [(0, 10), (10, 20), (20, 25)]
+  assert all((tile.YMin, tile.YMax, tile.ZMin, tile.ZMax) == (0, 10, -1, 2) for tile in tiles)
+
+def test_small_box_is_one_tile(monkeypatch):
+  monkeypatch.setattr(create, "FreeCAD", types.SimpleNamespace(BoundBox=Box))
+  assert len(create.tile_boxes(Box(0, 0, 0, 5, 5, 1), 10)) == 1
@@ -0,0 +1,39 @@
+import os
+import pytest
+import create
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+  monkeypatch.setattr(create, "HOUSING_CACHE_DIR", str(tmp_path / "housings"))
+  path = tmp_path / "USB-B-S-X-X-TH.step"
+  path.write_text("ISO-10303-21;\n")
+  return str(path)
+
+def test_cache_path_is_named_after_the_model(model, tmp_path):
+  cache = create.housing_cache_path(model)
+  assert os.path.dirname(cache) == str(tmp_path / "housings")
+  assert os.path.basename(cache).startswith("USB-B-S-X-X-TH_")
+  assert cache.endswith(".brep")
+  assert create.housing_cache_path(model) == cache
+
+def test_cache_path_follows_the_model_and_settings(model, monkeypatch):
+  cache = create.housing_cache_path(model)
+  monkeypatch.setattr(create, "HOUSING_DETAIL_DISTANCE", 2.0)
+  assert create.housing_cache_path(model) != cache
+
+  monkeypatch.setattr(create, "HOUSING_DETAIL_DISTANCE", None)
+  stat = os.stat(model)
+  os.utime(model, (stat.st_atime, stat.st_mtime + 10))
+  assert create.housing_cache_path(model) != cache
+
+def test_missing_model_has_no_cache_path(tmp_path):
+  assert create.housing_cache_path(str(tmp_path / "missing.step")) is None
+
+def test_tall_solids_are_replaced_by_their_bounding_box():
+  Part = pytest.importorskip("Part")
+  import FreeCAD
+  low = Part.makeBox(2, 2, 1)
+  high = Part.makeCylinder(1, 2, FreeCAD.Vector(1, 1, 5))
+  simplified = create.simplify_housing(Part.makeCompound([low, high]), 3.0)
+  assert len(simplified.Solids) == 2
+  assert len(simplified.Faces) == 12
@@ -0,0 +1,18 @@
+import subprocess
+import sys
+from conftest import ROOT
+
+# Imports create.py in a fresh interpreter and returns the modules it loaded
+def loaded_modules():
+  code = "import sys; sys.path.insert(0, 'Python'); import create; print(' '.join(sys.modules))"
+  result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+  return set(result.stdout.split())
+
+def test_import_does_not_load_freecad():
+  modules = loaded_modules()
+  for name in ("FreeCAD", "FreeCADGui", "Part", "ImportGui", "PySide2"):
+    assert name not in modules
+
+def test_import_creates_no_document():
+  import create
+  assert create.DOC is None
@@ -0,0 +1,47 @@
+import pytest
+import create
+
+# Stands in for an OCC shape, recording where its instances are placed
+class Prototype:
+  def __init__(self, kind, dims):
+    self.kind = kind
+    self.dims = dims
+
+  def moved(self, placement):
+    return (self, placement)
+
+@pytest.fixture(autouse=True)
+def prototypes(monkeypatch):
+  monkeypatch.setattr(create, "make_prototype", Prototype)
+  create.clear_prototypes()
+  yield
+  create.clear_prototypes()
+
+def test_same_size_shares_one_prototype():
+  first, at_first = create.instance_shape("cylinder", (0.375, 0.75), "A")
+  second, at_second = create.instance_shape("cylinder", ("0.375", 0.75), "B")
+  assert first is second
+  assert (at_first, at_second) == ("A", "B")
+  assert len(create.PROTOTYPES) == 1
+  assert create.INSTANCE_COUNT == 2
+
+def test_sizes_are_compared_after_rounding():
+  first, unused = create.instance_shape("box", (1.0, 2.0, 3.0), None)
+  second, unused = create.instance_shape("box", (1.0 + 1e-9, 2.0, 3.0), None)
+  third, unused = create.instance_shape("box", (1.001, 2.0, 3.0), None)
+  assert first is second
+  assert third is not first
+
+def test_kinds_do_not_share_prototypes():
+  box, unused = create.instance_shape("box", (1.0, 1.0), None)
+  cylinder, unused = create.instance_shape("cylinder", (1.0, 1.0), None)
+  assert box is not cylinder
+  assert (box.kind, cylinder.kind) == ("box", "cylinder")
+
+def test_clear_forgets_prototypes(capsys):
+  create.instance_shape("cylinder", (1.0, 1.0), None)
+  create.instance_shape("cylinder", (1.0, 1.0), None)
+  create.clear_prototypes()
+  assert "Placed 2 instances of 1 prototype shapes" in capsys.readouterr().out
+  assert len(create.PROTOTYPES) == 0
+  assert create.INSTANCE_COUNT == 0
@@ -0,0 +1,23 @@
+import create
+
+def test_shared_endpoint_gets_one_joint():
+  joints = set()
+  assert create.is_new_joint(joints, "10.0", "5.0", "F.Cu")
+  assert not create.is_new_joint(joints, 10.0, 5.0, "F.Cu")
+
+def test_points_within_tolerance_match():
+  joints = set()
+  step = create.JOINT_TOLERANCE
+  assert create.is_new_joint(joints, 10.0, 5.0, "F.Cu")
+  # Just either side of a rounding boundary
+  assert not create.is_new_joint(joints, 10.0 + 0.6 * step, 5.0 - 0.6 * step, "F.Cu")
+
+def test_points_apart_get_their_own_joints():
+  joints = set()
+  assert create.is_new_joint(joints, 10.0, 5.0, "F.Cu")
+  assert create.is_new_joint(joints, 10.0 + 3 * create.JOINT_TOLERANCE, 5.0, "F.Cu")
+
+def test_layers_do_not_share_joints():
+  joints = set()
+  assert create.is_new_joint(joints, 10.0, 5.0, "F.Cu")
+  assert create.is_new_joint(joints, 10.0, 5.0, "B.Cu")
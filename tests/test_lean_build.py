@@ -0,0 +1,31 @@
+import os
+import pytest
+import create
+from conftest import BOARD_DIR
+
+BOARD = os.path.join(BOARD_DIR, "ESP_Speaker", "ESP_Speaker", "rev_3_ESP_Speaker_2row_esp.kicad_pcb")
+
+def test_stage_logs_time_and_memory():
+  create.STAGE_LOG.clear()
+  with create.stage("Test Stage"):
+    data = [0] * 100000
+  del data
+  entry = create.STAGE_LOG[-1]
+  assert entry["stage"] == "Test Stage"
+  assert entry["time"] >= 0
+  if (entry["peak"] is not None):
+    assert entry["peak"] > 0
+
+def test_stage_logs_failed_stage():
+  create.STAGE_LOG.clear()
+  with pytest.raises(ValueError):
+    with create.stage("Failing Stage"):
+      raise ValueError("failed")
+  assert [entry["stage"] for entry in create.STAGE_LOG] == ["Failing Stage"]
+
+def test_parse_board_collects_every_list():
+  board = create.parse_board(BOARD)
+  assert len(board["footprints"]) > 0
+  assert len(board["pads"]) > 0
+  assert len(board["segments"]) > 0
+  assert len(board["outlines"]) > 0
@@ -0,0 +1,59 @@
+import pytest
+import create
+
+def entry(name, start, finish, after, background=False):
+  return {"stage": name, "time": finish - start, "start": start, "finish": finish, "after": after, "background": background}
+
+def test_critical_path_follows_the_stage_waited_for_longest():
+  log = [
+    entry("Parse", 0, 1, []),
+    entry("Tools", 1, 4, ["Parse"]),
+    entry("Body", 4, 5, ["Tools"]),
+    entry("3D Model Loading", 1, 7, ["Parse"], True),
+    entry("Insertion", 7, 8, ["Body", "3D Model Loading"]),
+    entry("Boolean", 8, 10, ["Insertion"])
+  ]
+  path = create.critical_path(log)
+  assert [name for name, seconds in path] == ["Parse", "3D Model Loading", "Insertion", "Boolean"]
+  assert [seconds for name, seconds in path] == pytest.approx([1, 6, 1, 2])
+
+def test_stage_waiting_on_a_finished_stage_only_counts_its_own_time():
+  log = [entry("Tools", 0, 3, []), entry("3D Model Loading", 0, 1, [], True), entry("Insertion", 3, 4, ["Tools", "3D Model Loading"])]
+  assert create.critical_path(log) == [("Tools", 3), ("Insertion", 1)]
+
+def test_empty_log_has_no_critical_path():
+  assert create.critical_path([{"stage": "Parse", "time": 1.0}]) == []
+
+class Pool:
+  def __init__(self, jobs):
+    self.jobs = jobs
+    self.shutdowns = list()
+    POOLS.append(self)
+
+  def submit(self, function, *args):
+    from concurrent.futures import Future
+    return Future()
+
+  def shutdown(self, cancel_futures=False):
+    self.shutdowns.append(cancel_futures)
+
+POOLS = list()
+
+def test_model_loading_shares_the_jobs_and_is_stopped_on_failure(monkeypatch):
+  POOLS.clear()
+  used = list()
+  def make_tools(board, jobs):
+    used.append(jobs)
+    raise RuntimeError("tool generation failed")
+
+  monkeypatch.setattr(create, "process_pool", Pool)
+  monkeypatch.setattr(create, "make_tools", make_tools)
+  monkeypatch.setattr(create, "OVERLAP_STAGES", True)
+  models = [{"name": "U%d" % cnt, "path": "model%d.step" % cnt} for cnt in range(10)]
+  board = {"layers": [], "segments": [], "pads": [], "zones": [], "outlines": [], "models": models}
+
+  with pytest.raises(RuntimeError):
+    create.build_shapes(board, jobs=8)
+  assert [pool.jobs for pool in POOLS] == [2]
+  assert used == [6]
+  assert POOLS[0].shutdowns == [True]
@@ -0,0 +1,68 @@
+import os
+import create
+from conftest import ROOT, BOARD_DIR
+
+BOARD = os.path.join(BOARD_DIR, "ESP_Speaker", "ESP_Speaker", "rev_3_ESP_Speaker_2row_esp.kicad_pcb")
+LIBRARY = os.path.join(ROOT, "library", "PVA_board.pretty")
+
+def read_pads(file, patterns=None):
+  footprints = list()
+  pads = list()
+  create.assign_footprints(file, footprints)
+  create.assign_pads(file, footprints, pads, patterns)
+  return pads
+
+def absolute(pad):
+  values = {key: value for key, value in pad.items() if (key != "footprint")}
+  for key in ("x", "y", "r"):
+    values[key] = round(float(values[key]) % 360 if (key == "r") else float(values[key]), 6)
+  return values
+
+def test_signature_ignores_names_and_footprints():
+  footprint = {"name": "R1", "x": "1", "y": "2", "r": "0"}
+  pad = {"name": "R1", "footprint": footprint, "number": "1", "type": "smd", "x": "1.0", "y": "0", "r": "0"}
+  other = dict(pad, name="R2", footprint=dict(footprint, name="R2"), x="1")
+  assert create.pad_signature([pad]) == create.pad_signature([other])
+  assert create.pad_signature([pad]) != create.pad_signature([dict(pad, x="1.5")])
+
+def test_pattern_round_trip_keeps_rotation():
+  footprint = {"name": "R1", "x": "10", "y": "20", "r": "90"}
+  pads = [{"name": "R1", "footprint": footprint, "type": "smd", "x": "1", "y": "0", "r": "90"},
+          {"name": "R1", "footprint": footprint, "type": "smd", "x": "-1", "y": "0", "r": "270"}]
+  pattern = create.local_pads(pads)
+  assert [pad["r"] for pad in pattern] == [0, 180]
+
+  other = {"name": "R2", "x": "5", "y": "5", "r": "270"}
+  placed = create.place_pad_pattern(pattern, other)
+  assert [pad["r"] for pad in placed] == [270, 90]
+  assert all((pad["name"] == "R2") and (pad["footprint"] is other) for pad in placed)
+
+def test_patterns_place_the_same_pads_as_reading_them():
+  patterns = dict()
+  read = read_pads(BOARD)
+  placed = read_pads(BOARD, patterns)
+  assert len(patterns) < len(set(id(pad["footprint"]) for pad in read))
+  assert [absolute(pad) for pad in placed] == [absolute(pad) for pad in read]
+
+def test_pattern_shapes_only_move_by_the_footprint_position():
+  # make_pattern_shapes() places pads around a footprint at the origin with the same rotation,
+  # so the pads of the board are found again by moving them by the footprint's position.
+  for pad in read_pads(BOARD):
+    footpt = pad["footprint"]
+    origin = {"x": 0.0, "y": 0.0, "r": footpt["r"], "layer": footpt["layer"]}
+    plx, ply = create.pad_location(dict(pad, footprint=origin))
+    x, y = create.pad_location(pad)
+    assert abs(plx + float(footpt["x"]) - x) < 1e-9
+    assert abs(ply + float(footpt["y"]) - y) < 1e-9
+
+def test_library_patterns_are_used_without_reading_the_board():
+  patterns = dict()
+  create.load_pad_patterns(LIBRARY, patterns)
+  assert ("PVA_board:R-0805", "F.Cu") in patterns
+  assert all(len(pattern) > 0 for pattern in patterns.values())
+
+  footprint = {"name": "R9", "footprint": "PVA_board:R-0805", "layer": "F.Cu", "x": "3", "y": "4", "r": "180", "filepos": 0}
+  pads = list()
+  create.assign_pads(BOARD, [footprint], pads, patterns)
+  assert len(pads) == len(patterns[("PVA_board:R-0805", "F.Cu")])
+  assert all(pad["footprint"] is footprint for pad in pads)
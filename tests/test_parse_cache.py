@@ -0,0 +1,66 @@
+import os
+import shutil
+import pytest
+import create
+from conftest import BOARD_DIR
+
+BOARDS = [
+  os.path.join(BOARD_DIR, "ESP_Speaker", "ESP_Speaker", "rev_3_ESP_Speaker_2row_esp.kicad_pcb"),
+  os.path.join(BOARD_DIR, "circuit_sample", "sample_circuit_02_polygon", "sample_circuit_02_polygon.kicad_pcb"),
+  os.path.join(BOARD_DIR, "ESP_Breakout", "esp_breakout", "2mm_2row_esp_breakout.kicad_pcb")
+]
+
+# Copy of a sample board, so that the cache is saved next to the copy
+@pytest.fixture(params=BOARDS, ids=os.path.basename)
+def board(request, tmp_path):
+  path = str(tmp_path / "board.kicad_pcb")
+  shutil.copy(request.param, path)
+  return path
+
+# Cached numbers are read back as floats, where the parser keeps the text of the file
+def normalized(value):
+  if (isinstance(value, dict)):
+    return value.get("name")
+  if (isinstance(value, (tuple, list))):
+    return tuple(normalized(part) for part in value)
+  try:
+    return float(value)
+  except (TypeError, ValueError):
+    return value
+
+def normalized_board(board: dict):
+  return {table: [{key: normalized(value) for key, value in item.items()} if isinstance(item, dict) else normalized(item)
+                  for item in items] for table, items in board.items()}
+
+def test_cached_board_matches_fresh_parse(board):
+  fresh = create.parse_board(board, use_cache=True)
+  assert create.load_parse_cache(board) is not None
+  cached = create.parse_board(board, use_cache=True)
+  assert cached is not fresh
+  # Keys missing from an item stay missing, instead of coming back empty
+  for table in fresh:
+    assert [sorted(item) for item in cached[table] if isinstance(item, dict)] == \
+           [sorted(item) for item in fresh[table] if isinstance(item, dict)], table
+  assert normalized_board(cached) == normalized_board(fresh)
+
+def test_cached_pads_share_their_footprint(board):
+  create.parse_board(board, use_cache=True)
+  cached = create.load_cached_board(board)
+  for pad in cached["pads"]:
+    assert any(pad["footprint"] is item for item in cached["footprints"])
+
+def test_missing_text_survives_numpy():
+  import numpy
+  assert numpy.array([create.MISSING_TEXT], dtype="U").tolist() == [create.MISSING_TEXT]
+
+def test_changed_board_is_reparsed(board):
+  create.parse_board(board, use_cache=True)
+  with open(board, 'a') as pcbfile:
+    pcbfile.write("\n")
+  assert create.load_parse_cache(board) is None
+
+def test_touched_board_keeps_its_cache(board):
+  create.parse_board(board, use_cache=True)
+  stat = os.stat(board)
+  os.utime(board, (stat.st_atime, stat.st_mtime + 10))
+  assert create.load_parse_cache(board) is not None
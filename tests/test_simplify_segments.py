@@ -0,0 +1,62 @@
+import pytest
+import create
+
+def seg(x0, y0, x1, y1, net="net_1", layer="F.Cu", width="0.25"):
+  return {"type": "segment", "x0": str(x0), "y0": str(y0), "x1": str(x1), "y1": str(y1), 
+          "width": width, "layer": layer, "net": net}
+
+def ends(item):
+  return sorted([(float(item["x0"]), float(item["y0"])), (float(item["x1"]), float(item["y1"]))])
+
+def test_collinear_run_is_merged():
+  result = create.simplify_segments([seg(0, 0, 5, 0), seg(5, 0, 10, 0), seg(15, 0, 10, 0)])
+  assert len(result) == 1
+  assert ends(result[0]) == [(0, 0), (15, 0)]
+
+def test_diagonal_run_is_merged():
+  result = create.simplify_segments([seg(0, 0, 2, 2), seg(2, 2, 4, 4)])
+  assert len(result) == 1
+  assert ends(result[0]) == [(0, 0), (4, 4)]
+
+def test_corner_is_kept():
+  assert len(create.simplify_segments([seg(0, 0, 5, 0), seg(5, 0, 5, 5)])) == 2
+
+def test_branch_point_is_kept():
+  # Three segments meet at (5, 0), so none of them is merged through it
+  assert len(create.simplify_segments([seg(0, 0, 5, 0), seg(5, 0, 10, 0), seg(5, 0, 5, 5)])) == 3
+
+def test_other_nets_layers_and_widths_are_kept_apart():
+  assert len(create.simplify_segments([seg(0, 0, 5, 0), seg(5, 0, 10, 0, net="net_2")])) == 2
+  assert len(create.simplify_segments([seg(0, 0, 5, 0), seg(5, 0, 10, 0, layer="B.Cu")])) == 2
+  assert len(create.simplify_segments([seg(0, 0, 5, 0), seg(5, 0, 10, 0, width="0.5")])) == 2
+
+def test_stub_is_absorbed_into_its_neighbour():
+  stub = create.MINIMUM_TRACE_LENGTH / 2
+  result = create.simplify_segments([seg(0, 0, 5, 5), seg(5, 5, 5 + stub, 5)])
+  assert len(result) == 1
+  # The channel still reaches the far end of the stub, e.g. a pad
+  assert (5 + stub, 5) in ends(result[0])
+
+def test_lone_stub_is_left_to_the_generator():
+  stub = create.MINIMUM_TRACE_LENGTH / 2
+  assert len(create.simplify_segments([seg(0, 0, stub, 0)])) == 1
+
+def test_vias_are_kept_after_the_segments():
+  via = {"type": "via", "x": "1", "y": "1", "size": "0.6", "drill": "0.3", "net": "net_1"}
+  result = create.simplify_segments([via, seg(0, 0, 5, 0), seg(5, 0, 10, 0)])
+  assert result[-1] is via
+  assert len(result) == 2
+
+def test_unchanged_segments_are_not_copied():
+  first = seg(0, 0, 5, 0)
+  second = seg(5, 0, 5, 5)
+  result = create.simplify_segments([first, second])
+  assert result[0] is first
+  assert result[1] is second
+
+@pytest.mark.parametrize("total", [3, 10])
+def test_long_run_merges_into_one(total):
+  segs = [seg(i, 0, i + 1, 0) for i in range(total)]
+  result = create.simplify_segments(segs)
+  assert len(result) == 1
+  assert ends(result[0]) == [(0, 0), (total, 0)]
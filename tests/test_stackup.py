@@ -0,0 +1,62 @@
+import io
+import os
+import pytest
+import create
+from conftest import BOARD_DIR
+
+FOUR_LAYERS = """(kicad_pcb
+\t(version 20240108)
+\t(layers
+\t\t(0 "F.Cu" signal)
+\t\t(2 "In2.Cu" signal)
+\t\t(1 "In1.Cu" signal)
+\t\t(31 "B.Cu" signal)
+\t\t(32 "B.Adhes" user "B.Adhesive")
+\t\t(44 "Edge.Cuts" user)
+\t)
+)
+"""
+
+@pytest.fixture(autouse=True)
+def default_layers():
+  yield
+  create.set_copper_layers(["F.Cu", "B.Cu"])
+
+def test_layers_are_read_in_stack_order():
+  layers = list()
+  create.assign_layers(io.StringIO(FOUR_LAYERS), layers)
+  assert layers == ["F.Cu", "In1.Cu", "In2.Cu", "B.Cu"]
+
+def test_two_layer_board():
+  layers = list()
+  create.assign_layers(os.path.join(BOARD_DIR, "circuit_sample", "sample_circuit_01", "sample_circuit_01.kicad_pcb"), layers)
+  assert layers == ["F.Cu", "B.Cu"]
+
+def test_layers_are_stacked_one_pitch_apart():
+  create.set_copper_layers(["F.Cu", "B.Cu"])
+  pitch = create.layer_z("B.Cu") - create.layer_z("F.Cu")
+  body_height = create.DEFAULT_BODY_HEIGHT
+
+  create.set_copper_layers(["F.Cu", "In1.Cu", "In2.Cu", "B.Cu"])
+  assert create.layer_z("F.Cu") == pytest.approx(create.DEFAULT_FCU_Z)
+  assert create.layer_z("In1.Cu") == pytest.approx(create.DEFAULT_FCU_Z + pitch)
+  assert create.layer_z("In2.Cu") == pytest.approx(create.DEFAULT_FCU_Z + 2 * pitch)
+  assert create.layer_z("B.Cu") == pytest.approx(create.DEFAULT_BCU_Z)
+  assert create.DEFAULT_BODY_HEIGHT == pytest.approx(body_height + 2 * pitch)
+
+def test_vias_span_their_layer_pair():
+  create.set_copper_layers(["F.Cu", "In1.Cu", "In2.Cu", "B.Cu"])
+  bottom, height = create.via_span({"from_layer": "In1.Cu", "to_layer": "In2.Cu"})
+  assert bottom == pytest.approx(create.layer_z("In1.Cu"))
+  assert bottom + height == pytest.approx(create.layer_z("In2.Cu") + create.DEFAULT_TRACE_HEIGHT)
+  # Vias without a layer pair go through every layer
+  bottom, height = create.via_span({})
+  assert bottom == pytest.approx(create.layer_z("F.Cu"))
+  assert bottom + height == pytest.approx(create.layer_z("B.Cu") + create.DEFAULT_TRACE_HEIGHT)
+
+def test_boards_need_two_copper_layers():
+  with pytest.raises(SystemExit):
+    create.set_copper_layers(["F.Cu"])
+
+def test_no_traces_build_no_tools():
+  assert create.make_trace_shapes([]) == []
@@ -0,0 +1,28 @@
+import math
+import pytest
+import create
+
+def seg(x0, y0, x1, y1, layer="F.Cu"):
+  return {"type": "segment", "x0": str(x0), "y0": str(y0), "x1": str(x1), "y1": str(y1), 
+          "width": "0.25", "layer": layer, "net": "1"}
+
+@pytest.fixture
+def stadiums(monkeypatch):
+  monkeypatch.setattr(create, "STADIUM_TRACES", True)
+  monkeypatch.setattr(create, "stadium_shape", lambda length, x0, y0, layer, orientation, ends: (length, tuple(ends)))
+
+def test_one_tool_per_segment(stadiums):
+  tools = create.make_trace_shapes([seg(0, 0, 5, 0), seg(5, 0, 5, 5), seg(10, 0, 12, 0)])
+  assert [name for name, shape, item in tools] == ["trace_seg1", "trace_seg2", "trace_seg3"]
+
+def test_shared_points_are_rounded_once(stadiums):
+  tools = create.make_trace_shapes([seg(0, 0, 5, 0), seg(5, 0, 5, 5), seg(5, 5, 0, 0)])
+  assert [shape[1] for name, shape, item in tools] == [("A", "B"), ("B",), ()]
+
+def test_stadium_volume():
+  pytest.importorskip("Part")
+  length, width, height = 4.0, 0.8, 0.75
+  r = width / 2
+  assert create.make_stadium(length, width, height).Volume == pytest.approx((length * width + math.pi * r**2) * height)
+  assert create.make_stadium(length, width, height, False, True).Volume == pytest.approx((length * width + math.pi * r**2 / 2) * height)
+  assert create.make_stadium(length, width, height, False, False).Volume == pytest.approx(length * width * height)
@@ -0,0 +1,25 @@
+import pytest
+import create
+
+@pytest.fixture(autouse=True)
+def default_parameters():
+  params = create.get_parameters()
+  yield
+  create.set_parameters(params)
+
+def test_expand_grid_covers_every_combination():
+  variants = create.expand_grid({"width": [0.75, 0.85], "gap": [0.2, 0.25, 0.3]})
+  assert len(variants) == 6
+  assert {(params["width"], params["gap"]) for params in variants} == {(w, g) for w in (0.75, 0.85) for g in (0.2, 0.25, 0.3)}
+  # Parameters missing from the grid keep their current values
+  assert all(params["height"] == create.DEFAULT_TRACE_HEIGHT for params in variants)
+
+def test_expand_grid_rejects_unknown_parameters():
+  with pytest.raises(SystemExit):
+    create.expand_grid({"depth": [1.0]})
+
+def test_set_parameters_updates_derived_parameters():
+  create.set_parameters({"height": 1.0, "gap": 0.25})
+  assert create.DEFAULT_TRACE_HEIGHT == 1.0
+  assert create.DEFAULT_FCU_Z == pytest.approx(0.25 - 1.0)
+  assert create.DEFAULT_BCU_Z == pytest.approx(1.0 - 0.25)
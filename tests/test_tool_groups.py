@@ -0,0 +1,35 @@
+import create
+
+def seg(net, layer="F.Cu"):
+  return {"type": "segment", "layer": layer, "net": net}
+
+def pad(footprint):
+  return {"type": "smd", "footprint": footprint}
+
+def test_nets_stay_together_and_keep_their_numbers():
+  segs = [seg("1"), seg("2"), {"type": "via", "net": "1"}, seg("1", "B.Cu"), seg("3")]
+  groups = create.tool_groups({"segments": segs, "pads": [], "zones": []}, 2)
+  assert [kind for kind, items, numbers in groups] == ["segments", "segments"]
+  assert sorted(numbers for kind, items, numbers in groups) == [[1, 3, 4], [2, 5]]
+  for kind, items, numbers in groups:
+    assert items == [segs[cnt - 1] for cnt in numbers]
+
+def test_footprints_of_a_kind_stay_together():
+  resistor = {"footprint": "PVA_board:R-0805", "layer": "F.Cu"}
+  header = {"footprint": "PVA_board:PinHeader", "layer": "F.Cu"}
+  pads = [pad(resistor), pad(header), pad(dict(resistor)), pad(header)]
+  groups = create.tool_groups({"segments": [], "pads": pads, "zones": []}, 4)
+  assert sorted(numbers for kind, items, numbers in groups if kind == "pads") == [[1, 3], [2, 4]]
+
+def test_groups_are_balanced():
+  segs = [seg("big")] * 4 + [seg("a"), seg("b"), seg("c"), seg("d")]
+  groups = create.tool_groups({"segments": segs, "pads": [], "zones": []}, 2)
+  assert sorted(len(items) for kind, items, numbers in groups) == [4, 4]
+
+def test_quiet_clear_returns_the_counts(capsys):
+  create.clear_prototypes()
+  create.INSTANCE_COUNT = 3
+  create.PROTOTYPES["box"] = object()
+  assert create.clear_prototypes(quiet=True) == (3, 1)
+  assert capsys.readouterr().out == ""
+  assert (create.INSTANCE_COUNT, len(create.PROTOTYPES)) == (0, 0)
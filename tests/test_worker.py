@@ -0,0 +1,85 @@
+import os
+import json
+import socket
+import subprocess
+import sys
+import worker
+
+def submit_file(spool, job_id, text):
+  with open(os.path.join(worker.spool_dir(spool, "incoming"), job_id + ".json"), 'w') as jobfile:
+    jobfile.write(text)
+
+def done(spool, job_id):
+  with open(os.path.join(worker.spool_dir(spool, "done"), job_id + ".json"), 'r') as resultfile:
+    return json.load(resultfile)
+
+def test_claimed_job_is_named_after_the_worker(tmp_path):
+  spool = str(tmp_path)
+  submit_file(spool, "job1", json.dumps({"board": "a.kicad_pcb"}))
+  job = worker.claim_job(spool)
+  assert job["id"] == "job1"
+  assert os.path.basename(job["running"]) == "job1." + str(os.getpid()) + ".json"
+  assert worker.claim_job(spool) is None
+
+  worker.finish_job(spool, {"id": "job1", "outputs": [], "error": None}, job["running"])
+  assert os.listdir(worker.spool_dir(spool, "running")) == []
+  assert done(spool, "job1")["error"] is None
+
+def test_bad_spool_job_is_failed(tmp_path):
+  spool = str(tmp_path)
+  submit_file(spool, "broken", "{not json")
+  assert worker.claim_job(spool) is None
+  assert done(spool, "broken")["error"].startswith("bad job")
+  assert os.listdir(worker.spool_dir(spool, "running")) == []
+
+def test_only_jobs_of_exited_workers_are_failed(tmp_path):
+  spool = str(tmp_path)
+  exited = subprocess.Popen([sys.executable, "-c", "pass"])
+  exited.wait()
+  for job_id, pid in (("dead", exited.pid), ("alive", os.getpid())):
+    worker.write_json(worker.running_path(spool, job_id, pid), {"id": job_id})
+
+  worker.fail_interrupted_jobs(spool)
+  assert done(spool, "dead")["error"] == "worker exited while running the job"
+  assert os.listdir(worker.spool_dir(spool, "running")) == ["alive." + str(os.getpid()) + ".json"]
+
+def exchange(server, path, request):
+  client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  client.connect(path)
+  client.sendall(request)
+  job, reply = worker.receive_job(server)
+  return client, job, reply
+
+def test_socket_jobs_are_answered(tmp_path):
+  path = str(tmp_path / "worker.sock")
+  server = worker.open_socket(path)
+  try:
+    client, job, reply = exchange(server, path, b'{"id": "job1", "board": "a.kicad_pcb"}\n')
+    assert job["id"] == "job1"
+    reply({"id": "job1", "outputs": [], "error": None})
+    assert json.loads(client.makefile('r').readline())["id"] == "job1"
+    client.close()
+  finally:
+    server.close()
+
+def test_bad_socket_request_is_answered_with_an_error(tmp_path):
+  path = str(tmp_path / "worker.sock")
+  server = worker.open_socket(path)
+  try:
+    for request in (b"{not json\n", b"[1, 2]\n"):
+      client, job, reply = exchange(server, path, request)
+      assert (job, reply) == (None, None)
+      assert json.loads(client.makefile('r').readline())["error"].startswith("bad request")
+      client.close()
+  finally:
+    server.close()
+
+def test_client_that_hung_up_does_not_stop_the_worker(tmp_path):
+  path = str(tmp_path / "worker.sock")
+  server = worker.open_socket(path)
+  try:
+    client, job, reply = exchange(server, path, b'{"id": "job1"}\n')
+    client.close()
+    reply({"id": "job1", "outputs": ["x" * 100000], "error": None})
+  finally:
+    server.close()
@@ -0,0 +1,48 @@
+import os
+import pytest
+import create
+from conftest import BOARD_DIR
+
+BOARD = os.path.join(BOARD_DIR, "ESP_Breakout", "esp_breakout", "2mm_2row_esp_breakout.kicad_pcb")
+
+def area(ring):
+  return abs(create.polygon_area([ring]))
+
+def test_bridged_hole_is_split_from_its_outline():
+  # A 10 x 10 square with a 2 x 2 hole, joined to it by a bridge along y = 5
+  points = [(0, 0), (10, 0), (10, 5), (6, 5), (6, 6), (4, 6), (4, 4), (6, 4), (6, 5), (10, 5), (10, 10), (0, 10)]
+  rings = create.unfracture_polygon(points)
+  assert len(rings) == 2
+  assert sorted(area(ring) for ring in rings) == [4, 100]
+  assert create.polygon_area(rings) == pytest.approx(96)
+
+def test_plain_outline_is_one_ring():
+  rings = create.unfracture_polygon([(0, 0), (3, 0), (3, 2), (0, 2), (0, 0)])
+  assert len(rings) == 1
+  assert area(rings[0]) == pytest.approx(6)
+
+def test_filled_zones_are_read_per_layer():
+  zones = list()
+  create.assign_zones(BOARD, zones)
+  assert [(item["type"], item["layer"]) for item in zones] == [("zone", "F.Cu")]
+  assert zones[0]["net"].startswith("net_")
+  assert len(zones[0]["rings"]) > 1
+  assert create.polygon_area(zones[0]["rings"]) > 0
+
+def test_footprints_end_before_the_zones():
+  board = create.parse_board(BOARD)
+  assert len(board["zones"]) == 1
+  assert all(item["type"] in ("smd", "thru_hole") for item in board["pads"])
+
+def test_zone_volume_is_reported():
+  ring = [(0.0, 0.0), (4.0, 0.0), (4.0, 2.0), (0.0, 2.0)]
+  zone = {"type": "zone", "net": "net_1", "layer": "F.Cu", "rings": [ring]}
+  rows = create.channel_report({"layers": [], "segments": [], "pads": [], "zones": [zone]})
+  entry = [row for row in rows if row["layer"] == "F.Cu"][0]
+  assert entry["zones"] == 1
+  assert entry["channel_volume"] == pytest.approx(8 * create.DEFAULT_TRACE_HEIGHT)
+
+def test_each_zone_is_its_own_group():
+  zones = [{"type": "zone", "net": "net_1", "layer": "F.Cu", "rings": []}] * 3
+  groups = create.tool_groups({"segments": [], "pads": [], "zones": zones}, 2)
+  assert sorted(numbers for kind, items, numbers in groups if kind == "zones") == [[1, 3], [2]]